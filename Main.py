@@ -1,34 +1,66 @@
 import asyncio
+import functools
 import logging
 import os
 import platform
-import subprocess
+import shutil
 import sys
 import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Dict, Callable, Any
-
-import pyttsx3
-import requests
-import speech_recognition as sr
-import wikipedia
-import webbrowser
-from dotenv import load_dotenv
+from typing import Optional, Dict, Callable, Any, List
+
+from startup import TIMELINE, lazy_import, warm_imports
+
 import tkinter as tk
 from tkinter import scrolledtext, ttk
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('assistant.log'),
-        logging.StreamHandler()
-    ]
-)
+# Heavy dependencies load on first use (or from a background warm-up)
+pyttsx3 = lazy_import('pyttsx3')
+requests = lazy_import('requests')
+wikipedia = lazy_import('wikipedia')
+dotenv = lazy_import('dotenv')
+
+from assistant_state import (COMMAND_END, COMMAND_START, EXECUTING, EXIT, IDLE, LISTEN_OFF, LISTEN_ON, LISTENING,
+                             RECOGNIZED, RECOGNIZING, SPEAKING, SPEECH_END, SPEECH_START, UTTERANCE, AssistantState)
+from audio_capture import AudioCaptureThread, MicrophoneSource, WavFileSource
+from gazetteer import default_gazetteer, extract_locations
+from history import HistoryStore
+from intent_router import IntentRouter, tokenize
+from launcher import APP, SITE, Launcher
+from log_pipeline import configure_logging
+from recognizers import (GoogleBackend, RecognizerBackend, RecognizerUnavailableError,
+                         UnknownSpeechError, create_backend)
+from resilience import ServiceUnavailableError
+from scheduler import EXPIRED, FAILED, CommandScheduler, CommandTask
+from speculation import SpeculativeDispatcher
+from speech_output import PRIORITY_NORMAL, SpeechWorker
+from tracing import TRACER, Turn
+from tts_cache import TTSAudioCache
+from ui_channel import UIUpdateChannel
+from wake_word import create_spotter
+from weather_service import WeatherClient, format_report, normalize_location
+from wiki_offline import OfflineWikipedia
+from wiki_service import DISAMBIGUATION, MISSING, SummaryCache, WikipediaService, default_cache_path, normalize_query
+
+# .env before anything reads its settings, the ASSISTANT_LOG_* ones first of all
+dotenv.load_dotenv()
+# Log records are written (and the file rotated) on a background thread
+configure_logging()
+TRACER.configure()
 logger = logging.getLogger(__name__)
 
+STATUS_LABELS = {
+    IDLE: ("Ready", "green"),
+    LISTENING: ("Listening...", "blue"),
+    RECOGNIZING: ("Recognizing...", "orange"),
+    EXECUTING: ("Working...", "orange"),
+    SPEAKING: ("Speaking...", "purple"),
+}
+
 class VoiceAssistantApp:
     def __init__(self, root):
         self.root = root
@@ -39,14 +71,22 @@ class VoiceAssistantApp:
         # Set up graceful window closing
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
         
-        # Load environment variables
-        load_dotenv()
-        
         # Initialize assistant
         self.assistant = UltimateVoiceAssistant(self)
         
         # UI Elements
         self.create_widgets()
+        self.root.after_idle(TIMELINE.mark, 'window')
+
+        # Widget updates from any thread are queued and applied here in batches
+        self.ui = UIUpdateChannel(
+            self.root,
+            self.conversation_text,
+            self.status_label,
+            max_lines=int(os.getenv('ASSISTANT_MAX_CONVERSATION_LINES', '1000')),
+            history=self.assistant.history
+        )
+        self.ui.start()
         
         # Start assistant in a separate thread
         self.assistant_thread = threading.Thread(target=self.start_assistant, daemon=True)
@@ -114,28 +154,25 @@ class VoiceAssistantApp:
             button = ttk.Button(
                 buttons_frame,
                 text=text,
-                command=lambda cmd=command: self.execute_command(cmd)
+                command=lambda name=text, cmd=command: self.execute_command(name, cmd)
             )
             button.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
 
     def toggle_listening(self):
         """Toggle listening state"""
+        # The status label follows the assistant's state
         if self.assistant.is_listening:
             self.assistant.stop_listening()
             self.mic_button.config(text="🎤")
-            self.update_status("Ready", "green")
         else:
             self.assistant.start_listening()
             self.mic_button.config(text="🔴")
-            self.update_status("Listening...", "blue")
 
-    def execute_command(self, command):
+    def execute_command(self, name, command):
         """Execute a command from button"""
         self.add_to_conversation("You: Button command")
-        if asyncio.iscoroutinefunction(command):
-            asyncio.run_coroutine_threadsafe(command(""), self.assistant.loop)
-        else:
-            command("")
+        # Scheduled like a spoken command, so its follow-up questions get the next utterance
+        self.assistant.loop.call_soon_threadsafe(self.assistant.press, name, command)
 
     def start_assistant(self):
         """Start the assistant in a separate thread"""
@@ -147,20 +184,23 @@ class VoiceAssistantApp:
             logger.error(f"Assistant thread failed: {e}")
             self.update_status("Error in assistant", "red")
 
-    def add_to_conversation(self, text):
-        """Add text to conversation display"""
-        self.conversation_text.configure(state='normal')
-        self.conversation_text.insert(tk.END, text + "\n")
-        self.conversation_text.configure(state='disabled')
-        self.conversation_text.see(tk.END)
+    def add_to_conversation(self, text, entry_id=None):
+        """Queue text for the conversation display (safe from any thread)"""
+        self.ui.add_line(text, entry_id)
 
     def update_status(self, text, color):
-        """Update status label"""
-        self.status_label.config(text=text, foreground=color)
+        """Queue a status label update (safe from any thread)"""
+        self.ui.set_status(text, color)
+
+    def request_exit(self):
+        """Close the window shortly (safe from any thread)"""
+        self.ui.call(lambda: self.root.after(1000, self.root.destroy))
 
     def on_closing(self):
         """Handle window closing"""
         self.assistant.stop_listening()
+        self.assistant.stop_capture()
+        self.ui.stop()
         if hasattr(self.assistant, 'loop') and self.assistant.loop.is_running():
             self.assistant.loop.stop()
         self.root.destroy()
@@ -169,14 +209,25 @@ class UltimateVoiceAssistant:
     def __init__(self, app):
         self.app = app
         self.loop = None
-        self.is_listening = False
+        self.state = AssistantState(on_change=self.on_state_change)
+        self.capture: Optional[AudioCaptureThread] = None
+        self.utterances: Optional[asyncio.Queue] = None
+        self.weather: Optional[WeatherClient] = None
+        self.scheduler = CommandScheduler(on_result=self.on_command_result)
+        self.pending_answers: deque = deque()
+        self.exit_requested = False
+        self.tracer = TRACER
+        self.history: Optional[HistoryStore] = None
+        self.preprocessor = None  # NumPy stage between capture and recognition, set up in the background
         self.setup()
         
         # Command mappings with descriptions
         self.commands: Dict[str, Dict[str, Any]] = {
             'wikipedia': {
                 'handler': self.handle_wikipedia,
-                'description': 'Search Wikipedia for information'
+                'description': 'Search Wikipedia for information',
+                'deadline': 20,
+                'prefetch': self.prefetch_wikipedia
             },
             'open youtube': {
                 'handler': self.open_youtube,
@@ -190,9 +241,19 @@ class UltimateVoiceAssistant:
                 'handler': self.open_spotify,
                 'description': 'Launch Spotify application'
             },
+            'open': {
+                'handler': self.open_anything,
+                'description': 'Open any installed app or website by name'
+            },
+            'launch': {
+                'handler': self.open_anything,
+                'description': 'Launch any installed app by name'
+            },
             'weather': {
                 'handler': self.fetch_weather,
-                'description': 'Get weather information for a city'
+                'description': 'Get weather information for a city',
+                'deadline': 20,
+                'prefetch': self.prefetch_weather
             },
             'goodbye': {
                 'handler': self.exit_assistant,
@@ -206,26 +267,89 @@ class UltimateVoiceAssistant:
                 'handler': self.exit_assistant,
                 'description': 'Exit the voice assistant'
             },
+            'search history': {
+                'handler': self.search_history,
+                'description': 'Find something said in an earlier conversation'
+            },
             'help': {
                 'handler': self.show_help,
                 'description': 'Show available commands'
+            },
+            'stop': {
+                'handler': self.cancel_tasks,
+                'description': 'Stop whatever I am doing',
+                'immediate': True
+            },
+            'cancel': {
+                'handler': self.cancel_tasks,
+                'description': 'Cancel pending requests',
+                'immediate': True
             }
         }
+        # A stray word shared with a command ("history") is not that command
+        self.router = IntentRouter(self.commands, min_partial_score=1.0)
+        # Lookups started from partial transcripts (streaming recognizers only)
+        self.speculator: Optional[SpeculativeDispatcher] = None
+        if os.getenv('ASSISTANT_SPECULATE', '1') == '1':
+            self.speculator = SpeculativeDispatcher(
+                self.router, min_stable=int(os.getenv('ASSISTANT_SPECULATE_STABLE', '4')))
 
     def setup(self):
-        """Initialize all components"""
+        """Initialize cheap components now and start the slow ones in the background"""
         try:
-            self.engine = self.init_tts_engine()
-            self.recognizer = sr.Recognizer()
-            self.browser_path = self.get_browser_path()
-            self.spotify_path = self.get_spotify_path()
             self.user_name = self.get_user_name()
+            # TTS engine is created on the speech worker's own thread
+            self.speech = SpeechWorker(
+                self.init_tts_engine,
+                on_error=self.on_speech_error,
+                audio_cache=self.get_tts_cache(),
+                prerender=self.fixed_phrases()
+            )
+            self.speech.start()
+            self.barge_in = os.getenv('ASSISTANT_BARGE_IN', '0') == '1'
+            self.recognizer = None
+            self.browser_path = self.get_browser_path()
+            self.spotify_path = None
+            # Besides installed apps, only programs allowed here can be opened by voice
+            self.launcher = Launcher(self.browser_path,
+                                     programs=os.getenv('ASSISTANT_LAUNCH_PROGRAMS', '').split(','),
+                                     program_dirs=os.getenv('ASSISTANT_LAUNCH_DIRS', '').split(os.pathsep))
             self.weather_api_key = os.getenv('WEATHER_API_KEY')
-            
-            # Configure microphone
-            with sr.Microphone() as source:
-                self.recognizer.adjust_for_ambient_noise(source, duration=1)
-                
+            self.wikipedia = self.get_wikipedia_service()
+            self.setup_metrics()
+            self.history = self.get_history_store()
+            if self.history is not None:
+                # Stored turns carry their stage latencies whether or not ASSISTANT_TRACING is on
+                self.tracer.keep_turns = True
+                self.tracer.turn_listeners.append(self.history.record_turn)
+
+            # Independent slow steps run concurrently; finish_setup() collects them
+            self.init_pool = ThreadPoolExecutor(max_workers=5, thread_name_prefix="init")
+            self.init_tasks = {
+                'recognizer': self.init_pool.submit(self.init_recognizer),
+                'spotify_path': self.init_pool.submit(self.get_spotify_path),
+                'imports': self.init_pool.submit(warm_imports, requests, wikipedia),
+                'gazetteer': self.init_pool.submit(default_gazetteer),
+                'launcher': self.init_pool.submit(self.launcher.scan),
+                'preprocessor': self.init_pool.submit(self.init_preprocessor),
+            }
+        except Exception as e:
+            logger.error(f"Initialization failed: {e}")
+            raise
+
+    async def finish_setup(self) -> None:
+        """Wait for the background initialization steps."""
+        try:
+            names = list(self.init_tasks)
+            results = await asyncio.gather(*(asyncio.wrap_future(self.init_tasks[n]) for n in names))
+            values = dict(zip(names, results))
+            self.recognizer = values['recognizer']
+            self.preprocessor = values['preprocessor']
+            if self.recognizer.streaming and self.speculator is not None:
+                self.recognizer.on_partial = self.on_partial_transcript
+            self.spotify_path = values['spotify_path']
+            self.init_pool.shutdown(wait=False)
+
             logger.info("Voice assistant initialized successfully")
             self.check_configuration()
         except Exception as e:
@@ -239,6 +363,41 @@ class UltimateVoiceAssistant:
         if self.spotify_path is not None and not os.path.exists(self.spotify_path):
             logger.warning(f"Spotify path not found: {self.spotify_path}")
 
+    def setup_metrics(self) -> None:
+        """Export stage latencies to a Prometheus text file and/or a local endpoint."""
+        if not self.tracer.enabled:
+            return
+        metrics_file = os.getenv('ASSISTANT_METRICS_FILE')
+        if metrics_file:
+            self.tracer.turn_listeners.append(lambda turn: self.tracer.write_prometheus(metrics_file))
+        metrics_port = os.getenv('ASSISTANT_METRICS_PORT')
+        if metrics_port:
+            try:
+                self.tracer.serve(int(metrics_port))
+            except OSError as e:
+                logger.warning(f"Couldn't serve metrics on port {metrics_port}: {e}")
+
+    def init_recognizer(self) -> RecognizerBackend:
+        """Create the configured speech recognition backend and load its models."""
+        try:
+            backend = create_backend()
+            backend.warm_up()
+        except Exception as e:
+            logger.error(f"Recognizer backend unavailable, falling back to Google: {e}")
+            backend = GoogleBackend()
+            backend.warm_up()
+        logger.info(f"Speech recognition backend: {backend.name}")
+        return backend
+
+    @staticmethod
+    def init_preprocessor():
+        """Create the audio preprocessing stage; imported here so NumPy loads off the startup path."""
+        from audio_preprocess import create_preprocessor
+        preprocessor = create_preprocessor()
+        if preprocessor is not None:
+            preprocessor.warm_up()
+        return preprocessor
+
     def init_tts_engine(self):
         """Initialize and configure the text-to-speech engine."""
         try:
@@ -263,11 +422,53 @@ class UltimateVoiceAssistant:
             logger.error(f"TTS engine initialization failed: {e}")
             raise
 
+    def get_tts_cache(self) -> Optional[TTSAudioCache]:
+        """Disk and memory cache of rendered speech, unless ASSISTANT_TTS_CACHE=0."""
+        if os.getenv('ASSISTANT_TTS_CACHE', '1') == '0':
+            return None
+        try:
+            return TTSAudioCache(default_cache_path('tts.sqlite3'))
+        except Exception as e:
+            logger.warning(f"Couldn't open the speech audio cache: {e}")
+            return None
+
+    def get_history_store(self) -> Optional[HistoryStore]:
+        """Searchable record of every conversation, unless ASSISTANT_HISTORY=0."""
+        if os.getenv('ASSISTANT_HISTORY', '1') == '0':
+            return None
+        try:
+            return HistoryStore(default_cache_path('history.sqlite3'))
+        except Exception as e:
+            logger.warning(f"Couldn't open the conversation history: {e}")
+            return None
+
+    def fixed_phrases(self) -> List[str]:
+        """Things said verbatim often enough to keep rendered in memory."""
+        return [
+            f"Good morning {self.user_name}!",
+            f"Good afternoon {self.user_name}!",
+            f"Good evening {self.user_name}!",
+            "How can I help you today?",
+            "Opening YouTube",
+            "Opening Google",
+            "Opening Spotify",
+            "I didn't catch that. Could you please repeat?",
+            "I didn't understand that command. Say 'help' for available commands.",
+            "Sorry, I encountered an error. Please try again.",
+            "Sorry, I had trouble executing that command.",
+            "Sorry, I'm having trouble accessing the speech recognition service.",
+            "Sorry, I couldn't open the web browser.",
+            "Sorry, that took too long.",
+            "Okay, I've stopped.",
+            "According to Wikipedia",
+            "Which city's weather would you like to know?",
+        ]
+
     def get_browser_path(self) -> str:
         """Get the path to the default browser with cross-platform support."""
         system = platform.system()
         if system == 'Windows':
-            return "C:/Program Files (x86)/Microsoft/Edge/Application/msedge.exe %s"
+            return '"C:/Program Files (x86)/Microsoft/Edge/Application/msedge.exe" %s'
         elif system == 'Darwin':  # macOS
             return "open -a /Applications/Safari.app %s"
         else:  # Linux
@@ -285,11 +486,7 @@ class UltimateVoiceAssistant:
                 path = "/Applications/Spotify.app/Contents/MacOS/Spotify"
                 return path if os.path.exists(path) else None
             else:  # Linux
-                try:
-                    subprocess.run(["which", "spotify"], check=True)
-                    return "spotify"
-                except subprocess.CalledProcessError:
-                    return None
+                return shutil.which("spotify")
         except Exception as e:
             logger.warning(f"Couldn't get Spotify path: {e}")
             return None
@@ -310,74 +507,230 @@ class UltimateVoiceAssistant:
             logger.warning(f"Couldn't get user name: {e}")
             return "User"
 
-    def speak(self, text: str) -> None:
-        """Convert text to speech and update UI."""
-        logger.info(f"Speaking: {text}")
-        self.app.add_to_conversation(f"Assistant: {text}")
+    @staticmethod
+    def get_wikipedia_service() -> WikipediaService:
+        """Use the local offline index when configured, otherwise the online API with a disk cache."""
+        offline_index = os.getenv('WIKIPEDIA_OFFLINE_INDEX')
+        if offline_index:
+            try:
+                service = WikipediaService(module=OfflineWikipedia.open(offline_index))
+                logger.info(f"Using offline Wikipedia index: {offline_index}")
+                return service
+            except Exception as e:
+                logger.warning(f"Couldn't open offline Wikipedia index, using online lookups: {e}")
+        return WikipediaService(SummaryCache(default_cache_path('wikipedia.sqlite3')))
+
+    def get_audio_source(self):
+        """Get the capture source, a WAV file fake microphone if configured."""
+        wav_path = os.getenv('ASSISTANT_FAKE_MIC_WAV')
+        if wav_path:
+            logger.info(f"Using WAV file as microphone: {wav_path}")
+            return WavFileSource(wav_path, loop=True)
+        return MicrophoneSource()
+
+    def start_capture(self) -> None:
+        """Open the input stream once and keep capturing in the background."""
+        self.utterances = asyncio.Queue(maxsize=8)
+        self.capture = AudioCaptureThread(
+            self.get_audio_source(),
+            self.loop,
+            self.utterances,
+            on_speech_start=self.on_user_speech,
+            on_ready=self.on_capture_ready,
+            spotter=create_spotter(),
+            on_audio=self.on_audio
+        )
+        if self.is_listening:
+            self.capture.enabled.set()
+        self.capture.start()
+
+    def on_capture_ready(self) -> None:
+        """Called from the capture thread once the mic is open and calibrated."""
+        TIMELINE.mark('first_listen')
+        profile_path = os.getenv('ASSISTANT_STARTUP_PROFILE')
+        if profile_path:
+            TIMELINE.dump(profile_path)
+            if os.getenv('ASSISTANT_STARTUP_EXIT') == '1':
+                self.app.ui.call(self.app.root.destroy)
+
+    def on_audio(self, started_at: float, frame: Optional[bytes]) -> None:
+        """Called from the capture thread with each frame of an utterance, for streaming recognition."""
+        recognizer = self.recognizer
+        if recognizer is not None and recognizer.streaming:
+            recognizer.feed(started_at, frame, self.capture.source.sample_rate)
+
+    def on_partial_transcript(self, started_at: float, text: str) -> None:
+        """Called from the recognizer's thread as the hypothesis for the current utterance grows."""
+        self.loop.call_soon_threadsafe(self.speculator.hypothesize, text.lower(), started_at)
+
+    def stop_capture(self) -> None:
+        """Stop the capture thread and release the input device."""
+        if self.capture is not None:
+            self.capture.stop()
+
+    def speak(self, text: str, priority: int = PRIORITY_NORMAL) -> Future:
+        """Queue text for speech, update the UI and return without waiting for playback.
+
+        Inside a scheduled command the output is held back until every
+        earlier command has answered, so replies stay in order.
+        """
+        done = Future()
+        turn = self.tracer.current_turn()
+
+        def deliver():
+            logger.info(f"Speaking: {text}")
+            self.show("Assistant", text, turn)
+            started = time.monotonic()
+            self.state.fire(SPEECH_START)
+            spoken = self.speech.say(text, priority)
+            spoken.add_done_callback(lambda f: self.state.fire(SPEECH_END))
+            spoken.add_done_callback(lambda f: self.tracer.record('speak', time.monotonic() - started, turn))
+            spoken.add_done_callback(lambda f: done.set_exception(f.exception())
+                                     if f.exception() else done.set_result(f.result()))
+
+        self.scheduler.emit(deliver)
+        return done
+
+    def show(self, speaker: str, text: str, turn: Optional[Turn] = None) -> None:
+        """Display a line of the conversation and append it to the history."""
+        entry_id = None
+        if self.history is not None:
+            entry_id = self.history.append(speaker, text, turn.id if turn is not None else None)
+        self.app.add_to_conversation(f"{speaker}: {text}", entry_id)
+
+    async def ask(self, prompt: str, timeout: float = 10) -> Optional[str]:
+        """Speak a question and wait for the user's next utterance."""
+        asked = self.speak(prompt)
+        if self.capture is not None and self.capture.spotter is not None:
+            # The answer needs no wake word; open the gate once the question has been heard
+            asked.add_done_callback(lambda f: self.capture.arm(timeout))
+        if self.scheduler.current() is None:
+            return await self.listen(timeout)
+
+        # The main loop owns the microphone; it hands us the next utterance once the
+        # question is out (emitted output is delivered in order, so this waits behind it)
+        loop = asyncio.get_event_loop()
+        answer = loop.create_future()
+        delivered = loop.create_future()
+
+        def register():
+            if not delivered.done():
+                self.pending_answers.append(answer)
+                delivered.set_result(None)
+
+        self.scheduler.emit(register)
         try:
-            self.engine.say(text)
-            self.engine.runAndWait()
-        except Exception as e:
-            logger.error(f"Error in speech synthesis: {e}")
-            self.app.add_to_conversation("[Speech synthesis failed]")
+            await delivered
+            return await asyncio.wait_for(answer, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            delivered.cancel()
+            if answer in self.pending_answers:
+                self.pending_answers.remove(answer)
+
+    def on_speech_error(self, error: Exception) -> None:
+        """Report a failed utterance from the speech worker."""
+        self.app.add_to_conversation("[Speech synthesis failed]")
+
+    def on_user_speech(self) -> None:
+        """Called from the capture thread when the user starts talking."""
+        if self.barge_in and self.speech.interrupt():
+            logger.info("Speech interrupted by user")
+
+    @property
+    def is_listening(self) -> bool:
+        return self.state.listening
+
+    def on_state_change(self, old: str, new: str) -> None:
+        """Show the assistant's state in the status label (called from whichever thread fired the event)."""
+        self.app.update_status(*STATUS_LABELS[new])
 
     def start_listening(self):
         """Start continuous listening."""
-        self.is_listening = True
-        self.app.update_status("Listening...", "blue")
+        if self.capture is not None:
+            self.capture.enabled.set()
+        self.state.fire(LISTEN_ON)
 
     def stop_listening(self):
         """Stop continuous listening."""
-        self.is_listening = False
-        self.app.update_status("Ready", "green")
+        if self.capture is not None:
+            self.capture.enabled.clear()
+        self.state.fire(LISTEN_OFF)
 
-    async def listen(self) -> Optional[str]:
-        """Listen for and recognize speech input."""
+    async def next_utterance(self, timeout: Optional[float] = None):
+        """The next captured utterance, or None if listening stops or ``timeout`` passes first."""
+        get = asyncio.ensure_future(self.utterances.get())
+        stopped = asyncio.ensure_future(self.state.wait_until(lambda state: not state.listening or state.exiting))
+        try:
+            await asyncio.wait((get, stopped), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stopped.cancel()
+            if not get.done():
+                get.cancel()  # The utterance, if one arrives, stays queued
+        if not get.done() or get.cancelled():
+            return None
+        return get.result()
+
+    async def listen(self, timeout: Optional[float] = None) -> Optional[str]:
+        """Wait for the next captured utterance and recognize it."""
         if not self.is_listening:
             return None
-            
-        with sr.Microphone() as source:
-            self.app.update_status("Listening...", "blue")
-            logger.info("Listening...")
-            
-            try:
-                audio = self.recognizer.listen(
-                    source, 
-                    timeout=5, 
-                    phrase_time_limit=8
-                )
-                self.app.update_status("Recognizing...", "orange")
-                logger.info("Recognizing...")
-                
-                query = self.recognizer.recognize_google(
-                    audio, 
-                    language='en-in'
-                ).lower()
-                
-                logger.info(f"Recognized: {query}")
-                self.app.add_to_conversation(f"You: {query}")
-                return query
-                
-            except sr.WaitTimeoutError:
-                logger.info("Listening timed out (no speech detected)")
-                return None
-            except sr.UnknownValueError:
-                self.speak("I didn't catch that. Could you please repeat?")
-                logger.warning("Speech recognition could not understand audio")
-                return None
-            except sr.RequestError as e:
-                self.speak("Sorry, I'm having trouble accessing the speech recognition service.")
-                logger.error(f"Could not request results from speech recognition service: {e}")
-                return None
-            except Exception as e:
-                logger.error(f"Error in recognition: {e}")
-                self.speak("Sorry, I encountered an error. Please try again.")
-                return None
-            finally:
+
+        logger.info("Listening...")
+        recognizing = False
+
+        try:
+            utterance = await self.next_utterance(timeout)
+            while utterance is not None and not self.barge_in and self.speech.overlaps(utterance.started_at):
+                # Half-duplex: what the mic heard while we were talking is our own voice
+                utterance = await self.next_utterance(timeout)
+            if utterance is None:
                 if self.is_listening:
-                    self.app.update_status("Listening...", "blue")
-                else:
-                    self.app.update_status("Ready", "green")
+                    logger.info("Listening timed out (no speech detected)")
+                return None
+            # A turn runs from the start of speech until its command finishes
+            self.tracer.begin_turn(utterance.started_at)
+            self.tracer.record('capture', time.monotonic() - utterance.started_at)
+            recognizing = True
+            self.state.fire(UTTERANCE)
+            logger.info("Recognizing...")
+
+            if self.preprocessor is not None and not self.recognizer.streaming:
+                # Trimmed, 16 kHz and denoised: less to upload or decode
+                with self.tracer.span('preprocess'):
+                    utterance = await asyncio.get_event_loop().run_in_executor(
+                        None, self.preprocessor.process, utterance)
+
+            try:
+                with self.tracer.span('recognize'):
+                    query = (await self.recognizer.recognize(utterance)).lower()
+            except Exception:
+                if self.speculator is not None:
+                    self.speculator.settle('', utterance.started_at)
+                raise
+            if self.speculator is not None:
+                self.speculator.settle(query, utterance.started_at)
+
+            logger.info(f"Recognized: {query}")
+            self.show("You", query, self.tracer.current_turn())
+            return query
+
+        except UnknownSpeechError:
+            self.speak("I didn't catch that. Could you please repeat?")
+            logger.warning("Speech recognition could not understand audio")
+            return None
+        except RecognizerUnavailableError as e:
+            self.speak("Sorry, I'm having trouble accessing the speech recognition service.")
+            logger.error(f"Could not request results from speech recognition service: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Error in recognition: {e}")
+            self.speak("Sorry, I encountered an error. Please try again.")
+            return None
+        finally:
+            if recognizing:
+                self.state.fire(RECOGNIZED)
 
     def greet(self) -> None:
         """Greet the user based on time of day."""
@@ -392,7 +745,7 @@ class UltimateVoiceAssistant:
         self.speak(greeting)
         self.speak("How can I help you today?")
 
-    def handle_wikipedia(self, query: str) -> None:
+    async def handle_wikipedia(self, query: str) -> None:
         """Handle Wikipedia search requests."""
         try:
             search_query = query.replace("wikipedia", "").strip()
@@ -402,22 +755,23 @@ class UltimateVoiceAssistant:
                 
             self.speak(f"Searching Wikipedia for {search_query}")
             
-            # Set language for Wikipedia
-            wikipedia.set_lang("en")
-            
             try:
-                results = wikipedia.summary(
-                    search_query, 
-                    sentences=2,
-                    auto_suggest=True
-                )
-                self.speak("According to Wikipedia")
-                self.speak(results)
-            except wikipedia.exceptions.DisambiguationError as e:
-                options = e.options[:3]  # Get first 3 options
-                self.speak(f"There are multiple options for {search_query}. Did you mean: {', '.join(options)}?")
-            except wikipedia.exceptions.PageError:
-                self.speak(f"Sorry, I couldn't find any information about {search_query}.")
+                # Cached on disk; fetched off the event loop on a miss
+                with self.tracer.span('wikipedia.lookup'):
+                    result = await self.wikipedia.summary(search_query)
+                if result.kind == DISAMBIGUATION:
+                    options = result.options[:3]  # Get first 3 options
+                    self.speak(f"There are multiple options for {search_query}. Did you mean: {', '.join(options)}?")
+                elif result.kind == MISSING:
+                    self.speak(f"Sorry, I couldn't find any information about {search_query}.")
+                else:
+                    if result.stale:
+                        self.speak("Wikipedia isn't answering, so this is from an earlier lookup.")
+                    self.speak("According to Wikipedia")
+                    self.speak(result.text)
+            except ServiceUnavailableError as e:
+                logger.warning(f"Wikipedia unavailable: {e}")
+                self.speak("Wikipedia isn't responding right now. Please try again in a little while.")
             except Exception as e:
                 logger.error(f"Wikipedia search error: {e}")
                 self.speak("Sorry, I encountered an error while searching Wikipedia.")
@@ -426,110 +780,163 @@ class UltimateVoiceAssistant:
             logger.error(f"Wikipedia error: {e}")
             self.speak("Sorry, I couldn't access Wikipedia right now.")
 
-    def open_youtube(self, _: str = None) -> None:
+    async def open_url(self, url: str) -> None:
+        """Open a URL in the configured browser."""
+        await self.launcher.open_url(url)
+
+    async def launch_application(self, path) -> None:
+        """Start a desktop application (a path or argv) without waiting for it."""
+        await self.launcher.spawn(path)
+
+    async def open_youtube(self, _: str = None) -> None:
         """Open YouTube in the default browser."""
         self.speak("Opening YouTube")
         try:
-            webbrowser.get(self.browser_path).open("https://youtube.com")
-        except webbrowser.Error as e:
+            await self.open_url("https://youtube.com")
+        except OSError as e:
             logger.error(f"Failed to open browser: {e}")
             self.speak("Sorry, I couldn't open the web browser.")
         except Exception as e:
             logger.error(f"Failed to open YouTube: {e}")
             self.speak("Sorry, I couldn't open YouTube.")
 
-    def open_google(self, _: str = None) -> None:
+    async def open_google(self, query: str = None) -> None:
         """Open Google in the default browser."""
+        rest = tokenize(query.lower().split('google', 1)[-1]) if query else []
+        if rest and rest[0] not in ('please', 'now'):  # "open google maps" is another site
+            await self.open_anything(query)
+            return
         self.speak("Opening Google")
         try:
-            webbrowser.get(self.browser_path).open("https://google.com")
-        except webbrowser.Error as e:
+            await self.open_url("https://google.com")
+        except OSError as e:
             logger.error(f"Failed to open browser: {e}")
             self.speak("Sorry, I couldn't open the web browser.")
         except Exception as e:
             logger.error(f"Failed to open Google: {e}")
             self.speak("Sorry, I couldn't open Google.")
 
-    def open_spotify(self, _: str = None) -> None:
+    async def open_spotify(self, _: str = None) -> None:
         """Open Spotify application."""
-        if self.spotify_path is None:
+        command = self.spotify_path
+        if command is None:
+            # Flatpak and snap installs only show up as desktop entries
+            target = self.launcher.resolve('spotify')
+            command = target.command if target is not None and target.kind == APP else None
+        if command is None:
             self.speak("Spotify is not configured on this system.")
             return
-            
+
         self.speak("Opening Spotify")
         try:
-            if platform.system() == 'Windows':
-                os.startfile(self.spotify_path)
-            else:
-                subprocess.Popen(self.spotify_path)
+            await self.launch_application(command)
         except Exception as e:
             logger.error(f"Failed to open Spotify: {e}")
             self.speak("Sorry, I couldn't open Spotify.")
 
+    async def open_anything(self, query: str = None) -> None:
+        """Open an installed application, a known website or a program by name."""
+        # Split on spaces only so spoken addresses like "example.com" stay whole
+        words = [word.strip(',!?') for word in query.lower().split()] if query else []
+        for verb in ('open', 'launch', 'start'):
+            if verb in words:
+                words = words[len(words) - words[::-1].index(verb):]
+                break
+        while words and words[0] in ('up', 'the', 'my', 'app', 'application'):
+            words.pop(0)
+        while words and words[-1] in ('app', 'application', 'please', 'now', 'up'):
+            words.pop()
+        if not words:
+            answer = await self.ask("What should I open?")
+            if not answer:
+                return
+            words = answer.lower().split()
+
+        name = ' '.join(words).strip('.')
+        with self.tracer.span('launcher.resolve'):
+            target = self.launcher.resolve(name)
+        if target is None:
+            self.speak(f"I couldn't find an app or site called {name}.")
+            return
+
+        self.speak(f"Opening {target.name}")
+        try:
+            if target.kind == SITE:
+                await self.open_url(target.command[0])
+            else:
+                await self.launch_application(target.command)
+        except Exception as e:
+            logger.error(f"Failed to open {target.name}: {e}")
+            self.speak(f"Sorry, I couldn't open {target.name}.")
+
+    def prefetch_wikipedia(self, text: str) -> Dict[str, Callable]:
+        """The summary lookup handle_wikipedia would make for this transcript."""
+        search_query = text.replace("wikipedia", "").strip()
+        if not search_query:
+            return {}
+        return {f'wikipedia:{normalize_query(search_query)}': functools.partial(self.wikipedia.summary, search_query)}
+
+    def prefetch_weather(self, text: str) -> Dict[str, Callable]:
+        """The current-weather lookups fetch_weather would make for this transcript."""
+        client = self.get_weather_client()
+        if client is None:
+            return {}
+        return {f'weather:{normalize_location(city)}': functools.partial(client.current, city)
+                for city in extract_locations(text)}
+
+    def get_weather_client(self) -> Optional[WeatherClient]:
+        """The WeatherAPI client for the configured key, or None without one."""
+        api_key = os.getenv("WEATHERAPI_KEY")
+        if not api_key:
+            return None
+        if self.weather is None or self.weather.api_key != api_key:
+            self.weather = WeatherClient(api_key)
+        return self.weather
+
     async def fetch_weather(self, query: str = None) -> None:
         """Fetch and announce weather information using WeatherAPI.com"""
         try:
             # Get API key from environment variables
-            api_key = os.getenv("WEATHERAPI_KEY")
-            if not api_key:
+            client = self.get_weather_client()
+            if client is None:
                 self.speak("Weather service is not properly configured.")
                 logger.error("WeatherAPI key missing from environment variables")
                 return
 
-            city = None
-            
-            # Extract city name from query if present
-            if query:
-                parts = query.split()
-                for i, part in enumerate(parts):
-                    if part in ['for', 'in', 'of'] and i < len(parts) - 1:
-                        city = parts[i+1]
-                        break
-            
+            # Known places (multi-word names, aliases, several cities) come from the gazetteer
+            locations = extract_locations(query) if query else []
+
             # If no city found in query, ask user
-            if not city:
-                self.speak("Which city's weather would you like to know?")
-                city_response = await self.listen()
+            if not locations:
+                city_response = await self.ask("Which city's weather would you like to know?")
                 if city_response:
-                    city = city_response
+                    locations = extract_locations(city_response) or [city_response]
                 else:
                     return
 
-            weather_url = f'http://api.weatherapi.com/v1/current.json?key={api_key}&q={city}&aqi=no'
-            
-            # Make API request
-            response = await asyncio.get_event_loop().run_in_executor(
-                None, 
-                requests.get, 
-                weather_url
-            )
-            
-            weather_info = response.json()
+            # Served from cache when fresh; concurrent asks for a city share one request
+            with self.tracer.span('weather.lookup'):
+                results = await client.current_many(locations)
+            if len(results) == 1 and isinstance(results[0], BaseException):
+                raise results[0]
 
-            if response.status_code == 200:
-                current = weather_info['current']
-                location = weather_info['location']
-                
-                temp = current['temp_c']
-                feels_like = current['feelslike_c']
-                humidity = current['humidity']
-                wind_speed = current['wind_kph']
-                condition = current['condition']['text']
-                
-                weather_report = (
-                    f"Current weather in {location['name']}: "
-                    f"Condition: {condition}. "
-                    f"Temperature: {temp}°C, "
-                    f"Feels like: {feels_like}°C. "
-                    f"Humidity: {humidity}%. "
-                    f"Wind speed: {wind_speed} km/h."
-                )
-                self.speak(weather_report)
-            else:
-                error_msg = weather_info.get('error', {}).get('message', 'Unknown error')
-                logger.error(f"Weather API error: {error_msg}")
-                self.speak(f"Sorry, I couldn't find weather information for {city}.")
-                
+            for city, response in zip(locations, results):
+                if isinstance(response, BaseException):
+                    logger.error(f"Weather lookup for {city} failed: {response}")
+                    self.speak(f"Sorry, I couldn't get the weather for {city}.")
+                elif response.status_code == 200:
+                    if response.stale_seconds:
+                        minutes = max(1, round(response.stale_seconds / 60))
+                        self.speak(f"The weather service isn't answering, so this is from {minutes} minutes ago.")
+                    self.speak(format_report(response.payload))
+                else:
+                    error_msg = response.payload.get('error', {}).get('message', 'Unknown error')
+                    logger.error(f"Weather API error: {error_msg}")
+                    self.speak(f"Sorry, I couldn't find weather information for {city}.")
+
+        except ServiceUnavailableError as e:
+            logger.warning(f"Weather service unavailable: {e}")
+            self.speak("The weather service isn't responding right now. Please try again in a little while.")
         except requests.exceptions.RequestException as e:
             logger.error(f"Weather API request failed: {e}")
             self.speak("Sorry, I'm having trouble accessing the weather service.")
@@ -540,6 +947,39 @@ class UltimateVoiceAssistant:
             logger.error(f"Error fetching weather: {e}")
             self.speak("Sorry, I encountered an error while fetching weather information.")
 
+    async def search_history(self, query: str = None) -> None:
+        """Find earlier conversation lines containing the words asked about."""
+        if self.history is None:
+            self.speak("Conversation history is turned off.")
+            return
+
+        words = tokenize(query.split('history', 1)[-1]) if query else []
+        while words and words[0] in ('for', 'about'):
+            words.pop(0)
+        if not words:
+            answer = await self.ask("What should I look for in our conversations?")
+            if not answer:
+                return
+            words = tokenize(answer)
+
+        terms = ' '.join(words)
+        loop = asyncio.get_event_loop()
+        with self.tracer.span('history.search'):
+            found = await loop.run_in_executor(None, self.history.search, terms, 20)
+        # Earlier searches and their answers repeat the same words; skip them
+        found = [entry for entry in found
+                 if 'search history' not in entry.text and not entry.text.startswith("I found ")]
+        if not found:
+            self.speak(f"I couldn't find {terms} in our conversations.")
+            return
+
+        for entry in found[:10]:
+            self.app.add_to_conversation(f"  {entry.when()} - {entry.line()}")
+        latest = found[0]
+        who = "you said" if latest.speaker == "You" else "I said"
+        count = f"{len(found)} matches" if len(found) > 1 else "one match"
+        self.speak(f"I found {count}. Most recently, on {latest.when()}, {who}: {latest.text}")
+
     def show_help(self, _: str = None) -> None:
         """Show available commands."""
         help_text = "Here's what I can do:\n"
@@ -547,10 +987,30 @@ class UltimateVoiceAssistant:
             help_text += f"- {command}: {info['description']}\n"
         self.speak(help_text)
 
+    def cancel_tasks(self, _: str = None) -> None:
+        """Abort queued and in-flight commands."""
+        cancelled = self.scheduler.cancel_all()
+        self.speech.interrupt()
+        for answer in self.pending_answers:
+            answer.cancel()
+        self.pending_answers.clear()
+        if cancelled:
+            self.speak("Okay, I've stopped.")
+
+    def on_command_result(self, task: CommandTask) -> None:
+        """Receive finished commands in the order they were heard."""
+        if task.state == EXPIRED:
+            self.speak("Sorry, that took too long.")
+        elif task.state == FAILED:
+            self.speak("Sorry, I had trouble executing that command.")
+        elif task.result is True:
+            self.exit_requested = True
+            self.state.fire(EXIT)
+
     def exit_assistant(self, _: str = None) -> bool:
         """Handle exit commands."""
         self.speak(f"Goodbye {self.user_name}, have a nice day!")
-        self.app.root.after(1000, self.app.root.destroy)
+        self.app.request_exit()
         return True
 
     async def process_command(self, command: str) -> bool:
@@ -558,52 +1018,115 @@ class UltimateVoiceAssistant:
         if not command:
             return False
             
-        # Check for exact matches first
-        for cmd, info in self.commands.items():
-            if cmd in command:
-                handler = info['handler']
-                try:
-                    if asyncio.iscoroutinefunction(handler):
-                        await handler(command)
-                    else:
-                        handler(command)
-                    
-                    if cmd in ['exit', 'quit', 'goodbye']:
-                        return True
-                    return False
-                except Exception as e:
-                    logger.error(f"Error executing command {cmd}: {e}")
-                    self.speak("Sorry, I had trouble executing that command.")
-                    return False
-        
-        # If no exact match, check for partial matches
-        for cmd, info in self.commands.items():
-            if any(word in command for word in cmd.split()):
-                handler = info['handler']
-                try:
+        with self.tracer.span('route'):
+            match = self.router.route(command)
+        if match is not None:
+            handler = match.info['handler']
+            try:
+                with self.tracer.span(f'handler.{match.key}'):
                     if asyncio.iscoroutinefunction(handler):
                         await handler(command)
                     else:
                         handler(command)
-                    return False
-                except Exception as e:
-                    logger.error(f"Error executing command {cmd}: {e}")
-                    self.speak("Sorry, I had trouble executing that command.")
-                    return False
-        
+
+                return match.key in ['exit', 'quit', 'goodbye']
+            except Exception as e:
+                logger.error(f"Error executing command {match.key}: {e}")
+                self.speak("Sorry, I had trouble executing that command.")
+                return False
+
         self.speak("I didn't understand that command. Say 'help' for available commands.")
         return False
 
+    def dispatch(self, command: str) -> None:
+        """Hand a recognized utterance to whoever is waiting for it."""
+        match = self.router.route(command)
+        if match is not None and match.info.get('immediate'):
+            match.info['handler'](command)
+            # "Stop" is never the answer to a pending question; it abandons it
+            for answer in self.pending_answers:
+                answer.cancel()
+            self.pending_answers.clear()
+            self.tracer.end_turn()
+            return
+
+        if self.pending_answers:
+            self.pending_answers.popleft().set_result(command)
+            self.tracer.end_turn()
+            return
+
+        deadline = match.info.get('deadline') if match is not None else None
+        self.scheduler.submit(command, functools.partial(self.run_turn, command), deadline=deadline)
+        self.tracer.detach()
+
+    def press(self, name: str, handler: Callable) -> CommandTask:
+        """Queue a quick command button's handler behind the commands already heard (on the event loop)."""
+        return self.scheduler.submit(name, functools.partial(self.run_button, handler))
+
+    async def run_button(self, handler: Callable) -> Any:
+        self.state.fire(COMMAND_START)
+        try:
+            result = handler("")
+            if asyncio.iscoroutine(result):
+                result = await result
+            return result
+        finally:
+            self.state.fire(COMMAND_END)
+
+    async def run_turn(self, command: str) -> bool:
+        """Process a command as the last stage of the turn it was heard in."""
+        self.state.fire(COMMAND_START)
+        try:
+            return await self.process_command(command)
+        finally:
+            self.state.fire(COMMAND_END)
+            self.tracer.end_turn()
+
     async def run(self):
         """Main execution loop for the voice assistant."""
+        self.start_capture()
         self.greet()
-        
-        while True:
-            if self.is_listening:
-                command = await self.listen()
-                if command and await self.process_command(command):
+        await self.finish_setup()
+
+        try:
+            while not self.exit_requested:
+                # Idle: sleep until the microphone is switched on or we are told to exit
+                await self.state.wait_until(lambda state: state.listening or state.exiting)
+                if self.state.exiting:
                     break
-            await asyncio.sleep(0.1)
+                command = await self.listen()
+                if command:
+                    self.dispatch(command)
+                else:
+                    self.tracer.end_turn()  # Nothing recognized; the turn ends here
+            # Let the goodbye be heard before the speech worker stops
+            try:
+                await asyncio.wait_for(self.state.wait_until(lambda state: not state.speaking), timeout=10)
+            except asyncio.TimeoutError:
+                pass
+        finally:
+            logger.info(f"Command scheduler stats: {self.scheduler.stats()}")
+            logger.info(f"Assistant state: {self.state.stats()}")
+            if self.speculator is not None:
+                logger.info(f"Speculative lookups: {self.speculator.stats()}")
+            if self.preprocessor is not None:
+                logger.info(f"Audio preprocessing: {self.preprocessor.stats()}")
+            if self.tracer.enabled:
+                logger.info(f"Stage latencies: {self.tracer.summary()}")
+                metrics_file = os.getenv('ASSISTANT_METRICS_FILE')
+                if metrics_file:
+                    self.tracer.write_prometheus(metrics_file)
+                self.tracer.shutdown()
+            self.stop_capture()
+            self.speech.stop()
+            if self.recognizer is not None:
+                self.recognizer.close()
+            if self.weather is not None:
+                self.weather.close()
+            self.wikipedia.close()
+            self.launcher.close()
+            if self.history is not None:
+                self.history.close()
 
 def main():
     """Main entry point for the application."""
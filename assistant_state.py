@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+IDLE = 'idle'
+LISTENING = 'listening'
+RECOGNIZING = 'recognizing'
+EXECUTING = 'executing'
+SPEAKING = 'speaking'
+STATES = (IDLE, LISTENING, RECOGNIZING, EXECUTING, SPEAKING)
+
+# Events and the activity counter each one moves
+LISTEN_ON = 'listen_on'          # UI: microphone switched on
+LISTEN_OFF = 'listen_off'        # UI: microphone switched off
+UTTERANCE = 'utterance'          # Capture: an utterance was taken off the queue for recognition
+RECOGNIZED = 'recognized'        # Recognizer finished, with or without a command
+COMMAND_START = 'command_start'  # A handler started running
+COMMAND_END = 'command_end'
+SPEECH_START = 'speech_start'    # Text was handed to the speech worker
+SPEECH_END = 'speech_end'
+EXIT = 'exit'
+
+_EFFECTS: Dict[str, Tuple[str, int]] = {
+    LISTEN_ON: ('listening', 1),
+    LISTEN_OFF: ('listening', 0),
+    UTTERANCE: ('recognizing', 1),
+    RECOGNIZED: ('recognizing', 0),
+    COMMAND_START: ('executing', +1),
+    COMMAND_END: ('executing', -1),
+    SPEECH_START: ('speaking', +1),
+    SPEECH_END: ('speaking', -1),
+    EXIT: ('exiting', 1),
+}
+_SET = (LISTEN_ON, LISTEN_OFF, UTTERANCE, RECOGNIZED, EXIT)
+
+
+class AssistantState:
+    """The assistant's control state, moved only by events from the UI, audio, commands and speech.
+
+    Commands and speech overlap with listening, so the state is the most
+    pressing activity under way: recognizing, then speaking, then executing,
+    then listening, otherwise idle. ``fire`` is safe from any thread; code on
+    the event loop awaits ``wait_until`` instead of polling, and nothing is
+    woken while no one waits.
+    """
+
+    def __init__(self, on_change: Optional[Callable[[str, str], None]] = None):
+        self.on_change = on_change
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.counts = {'listening': 0, 'recognizing': 0, 'executing': 0, 'speaking': 0, 'exiting': 0}
+        self.state = IDLE
+        self.transitions = 0
+        self.time_in_state: Dict[str, float] = {state: 0.0 for state in STATES}
+        self._entered = time.monotonic()
+        self._lock = threading.Lock()
+        self._waiters: List[Tuple[Callable[['AssistantState'], bool], asyncio.Future]] = []
+
+    @property
+    def listening(self) -> bool:
+        return bool(self.counts['listening'])
+
+    @property
+    def speaking(self) -> bool:
+        return bool(self.counts['speaking'])
+
+    @property
+    def exiting(self) -> bool:
+        return bool(self.counts['exiting'])
+
+    def _derive(self) -> str:
+        counts = self.counts
+        if counts['recognizing']:
+            return RECOGNIZING
+        if counts['speaking']:
+            return SPEAKING
+        if counts['executing']:
+            return EXECUTING
+        return LISTENING if counts['listening'] else IDLE
+
+    def fire(self, event: str) -> str:
+        """Apply an event and return the resulting state (safe from any thread)."""
+        key, value = _EFFECTS[event]
+        with self._lock:
+            if event in _SET:
+                self.counts[key] = value
+            else:
+                self.counts[key] = max(0, self.counts[key] + value)
+            new = self._derive()
+            old = self.state
+            if new != old:
+                now = time.monotonic()
+                self.time_in_state[old] += now - self._entered
+                self._entered = now
+                self.state = new
+                self.transitions += 1
+        if new != old:
+            logger.debug(f"State {old} -> {new} on {event}")
+            if self.on_change is not None:
+                self.on_change(old, new)
+        if self._waiters:
+            self._wake()
+        return new
+
+    def _wake(self) -> None:
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            on_loop = asyncio.get_running_loop() is loop
+        except RuntimeError:  # Not called from a running loop, e.g. the Tk or capture thread
+            on_loop = False
+        if on_loop:
+            self._check_waiters()
+        else:
+            loop.call_soon_threadsafe(self._check_waiters)
+
+    def _check_waiters(self) -> None:
+        for predicate, waiter in list(self._waiters):
+            if not waiter.done() and predicate(self):
+                waiter.set_result(None)
+
+    async def wait_until(self, predicate: Callable[['AssistantState'], bool]) -> None:
+        """Sleep until an event makes ``predicate(state)`` true; no timers are involved."""
+        if predicate(self):
+            return
+        self.loop = asyncio.get_event_loop()
+        entry = (predicate, self.loop.create_future())
+        self._waiters.append(entry)
+        try:
+            # Checked again in case an event landed before the waiter was registered
+            if not predicate(self):
+                await entry[1]
+        finally:
+            self._waiters.remove(entry)
+
+    def stats(self) -> Dict[str, float]:
+        """Transition count and seconds spent in each state so far."""
+        with self._lock:
+            spent = dict(self.time_in_state)
+            spent[self.state] += time.monotonic() - self._entered
+            transitions = self.transitions
+        stats: Dict[str, float] = {'transitions': transitions}
+        stats.update({f'{state}_s': round(seconds, 3) for state, seconds in spent.items()})
+        return stats
@@ -0,0 +1,459 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+import wave
+from array import array
+from typing import Callable, Optional
+
+try:
+    import audioop
+except ImportError:  # Removed from the standard library in Python 3.13
+    audioop = None
+
+logger = logging.getLogger(__name__)
+
+
+def frame_rms(frame: bytes, sample_width: int) -> float:
+    """Root-mean-square energy of a block of signed PCM samples."""
+    if audioop is not None:
+        return audioop.rms(frame, sample_width)
+    if sample_width != 2:
+        raise ValueError("Only 16-bit audio is supported without audioop")
+    samples = array('h', frame)
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(s * s for s in samples) / len(samples))
+
+
+class Utterance:
+    """A finished utterance handed from the capture thread to the event loop."""
+
+    __slots__ = ('frame_data', 'sample_rate', 'sample_width', 'started_at', 'ended_at', 'dropped_frames')
+
+    def __init__(self, frame_data: bytes, sample_rate: int, sample_width: int,
+                 started_at: float, ended_at: float, dropped_frames: int = 0):
+        self.frame_data = frame_data
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.started_at = started_at
+        self.ended_at = ended_at
+        self.dropped_frames = dropped_frames
+
+    @property
+    def duration(self) -> float:
+        return len(self.frame_data) / float(self.sample_rate * self.sample_width)
+
+    def to_audio_data(self):
+        """Wrap the PCM data for speech_recognition."""
+        import speech_recognition as sr
+        return sr.AudioData(self.frame_data, self.sample_rate, self.sample_width)
+
+
+class RingBuffer:
+    """Fixed-size ring of equally sized audio frames addressed by sequence number."""
+
+    def __init__(self, slots: int, frame_bytes: int):
+        self.slots = slots
+        self.frame_bytes = frame_bytes
+        self._buffer = bytearray(slots * frame_bytes)
+        self._lengths = [0] * slots
+        self.next_seq = 0
+
+    @property
+    def oldest_seq(self) -> int:
+        return max(0, self.next_seq - self.slots)
+
+    def write(self, frame: bytes) -> int:
+        """Store a frame, overwriting the oldest one, and return its sequence number."""
+        seq = self.next_seq
+        slot = seq % self.slots
+        offset = slot * self.frame_bytes
+        size = min(len(frame), self.frame_bytes)
+        self._buffer[offset:offset + size] = frame[:size]
+        self._lengths[slot] = size
+        self.next_seq += 1
+        return seq
+
+    def view(self, seq: int) -> memoryview:
+        """Zero-copy view of a stored frame."""
+        if not self.oldest_seq <= seq < self.next_seq:
+            raise IndexError(f"Frame {seq} is no longer buffered")
+        slot = seq % self.slots
+        offset = slot * self.frame_bytes
+        return memoryview(self._buffer)[offset:offset + self._lengths[slot]]
+
+    def read(self, start_seq: int, end_seq: int) -> bytes:
+        """Join frames [start_seq, end_seq) that are still buffered into one block."""
+        start_seq = max(start_seq, self.oldest_seq)
+        return b''.join(self.view(seq) for seq in range(start_seq, end_seq))
+
+
+class EnergyVAD:
+    """Energy-based voice activity detector with an adaptive noise floor."""
+
+    def __init__(self, frame_seconds: float, calibration_seconds: float = 1.0,
+                 start_seconds: float = 0.1, pause_seconds: float = 0.8,
+                 threshold_ratio: float = 2.5, min_threshold: float = 300.0):
+        self.calibration_frames = max(1, int(calibration_seconds / frame_seconds))
+        self.start_frames = max(1, int(start_seconds / frame_seconds))
+        self.pause_frames = max(1, int(pause_seconds / frame_seconds))
+        self.threshold_ratio = threshold_ratio
+        self.min_threshold = min_threshold
+        self.noise_floor = 0.0
+        self.in_speech = False
+        self._seen = 0
+        self._voiced_run = 0
+        self._silent_run = 0
+
+    @property
+    def calibrated(self) -> bool:
+        return self._seen >= self.calibration_frames
+
+    @property
+    def threshold(self) -> float:
+        return max(self.min_threshold, self.noise_floor * self.threshold_ratio)
+
+    def process(self, rms: float) -> Optional[str]:
+        """Feed one frame's energy; return 'start', 'end' or None."""
+        self._seen += 1
+        if self._seen <= self.calibration_frames:
+            # Running mean over the calibration window
+            self.noise_floor += (rms - self.noise_floor) / self._seen
+            return None
+
+        voiced = rms > self.threshold
+        if not self.in_speech:
+            if voiced:
+                self._voiced_run += 1
+                if self._voiced_run >= self.start_frames:
+                    self.in_speech = True
+                    self._silent_run = 0
+                    return 'start'
+            else:
+                self._voiced_run = 0
+                self.noise_floor = 0.95 * self.noise_floor + 0.05 * rms
+            return None
+
+        if voiced:
+            self._silent_run = 0
+            return None
+        self._silent_run += 1
+        if self._silent_run >= self.pause_frames:
+            self.in_speech = False
+            self._voiced_run = 0
+            return 'end'
+        return None
+
+    def reset(self) -> None:
+        """Forget any utterance in progress."""
+        self.in_speech = False
+        self._voiced_run = 0
+        self._silent_run = 0
+
+
+class MicrophoneSource:
+    """Audio source backed by a long-lived speech_recognition microphone stream."""
+
+    def __init__(self, device_index: Optional[int] = None, chunk_size: int = 1024):
+        self.device_index = device_index
+        self.chunk_size = chunk_size
+        self.sample_rate = None
+        self.sample_width = None
+        self._microphone = None
+        self._stream = None
+
+    @property
+    def frame_samples(self) -> int:
+        return self.chunk_size
+
+    def open(self) -> None:
+        import speech_recognition as sr
+        self._microphone = sr.Microphone(device_index=self.device_index, chunk_size=self.chunk_size)
+        self._stream = self._microphone.__enter__().stream
+        self.sample_rate = self._microphone.SAMPLE_RATE
+        self.sample_width = self._microphone.SAMPLE_WIDTH
+
+    def read(self) -> Optional[bytes]:
+        return self._stream.read(self.chunk_size)
+
+    def pause(self) -> None:
+        """Stop the device while nobody is listening so it raises no interrupts."""
+        self._stream.pyaudio_stream.stop_stream()
+
+    def resume(self) -> None:
+        self._stream.pyaudio_stream.start_stream()
+
+    def close(self) -> None:
+        if self._microphone is not None:
+            self._microphone.__exit__(None, None, None)
+            self._microphone = None
+            self._stream = None
+
+
+class WavFileSource:
+    """Fake microphone that plays back a WAV file, optionally paced in real time."""
+
+    def __init__(self, path: str, chunk_size: int = 1024, realtime: bool = True, loop: bool = False):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.realtime = realtime
+        self.loop = loop
+        self.sample_rate = None
+        self.sample_width = None
+        self._wave = None
+        self._next_deadline = 0.0
+
+    @property
+    def frame_samples(self) -> int:
+        return self.chunk_size
+
+    def open(self) -> None:
+        self._wave = wave.open(self.path, 'rb')
+        if self._wave.getnchannels() != 1:
+            raise ValueError(f"{self.path}: only mono WAV files are supported")
+        self.sample_rate = self._wave.getframerate()
+        self.sample_width = self._wave.getsampwidth()
+        self._next_deadline = time.monotonic()
+
+    def read(self) -> Optional[bytes]:
+        frame = self._wave.readframes(self.chunk_size)
+        if not frame and self.loop:
+            self._wave.rewind()
+            frame = self._wave.readframes(self.chunk_size)
+        if not frame:
+            return None
+        if self.realtime:
+            self._next_deadline += self.chunk_size / float(self.sample_rate)
+            delay = self._next_deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        return frame
+
+    def resume(self) -> None:
+        # Carry on in real time rather than catching up on the time spent paused
+        self._next_deadline = time.monotonic()
+
+    def close(self) -> None:
+        if self._wave is not None:
+            self._wave.close()
+            self._wave = None
+
+
+class AudioCaptureThread(threading.Thread):
+    """Keep the input stream open and push VAD-endpointed utterances onto an asyncio.Queue.
+
+    With a ``spotter`` the stream is gated by a wake phrase: voiced frames go
+    to the keyword spotter only, and audio is delivered once the phrase is
+    heard (the rest of that utterance, or the next one while armed). ``arm()``
+    opens the gate without the phrase, e.g. for the answer to a question.
+
+    Once the noise floor is calibrated the thread stops reading while
+    ``enabled`` is clear, pausing the source if it can, and sleeps until
+    listening is switched back on.
+
+    ``on_audio(started_at, frame)`` sees the frames of each utterance as they
+    are captured, for streaming recognition, then ``frame=None`` once the
+    utterance has been handed over or abandoned.
+    """
+
+    def __init__(self, source, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue,
+                 buffer_seconds: float = 30.0, preroll_seconds: float = 0.3,
+                 max_utterance_seconds: float = 8.0,
+                 on_speech_start: Optional[Callable[[], None]] = None,
+                 on_ready: Optional[Callable[[], None]] = None,
+                 spotter=None, arm_seconds: float = 8.0, min_command_seconds: float = 0.3,
+                 on_audio: Optional[Callable[[float, Optional[bytes]], None]] = None):
+        super().__init__(name="audio-capture", daemon=True)
+        self.source = source
+        self.loop = loop
+        self.queue = queue
+        self.buffer_seconds = buffer_seconds
+        self.preroll_seconds = preroll_seconds
+        self.max_utterance_seconds = max_utterance_seconds
+        self.on_speech_start = on_speech_start
+        self.on_ready = on_ready
+        self.on_audio = on_audio
+        self.spotter = spotter
+        self.arm_seconds = arm_seconds
+        self.min_command_seconds = min_command_seconds
+        self.enabled = threading.Event()
+        self.finished = threading.Event()
+        self._stop_requested = threading.Event()
+        # Arming is timed in captured audio so file playback behaves like a live mic
+        self.audio_time = 0.0
+        self._armed_until = 0.0
+
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.frames_spotted = 0
+        self.wake_words = 0
+        self.utterances_delivered = 0
+        self.utterances_dropped = 0
+        self.idle_waits = 0
+
+    @property
+    def armed(self) -> bool:
+        """Whether speech is currently passed through without the wake phrase."""
+        return self.spotter is None or self.audio_time < self._armed_until
+
+    def arm(self, seconds: Optional[float] = None) -> None:
+        """Let the next utterance through without the wake phrase (safe from any thread)."""
+        self._armed_until = self.audio_time + (self.arm_seconds if seconds is None else seconds)
+
+    def disarm(self) -> None:
+        self._armed_until = 0.0
+
+    def stop(self) -> None:
+        """Ask the capture loop to exit and release the device."""
+        self._stop_requested.set()
+        self.enabled.set()  # Wakes the loop if it is waiting for listening to resume
+
+    def run(self) -> None:
+        try:
+            self.source.open()
+        except Exception as e:
+            logger.error(f"Could not open audio source: {e}")
+            self.finished.set()
+            return
+
+        if self.spotter is not None:
+            try:
+                self.spotter.open(self.source.sample_rate)
+            except Exception as e:
+                logger.error(f"Wake word spotter unavailable, listening without it: {e}")
+                self.spotter = None
+
+        try:
+            self._capture()
+        except Exception as e:
+            logger.error(f"Audio capture failed: {e}")
+        finally:
+            self.source.close()
+            if self.spotter is not None:
+                self.spotter.close()
+            self.finished.set()
+
+    def _capture(self) -> None:
+        rate = self.source.sample_rate
+        width = self.source.sample_width
+        frame_samples = self.source.frame_samples
+        frame_seconds = frame_samples / float(rate)
+
+        ring = RingBuffer(max(1, int(self.buffer_seconds / frame_seconds)), frame_samples * width)
+        vad = EnergyVAD(frame_seconds)
+        preroll = int(self.preroll_seconds / frame_seconds)
+        max_frames = int(self.max_utterance_seconds / frame_seconds)
+        min_frames = int(self.min_command_seconds / frame_seconds)
+        start_seq = None
+        started_at = 0.0
+        waking = False  # Current voiced segment is only being checked for the wake phrase
+
+        while not self._stop_requested.is_set():
+            frame = self.source.read()
+            if frame is None:
+                break
+            seq = ring.write(frame)
+            self.frames_captured += 1
+            self.audio_time += frame_seconds
+            event = vad.process(frame_rms(frame, width))
+            if self.on_ready is not None and vad.calibrated:
+                self.on_ready()
+                self.on_ready = None
+
+            if not self.enabled.is_set():
+                if start_seq is not None:
+                    if not waking:
+                        self._stream(started_at, None)
+                    vad.reset()
+                    start_seq = None
+                    if waking:
+                        self.spotter.reset()
+                        waking = False
+                if vad.calibrated:
+                    self._wait_enabled()
+                continue
+
+            if event == 'start':
+                start_seq = max(ring.oldest_seq, seq + 1 - vad.start_frames - preroll)
+                started_at = time.monotonic()
+                waking = not self.armed
+                if waking:
+                    # Catch up on the frames that triggered the VAD, then stream the rest
+                    if self._spot(ring.view(s) for s in range(start_seq, seq + 1)):
+                        start_seq, started_at, waking = seq + 1, time.monotonic(), False
+                else:
+                    for s in range(start_seq, seq + 1):
+                        self._stream(started_at, ring.view(s))
+                    if self.on_speech_start is not None:
+                        self.on_speech_start()
+            elif waking:
+                if event == 'end':
+                    self.spotter.reset()
+                    start_seq, waking = None, False
+                elif self._spot((frame,)):
+                    start_seq, started_at, waking = seq + 1, time.monotonic(), False
+            elif start_seq is not None:
+                self._stream(started_at, frame)
+                if event == 'end' or seq + 1 - start_seq >= max_frames:
+                    voiced = seq + 1 - start_seq - (vad.pause_frames if event == 'end' else 0)
+                    # A short segment right after the wake phrase is just a pause; stay armed
+                    if self.spotter is None or voiced >= min_frames:
+                        self._emit(ring, start_seq, seq + 1, started_at)
+                        if self.spotter is not None:
+                            self.disarm()
+                    self._stream(started_at, None)
+                    if event != 'end':
+                        vad.reset()
+                    start_seq = None
+
+        if start_seq is not None and not waking and self.enabled.is_set():
+            # Source ran dry mid-utterance; hand over what we have
+            self._emit(ring, start_seq, ring.next_seq, started_at)
+            self._stream(started_at, None)
+
+    def _stream(self, started_at: float, frame) -> None:
+        if self.on_audio is not None:
+            self.on_audio(started_at, None if frame is None else bytes(frame))
+
+    def _wait_enabled(self) -> None:
+        """Block without reading until listening is switched on (or we are stopped)."""
+        self.idle_waits += 1
+        pause = getattr(self.source, 'pause', None)
+        if pause is not None:
+            pause()
+        self.enabled.wait()
+        resume = getattr(self.source, 'resume', None)
+        if resume is not None and not self._stop_requested.is_set():
+            resume()
+
+    def _spot(self, frames) -> bool:
+        """Feed voiced frames to the spotter; on the wake phrase, arm and report it."""
+        for frame in frames:
+            self.frames_spotted += 1
+            if self.spotter.accept(bytes(frame)):
+                self.wake_words += 1
+                self.arm()
+                logger.info("Wake word detected")
+                if self.on_speech_start is not None:
+                    self.on_speech_start()
+                return True
+        return False
+
+    def _emit(self, ring: RingBuffer, start_seq: int, end_seq: int, started_at: float) -> None:
+        lost = max(0, ring.oldest_seq - start_seq)
+        self.frames_dropped += lost
+        utterance = Utterance(ring.read(start_seq, end_seq), self.source.sample_rate,
+                              self.source.sample_width, started_at, time.monotonic(), lost)
+        self.loop.call_soon_threadsafe(self._deliver, utterance)
+
+    def _deliver(self, utterance: Utterance) -> None:
+        """Runs on the event loop thread."""
+        try:
+            self.queue.put_nowait(utterance)
+            self.utterances_delivered += 1
+        except asyncio.QueueFull:
+            self.utterances_dropped += 1
+            self.frames_dropped += int(utterance.duration * utterance.sample_rate / self.source.frame_samples)
+            logger.warning("Utterance queue full, dropping captured speech")
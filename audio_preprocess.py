@@ -0,0 +1,237 @@
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # Optional: without NumPy utterances reach the recognizer as captured
+    np = None
+
+from audio_capture import Utterance
+from latency import LatencyWindow
+
+logger = logging.getLogger(__name__)
+
+# Little-endian sample types by sample width; 8-bit WAV audio is unsigned
+_DTYPES = {1: 'u1', 2: '<i2', 4: '<i4'}
+
+
+class AudioPreprocessor:
+    """Trim, resample, denoise and normalize an utterance with NumPy before recognition.
+
+    Silence is trimmed on a read-only view of the captured bytes, so only
+    the speech (plus ``pad_seconds`` either side) is converted and carried
+    through the rest of the chain. That is resampled to ``target_rate``
+    (16 kHz, what the offline decoders expect and plenty for Google), and
+    scaled to a common peak level. With ``denoise`` the steady background
+    noise is subtracted from its spectrum, estimated from up to
+    ``noise_seconds`` of the silence trimmed off either side, or from the
+    last utterance that had enough silence; with neither, nothing is
+    subtracted. The result is a new 16-bit utterance with the same
+    timestamps. ``target_rate=None`` keeps the capture rate.
+    """
+
+    def __init__(self, target_rate: Optional[int] = 16000, trim: bool = True, pad_seconds: float = 0.15,
+                 trim_ratio: float = 3.0, min_level: float = 100.0, denoise: bool = False,
+                 noise_reduction: float = 1.0, noise_floor: float = 0.1, noise_seconds: float = 0.5,
+                 normalize: bool = True,
+                 peak: float = 0.9, max_gain: float = 10.0, fft_size: int = 512):
+        if np is None:
+            raise RuntimeError("audio preprocessing needs NumPy")
+        self.target_rate = target_rate
+        self.trim = trim
+        self.pad_seconds = pad_seconds
+        self.trim_ratio = trim_ratio
+        self.min_level = min_level
+        self.denoise = denoise
+        self.noise_reduction = noise_reduction
+        self.noise_floor = noise_floor
+        self.noise_seconds = noise_seconds
+        self.normalize = normalize
+        self.peak = peak
+        self.max_gain = max_gain
+        self.fft_size = fft_size
+        # Periodic sqrt-Hann for analysis and synthesis: overlap-adds to 1 at half-frame hops
+        self._window = np.sqrt(np.hanning(fft_size + 1)[:-1]).astype(np.float32)
+        # (sample rate, mean magnitude spectrum) of the latest background noise heard
+        self._noise_profile: Optional[Tuple[int, object]] = None
+
+        self.utterances = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.seconds_in = 0.0
+        self.seconds_out = 0.0
+        self.busy_seconds = 0.0
+        self.denoise_skipped = 0
+        self.latency = LatencyWindow()
+
+    def process(self, utterance: Utterance) -> Utterance:
+        """The preprocessed utterance; unsupported or empty audio is passed through."""
+        width = utterance.sample_width
+        if width not in _DTYPES or len(utterance.frame_data) < width:
+            return utterance
+        started = time.perf_counter()
+        result = self._process(utterance)
+        elapsed = time.perf_counter() - started
+        self.utterances += 1
+        self.bytes_in += len(utterance.frame_data)
+        self.bytes_out += len(result.frame_data)
+        self.seconds_in += utterance.duration
+        self.seconds_out += result.duration
+        self.busy_seconds += elapsed
+        self.latency.add(elapsed)
+        return result
+
+    def warm_up(self) -> None:
+        """Run a second of noise through the chain so the first utterance doesn't pay for NumPy's setup."""
+        noise = np.random.default_rng(0).normal(0, 200, 48000).astype('<i2')
+        profile, skipped = self._noise_profile, self.denoise_skipped
+        self._process(Utterance(noise.tobytes(), 48000, 2, 0.0, 0.0))
+        self._noise_profile, self.denoise_skipped = profile, skipped
+
+    def _process(self, utterance: Utterance) -> Utterance:
+        width = utterance.sample_width
+        samples = np.frombuffer(utterance.frame_data, dtype=_DTYPES[width], count=len(utterance.frame_data) // width)
+        rate = utterance.sample_rate
+        target_rate = self.target_rate or rate
+
+        silence: List = []
+        if self.trim:
+            start, end = self._speech_bounds(samples, rate, width)
+            # What is trimmed off is background noise: keep the stretches nearest the speech
+            keep = int(self.noise_seconds * rate)
+            silence = [samples[max(0, start - keep):start], samples[end:end + keep]]
+            samples = samples[start:end]
+        audio = resample(_to_float(samples, width), rate, target_rate)  # The only copy of the speech
+        if self.denoise:
+            noise = self._noise_spectrum([resample(_to_float(part, width), rate, target_rate)
+                                          for part in silence], target_rate)
+            if noise is not None:
+                audio = self._suppress_noise(audio, noise)
+            else:
+                self.denoise_skipped += 1
+        if self.normalize:
+            level = float(np.max(np.abs(audio))) if len(audio) else 0.0
+            if level > 0:
+                audio *= min(self.max_gain, self.peak * 32767 / level)
+        np.clip(audio, -32768, 32767, out=audio)
+        return Utterance(audio.astype('<i2').tobytes(), target_rate, 2, utterance.started_at,
+                         utterance.ended_at, utterance.dropped_frames)
+
+    def _speech_bounds(self, samples, rate: int, width: int) -> Tuple[int, int]:
+        """Sample range from shortly before the first voiced 10 ms block to after the last."""
+        block = max(1, rate // 100)
+        blocks = len(samples) // block
+        if blocks < 3:
+            return 0, len(samples)
+        view = samples[:blocks * block].reshape(blocks, block)
+        if width == 1:
+            centered = view.astype(np.float32) - 128.0
+            energy = np.einsum('ij,ij->i', centered, centered)
+        else:
+            energy = np.einsum('ij,ij->i', view, view, dtype=np.float64)  # No squared copy of the audio
+        rms = np.sqrt(energy / block)
+        scale = {1: 1.0 / 256, 2: 1.0, 4: 65536.0}[width]
+        threshold = max(np.percentile(rms, 10) * self.trim_ratio, self.min_level * scale)
+        voiced = np.flatnonzero(rms > threshold)
+        if not len(voiced):
+            return 0, len(samples)  # Nothing above the noise; let the recognizer decide
+        pad = int(self.pad_seconds * rate / block)
+        start = max(0, voiced[0] - pad) * block
+        end = len(samples) if voiced[-1] + 1 + pad >= blocks else (voiced[-1] + 1 + pad) * block
+        return start, end
+
+    def _noise_spectrum(self, silence: List, rate: int):
+        """Mean magnitude spectrum of the silence around the speech, else the last one measured at this rate."""
+        size = self.fft_size
+        frames = [np.lib.stride_tricks.sliding_window_view(part, size)[::size // 2]
+                  for part in silence if len(part) >= size]
+        if sum(len(part) for part in frames) >= 2:
+            noise = np.abs(np.fft.rfft(np.concatenate(frames) * self._window, axis=1)).mean(axis=0)
+            self._noise_profile = (rate, noise)
+            return noise
+        if self._noise_profile is not None and self._noise_profile[0] == rate:
+            return self._noise_profile[1]
+        return None  # No real non-speech to go on; subtracting a guess would eat the speech
+
+    def _suppress_noise(self, audio, noise):
+        """Spectral subtraction of the ``noise`` magnitude spectrum."""
+        size = self.fft_size
+        hop = size // 2
+        if len(audio) < size:
+            return audio
+        blocks = -(-len(audio) // hop) + 2
+        padded = np.zeros(blocks * hop, dtype=np.float32)
+        padded[hop:hop + len(audio)] = audio
+        frames = np.lib.stride_tricks.sliding_window_view(padded, size)[::hop] * self._window
+        spectrum = np.fft.rfft(frames, axis=1)
+        magnitude = np.abs(spectrum)
+        gain = 1.0 - self.noise_reduction * noise / np.maximum(magnitude, 1e-6)
+        spectrum *= np.maximum(gain, self.noise_floor)
+
+        cleaned = np.fft.irfft(spectrum, size, axis=1).astype(np.float32) * self._window
+        # Overlap-add at half-frame hops: each block is the tail of one frame plus the head of the next
+        halves = cleaned.reshape(len(cleaned), 2, hop)
+        out = np.zeros((blocks, hop), dtype=np.float32)
+        out[:-1] += halves[:, 0]
+        out[1:] += halves[:, 1]
+        return out.reshape(-1)[hop:hop + len(audio)]
+
+    def stats(self) -> Dict[str, float]:
+        """Bytes and seconds of audio in and out, and processing time per second of audio."""
+        stats = {
+            'utterances': self.utterances,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'seconds_in': round(self.seconds_in, 3),
+            'seconds_out': round(self.seconds_out, 3),
+            'denoise_skipped': self.denoise_skipped,
+            'ms_per_audio_second': round(self.busy_seconds * 1000 / self.seconds_in, 3) if self.seconds_in else 0.0,
+        }
+        stats.update(self.latency.summary((50, 95)))
+        return stats
+
+
+def _to_float(samples, width: int):
+    """Float32 copy of integer samples on the 16-bit scale."""
+    audio = samples.astype(np.float32)
+    if width == 1:
+        audio -= 128.0
+        audio *= 256.0
+    elif width == 4:
+        audio *= 1.0 / 65536
+    return audio
+
+
+def resample(audio, rate: int, target_rate: int):
+    """Float samples at ``rate`` resampled to ``target_rate``; low-pass filtered first when downsampling."""
+    if rate == target_rate or not len(audio):
+        return audio
+    if target_rate < rate:
+        audio = _lowpass(audio, 0.45 * target_rate / rate)
+        if rate % target_rate == 0:
+            return audio[::rate // target_rate]
+    length = int(len(audio) * target_rate / rate)
+    positions = np.arange(length) * (rate / target_rate)
+    return np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+
+
+def _lowpass(audio, cutoff: float, taps: int = 63):
+    """Windowed-sinc FIR low-pass (``cutoff`` in cycles per sample) applied with an FFT convolution."""
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+    kernel /= kernel.sum()
+    size = 1 << int(len(audio) + taps - 1).bit_length()
+    filtered = np.fft.irfft(np.fft.rfft(audio, size) * np.fft.rfft(kernel, size), size)
+    return filtered[(taps - 1) // 2:(taps - 1) // 2 + len(audio)].astype(np.float32)
+
+
+def create_preprocessor() -> Optional[AudioPreprocessor]:
+    """The stage configured by ASSISTANT_PREPROCESS, or None when it is off or NumPy is missing."""
+    if os.getenv('ASSISTANT_PREPROCESS', '1') != '1':
+        return None
+    if np is None:
+        logger.info("NumPy not installed; utterances go to the recognizer unprocessed")
+        return None
+    return AudioPreprocessor(denoise=os.getenv('ASSISTANT_DENOISE', '0') == '1')
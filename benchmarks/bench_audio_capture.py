@@ -0,0 +1,80 @@
+"""Benchmark the capture stage against a WAV-backed fake microphone.
+
+Reports per-turn latency (end of speech in the file -> utterance dequeued
+on the event loop), the hand-off latency alone, and dropped frames.
+
+Usage: python benchmarks/bench_audio_capture.py [--wav FILE] [--turns N]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_capture import AudioCaptureThread, WavFileSource  # noqa: E402
+from benchmarks.fixtures import speech_end_times, synth_pcm, write_wav  # noqa: E402
+
+
+async def run(wav_path: str, speech_ends, chunk_size: int):
+    loop = asyncio.get_event_loop()
+    queue = asyncio.Queue(maxsize=8)
+    source = WavFileSource(wav_path, chunk_size=chunk_size, realtime=True)
+    capture = AudioCaptureThread(source, loop, queue)
+    capture.enabled.set()
+    started = time.monotonic()
+    capture.start()
+
+    turn_latencies, handoff_latencies = [], []
+    while not (capture.finished.is_set() and queue.empty()):
+        try:
+            utterance = await asyncio.wait_for(queue.get(), timeout=0.5)
+        except asyncio.TimeoutError:
+            continue
+        received = time.monotonic()
+        handoff_latencies.append(received - utterance.ended_at)
+        index = len(turn_latencies)
+        if index < len(speech_ends):
+            turn_latencies.append(received - (started + speech_ends[index]))
+    return capture, turn_latencies, handoff_latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--wav', help="mono 16-bit WAV to replay (default: synthetic)")
+    parser.add_argument('--turns', type=int, default=4)
+    parser.add_argument('--chunk-size', type=int, default=1024)
+    args = parser.parse_args()
+
+    speech_ends = []
+    tmp = None
+    wav_path = args.wav
+    if wav_path is None:
+        segments = [('silence', 1.5)]
+        for _ in range(args.turns):
+            segments += [('speech', 1.2), ('silence', 1.5)]
+        speech_ends = speech_end_times(segments)
+        tmp = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
+        tmp.close()
+        write_wav(tmp.name, synth_pcm(segments))
+        wav_path = tmp.name
+
+    try:
+        capture, turns, handoffs = asyncio.run(run(wav_path, speech_ends, args.chunk_size))
+    finally:
+        if tmp is not None:
+            os.unlink(tmp.name)
+
+    print(f"frames captured:      {capture.frames_captured}")
+    print(f"frames dropped:       {capture.frames_dropped}")
+    print(f"utterances delivered: {capture.utterances_delivered} (dropped {capture.utterances_dropped})")
+    if turns:
+        print("turn latency ms:      " + ", ".join(f"{t * 1000:.0f}" for t in turns))
+    if handoffs:
+        print(f"hand-off latency ms:  max {max(handoffs) * 1000:.2f}")
+
+
+if __name__ == '__main__':
+    main()
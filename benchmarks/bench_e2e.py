@@ -0,0 +1,315 @@
+"""End-to-end benchmark: scripted multi-turn conversations through the full assistant.
+
+Everything outside the process is replaced: a real-time scripted microphone
+feeds the capture thread, a scripted recognizer returns what was "said", a
+timed TTS engine stands in for pyttsx3 and local stub servers play
+WeatherAPI and the MediaWiki API (the in-process FakeWikipedia is used when
+the wikipedia module is not installed). Each turn is measured from the
+moment the user stops talking to the first audio of the reply and to the
+end of the reply. Throughput, CPU time, peak memory and per-stage tracing
+percentiles are reported and saved as JSON under benchmarks/results/ so
+runs can be compared between commits.
+
+Usage: python benchmarks/bench_e2e.py [--sessions N] [--script FILE.jsonl] [--compare OLD.json]
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import ScriptedMicrophone, ScriptedRecognizer, TimedEngine  # noqa: E402
+from benchmarks.stubs import FakeWikipedia, weather_server, wikipedia_server  # noqa: E402
+from headless import TranscriptSink, read_sessions  # noqa: E402
+from latency import LatencyWindow  # noqa: E402
+from Main import UltimateVoiceAssistant  # noqa: E402
+from tracing import TRACER  # noqa: E402
+from weather_service import WeatherClient  # noqa: E402
+from wiki_service import SummaryCache, WikipediaService  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+SESSIONS = [
+    ['help', 'weather in london', 'wikipedia python', 'open youtube', 'weather in london', 'exit'],
+    ['wikipedia alan turing', 'weather in paris', 'open google', 'wikipedia mercury', 'goodbye'],
+    ['weather in tokyo', 'wikipedia zzz unknown topic', 'play something', 'weather in delhi', 'quit'],
+]
+
+
+class BenchAssistant(UltimateVoiceAssistant):
+    """The real assistant with its devices and services swapped for stand-ins."""
+
+    def __init__(self, microphone: ScriptedMicrophone, recognizer: ScriptedRecognizer,
+                 engine_factory: Callable[[], TimedEngine], wikipedia: WikipediaService,
+                 weather: WeatherClient):
+        self.microphone = microphone
+        self.bench_recognizer = recognizer
+        self.engine_factory = engine_factory
+        self.bench_wikipedia = wikipedia
+        self.capture_ready = False
+        self.launched: List[str] = []
+        super().__init__(TranscriptSink())
+        self.weather = weather
+
+    def init_tts_engine(self):
+        return self.engine_factory()
+
+    def init_recognizer(self):
+        return self.bench_recognizer
+
+    def get_spotify_path(self):
+        return None
+
+    def get_tts_cache(self):
+        return None
+
+    def get_history_store(self):
+        return None
+
+    def get_wikipedia_service(self):
+        return self.bench_wikipedia
+
+    def get_audio_source(self):
+        return self.microphone
+
+    def on_capture_ready(self) -> None:
+        self.capture_ready = True
+
+    async def open_url(self, url: str) -> None:
+        self.launched.append(url)
+
+    async def launch_application(self, path) -> None:
+        self.launched.append(path if isinstance(path, str) else ' '.join(path))
+
+    def quiet(self) -> bool:
+        """Nothing left to say: no speech queued and no command running (or it is waiting on us)."""
+        if not self.speech.idle:
+            return False
+        return (self.scheduler.in_flight == 0 and self.scheduler.queue_depth == 0) or bool(self.pending_answers)
+
+
+async def wait_until(predicate: Callable[[], bool], timeout: float, poll: float = 0.005) -> bool:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() >= deadline:
+            return False
+        await asyncio.sleep(poll)
+    return True
+
+
+def make_wikipedia(stub_url: Optional[str], latency: float, cache_dir: str, index: int) -> WikipediaService:
+    cache = SummaryCache(os.path.join(cache_dir, f'wikipedia-{index}.sqlite3'))
+    if stub_url is None:
+        return WikipediaService(cache, module=FakeWikipedia(latency))
+    service = WikipediaService(cache)
+    service.module.API_URL = f'{stub_url}/w/api.php'
+    return service
+
+
+async def run_session(index: int, commands: List[str], args, stub_urls: Dict[str, Optional[str]],
+                      cache_dir: str, first_audio: LatencyWindow, complete: LatencyWindow) -> Dict[str, Any]:
+    microphone = ScriptedMicrophone(speech_seconds=args.speech_seconds)
+    engines: List[TimedEngine] = []
+
+    def make_engine():
+        engine = TimedEngine(args.ms_per_char)
+        engines.append(engine)
+        return engine
+
+    assistant = BenchAssistant(
+        microphone,
+        ScriptedRecognizer(microphone, args.recognizer_latency),
+        make_engine,
+        make_wikipedia(stub_urls['wikipedia'], args.wiki_latency, cache_dir, index),
+        WeatherClient('bench', base_url=f"{stub_urls['weather']}/v1/current.json")
+    )
+    assistant.loop = asyncio.get_event_loop()
+    assistant.start_listening()
+    runner = asyncio.ensure_future(assistant.run())
+
+    outcome = {'session': index, 'turns': 0, 'timeouts': 0}
+    try:
+        await wait_until(lambda: assistant.capture_ready and assistant.recognizer is not None
+                         and engines and assistant.quiet(), args.turn_timeout)
+        engine = engines[0]
+        for command in commands:
+            await asyncio.sleep(args.think_time)
+            heard = len(engine.audio_started)
+            spoken = microphone.lines_spoken
+            microphone.say(command)
+            await wait_until(lambda: microphone.lines_spoken > spoken, args.turn_timeout)
+            speech_ended = microphone.speech_ended
+
+            replied = await wait_until(
+                lambda: any(t >= speech_ended for t, _ in engine.audio_started[heard:]) and assistant.quiet(),
+                args.turn_timeout
+            )
+            if not replied:
+                outcome['timeouts'] += 1
+                logging.warning(f"Session {index}: no reply to '{command}'")
+                continue
+            first_audio.add(next(t for t, _ in engine.audio_started[heard:] if t >= speech_ended) - speech_ended)
+            complete.add(time.monotonic() - speech_ended)
+            outcome['turns'] += 1
+    finally:
+        runner.cancel()
+        try:
+            await runner
+        except asyncio.CancelledError:
+            pass
+    return outcome
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(RESULTS_DIR), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if platform.system() == 'Darwin' else peak / 1024
+
+
+async def run_benchmark(args, sessions: List[List[str]]) -> Dict[str, Any]:
+    use_wikipedia_module = importlib.util.find_spec('wikipedia') is not None
+    first_audio = LatencyWindow(size=100000)
+    complete = LatencyWindow(size=100000)
+    outcomes = []
+
+    with weather_server(args.weather_latency) as weather, wikipedia_server(args.wiki_latency) as wiki, \
+            tempfile.TemporaryDirectory() as cache_dir:
+        stub_urls = {'weather': weather.url, 'wikipedia': wiki.url if use_wikipedia_module else None}
+        wall_started = time.perf_counter()
+        cpu_started = time.process_time()
+        for index, commands in enumerate(sessions):
+            outcomes.append(await run_session(index, commands, args, stub_urls, cache_dir,
+                                              first_audio, complete))
+        wall = time.perf_counter() - wall_started
+        cpu = time.process_time() - cpu_started
+        upstream = {'weather': weather.requests, 'wikipedia': wiki.requests}
+
+    turns = sum(o['turns'] for o in outcomes)
+    return {
+        'turns': turns,
+        'timeouts': sum(o['timeouts'] for o in outcomes),
+        'sessions': len(outcomes),
+        'wikipedia_backend': 'stub-server' if use_wikipedia_module else 'in-process-fake',
+        'first_audio': first_audio.summary((50, 95, 99)),
+        'complete': complete.summary((50, 95, 99)),
+        'wall_s': wall,
+        'turns_per_s': turns / wall if wall else 0.0,
+        'cpu_s': cpu,
+        'cpu_percent': 100.0 * cpu / wall if wall else 0.0,
+        'upstream_requests': upstream,
+        'stages': TRACER.summary(),
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Human-readable deltas for the headline numbers."""
+    rows = []
+    for section in ('first_audio', 'complete'):
+        for key, value in current[section].items():
+            old = baseline.get(section, {}).get(key)
+            if old:
+                rows.append(f"{section}.{key}: {old:.1f} -> {value:.1f} ({100.0 * (value - old) / old:+.1f}%)")
+    for key in ('turns_per_s', 'cpu_percent', 'peak_rss_mb', 'tracemalloc_peak_mb'):
+        old, value = baseline.get(key), current.get(key)
+        if old and value is not None:
+            rows.append(f"{key}: {old:.2f} -> {value:.2f} ({100.0 * (value - old) / old:+.1f}%)")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=len(SESSIONS), help="sessions to run (built-in scripts cycle)")
+    parser.add_argument('--script', help="JSONL sessions, as accepted by headless.py")
+    parser.add_argument('--think-time', type=float, default=0.3, help="pause before each user line")
+    parser.add_argument('--speech-seconds', type=float, default=0.8, help="length of each spoken line")
+    parser.add_argument('--recognizer-latency', type=float, default=0.3)
+    parser.add_argument('--weather-latency', type=float, default=0.08)
+    parser.add_argument('--wiki-latency', type=float, default=0.15)
+    parser.add_argument('--ms-per-char', type=float, default=1.0, help="TTS playback speed")
+    parser.add_argument('--turn-timeout', type=float, default=30.0)
+    parser.add_argument('--tracemalloc', action='store_true', help="also track Python heap peak (slower)")
+    parser.add_argument('--output', help="result file (default: benchmarks/results/e2e-<time>-<commit>.json)")
+    parser.add_argument('--compare', help="earlier result file to diff against")
+    parser.add_argument('--log-level', default='WARNING')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(args.log_level.upper())
+    os.environ['WEATHERAPI_KEY'] = 'bench'
+    TRACER.enabled = True
+
+    if args.script:
+        with open(args.script, encoding='utf-8') as stream:
+            sessions = [commands for _, commands in read_sessions(stream, jsonl=True)]
+    else:
+        sessions = [SESSIONS[i % len(SESSIONS)] for i in range(args.sessions)]
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    result = asyncio.run(run_benchmark(args, sessions))
+    if args.tracemalloc:
+        result['tracemalloc_peak_mb'] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+    result['peak_rss_mb'] = peak_rss_mb()
+
+    revision = git_revision()
+    result.update({
+        'commit': revision,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {k: v for k, v in vars(args).items() if k not in ('output', 'compare')},
+    })
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        output = os.path.join(RESULTS_DIR, f"e2e-{stamp}-{revision or 'unknown'}.json")
+    with open(output, 'w') as out:
+        json.dump(result, out, indent=2)
+
+    print(f"{result['turns']} turns in {result['sessions']} sessions, {result['timeouts']} timeouts "
+          f"(wikipedia: {result['wikipedia_backend']})")
+    print(f"  speech end -> first reply audio: {result['first_audio']}")
+    print(f"  speech end -> reply finished:    {result['complete']}")
+    print(f"  {result['turns_per_s']:.2f} turns/s, CPU {result['cpu_s']:.2f}s ({result['cpu_percent']:.1f}%), "
+          f"peak RSS {result['peak_rss_mb']} MB")
+    for stage, summary in result['stages'].items():
+        print(f"  {stage:<28} p50 {summary['p50_ms']:8.1f} ms  p95 {summary['p95_ms']:8.1f} ms  "
+              f"n={summary['count']}")
+    print(f"Saved {output}")
+
+    if args.compare:
+        with open(args.compare) as baseline:
+            for row in compare(result, json.load(baseline)):
+                print(f"  {row}")
+
+
+if __name__ == '__main__':
+    main()
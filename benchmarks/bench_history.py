@@ -0,0 +1,104 @@
+"""Benchmark the conversation history store: append cost, search and paging latency.
+
+Fills a history database with months of synthetic transcripts through the
+background writer, then times full-text search against a LIKE scan of the
+same table and paging backwards the way the conversation view does on scroll.
+
+Usage: python benchmarks/bench_history.py [--lines N] [--searches N]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history import HistoryStore  # noqa: E402
+from latency import LatencyWindow  # noqa: E402
+
+TOPICS = ['london', 'paris', 'tokyo', 'python', 'alan turing', 'mercury', 'jazz', 'spotify', 'youtube',
+          'photosynthesis', 'volcano', 'chess', 'marathon', 'quantum computing', 'renaissance art']
+USER = ['weather in {}', 'wikipedia {}', 'tell me about {}', 'open {}', 'what is {}']
+ASSISTANT = ['Current weather in {}: Condition: Partly cloudy. Temperature: 18.0°C.',
+             '{} is a topic with a summary. This is its second sentence.', 'Searching Wikipedia for {}',
+             'Opening {}', "I didn't understand that command. Say 'help' for available commands."]
+
+
+def transcript(lines: int, seed: int = 8):
+    rng = random.Random(seed)
+    for n in range(lines):
+        topic = rng.choice(TOPICS) if rng.random() < 0.7 else f'topic{rng.randrange(20000)}'
+        if n % 2 == 0:
+            yield 'You', rng.choice(USER).format(topic)
+        else:
+            yield 'Assistant', rng.choice(ASSISTANT).format(topic)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=300000, help="about 6 months at 50 turns a day")
+    parser.add_argument('--searches', type=int, default=200)
+    parser.add_argument('--page-size', type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'history.sqlite3')
+        store = HistoryStore(path)
+        append = LatencyWindow(size=args.lines)
+        started = time.perf_counter()
+        for speaker, text in transcript(args.lines):
+            t = time.perf_counter()
+            store.append(speaker, text)
+            append.add(time.perf_counter() - t)
+        store.flush()
+        fill = time.perf_counter() - started
+        size_mb = sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp)) / 1e6
+
+        # Common topics stop after a few index pages either way; rare words need the whole table
+        rng = random.Random(9)
+        queries = {
+            'common': [rng.choice(TOPICS) for _ in range(args.searches)],
+            'rare': [f'topic{rng.randrange(20000)}' for _ in range(args.searches)],
+        }
+        results = {}
+        conn = sqlite3.connect(path)
+        for kind, batch in queries.items():
+            fts, scan = LatencyWindow(size=len(batch)), LatencyWindow(size=len(batch))
+            for query in batch:
+                t = time.perf_counter()
+                store.search(query)
+                fts.add(time.perf_counter() - t)
+            for query in batch[:max(1, len(batch) // 10)]:
+                t = time.perf_counter()
+                conn.execute('SELECT id, created, speaker, text FROM messages WHERE text LIKE ?'
+                             ' ORDER BY id DESC LIMIT 20', (f'%{query}%',)).fetchall()
+                scan.add(time.perf_counter() - t)
+            results[kind] = fts.summary((50, 99)), scan.summary((50, 99))
+        conn.close()
+
+        paging = LatencyWindow()
+        oldest = None
+        for _ in range(200):
+            t = time.perf_counter()
+            entries = store.page(before=oldest, limit=args.page_size)
+            paging.add(time.perf_counter() - t)
+            if not entries:
+                break
+            oldest = entries[0].id
+        store.close()
+
+    a, p = append.summary((50, 99)), paging.summary((50, 99))
+    print(f"{args.lines} lines written in {fill:.2f} s ({args.lines / fill:,.0f} lines/s), {size_mb:.1f} MB on disk")
+    print(f"{'':26}{'p50 ms':>10}{'p99 ms':>10}")
+    print(f"{'append (caller)':26}{a['p50_ms']:10.4f}{a['p99_ms']:10.4f}")
+    for kind, (fts, scan) in results.items():
+        print(f"{'search ' + kind + ' (FTS5)':26}{fts['p50_ms']:10.2f}{fts['p99_ms']:10.2f}")
+        print(f"{'search ' + kind + ' (LIKE)':26}{scan['p50_ms']:10.2f}{scan['p99_ms']:10.2f}")
+    print(f"{'page of ' + str(args.page_size):26}{p['p50_ms']:10.2f}{p['p99_ms']:10.2f}")
+
+
+if __name__ == '__main__':
+    main()
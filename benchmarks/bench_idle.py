@@ -0,0 +1,256 @@
+"""Benchmark what an idle assistant costs: wakeups per second and CPU with the microphone off.
+
+Runs the full assistant core (capture thread on a real-time scripted
+microphone, speech worker, command scheduler and a UI update channel on a
+stand-in Tk event loop) until it has greeted the user and gone quiet, then
+counts context switches of every thread and CPU time over the idle window.
+The "polling" run reproduces the previous control loop for comparison: the
+run loop checks the listening flag ten times a second, the capture thread
+keeps reading the muted microphone and the UI channel drains 30 times a
+second. Also reported is how long after the mic button the first frame is
+read, and the reply time for one command once listening.
+
+Usage: python benchmarks/bench_idle.py [--seconds S] [--mode polling|event|both]
+"""
+import argparse
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assistant_state import IDLE, LISTENING  # noqa: E402
+from benchmarks.bench_e2e import BenchAssistant, make_wikipedia, wait_until  # noqa: E402
+from benchmarks.fakes import ScriptedMicrophone, ScriptedRecognizer, TimedEngine  # noqa: E402
+from headless import TranscriptSink  # noqa: E402
+from ui_channel import UIUpdateChannel  # noqa: E402
+from weather_service import WeatherClient  # noqa: E402
+
+
+class EventLoopThread(threading.Thread):
+    """Stand-in for Tk's main loop: runs ``after`` callbacks on one thread and sleeps until the next is due."""
+
+    def __init__(self):
+        super().__init__(name="fake-tk", daemon=True)
+        self.callbacks = 0
+        self._heap = []
+        self._ids = itertools.count()
+        self._cancelled = set()
+        self._cond = threading.Condition()
+        self._stopped = False
+
+    def after(self, ms: int, func) -> int:
+        with self._cond:
+            after_id = next(self._ids)
+            heapq.heappush(self._heap, (time.monotonic() + ms / 1000.0, after_id, func))
+            self._cond.notify()
+        return after_id
+
+    def after_cancel(self, after_id: int) -> None:
+        with self._cond:
+            self._cancelled.add(after_id)
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    now = time.monotonic()
+                    if self._heap and self._heap[0][0] <= now:
+                        break
+                    self._cond.wait(self._heap[0][0] - now if self._heap else None)
+                if self._stopped:
+                    return
+                _, after_id, func = heapq.heappop(self._heap)
+                if after_id in self._cancelled:
+                    self._cancelled.discard(after_id)
+                    continue
+            self.callbacks += 1
+            func()
+
+
+class FakeText:
+    def __init__(self):
+        self.lines = 0
+
+    def yview(self):
+        return 0.0, 1.0
+
+    def configure(self, **options):
+        pass
+
+    def insert(self, index, text):
+        self.lines += text.count('\n')
+
+    def index(self, index):
+        return f'{self.lines + 1}.0'
+
+    def delete(self, first, last):
+        pass
+
+    def see(self, index):
+        pass
+
+
+class FakeLabel:
+    def config(self, **options):
+        pass
+
+
+class ChannelSink(TranscriptSink):
+    """Sends the assistant's conversation lines and status through a UI update channel."""
+
+    def __init__(self, channel: UIUpdateChannel):
+        super().__init__()
+        self.channel = channel
+
+    def add_to_conversation(self, text: str, entry_id: Optional[int] = None) -> None:
+        super().add_to_conversation(text, entry_id)
+        self.channel.add_line(text, entry_id)
+
+    def update_status(self, text: str, color: str) -> None:
+        super().update_status(text, color)
+        self.channel.set_status(text, color)
+
+
+class PollingAssistant(BenchAssistant):
+    """The assistant with the control loop it had before: poll the listening flag every 100 ms."""
+
+    def start_capture(self) -> None:
+        super().start_capture()
+        self.capture._wait_enabled = lambda: None  # Keep reading the muted microphone, as before
+
+    async def run(self):
+        self.start_capture()
+        self.greet()
+        await self.finish_setup()
+        try:
+            while not self.exit_requested:
+                if self.is_listening:
+                    command = await self.listen(timeout=5)
+                    if command:
+                        self.dispatch(command)
+                        continue
+                    self.tracer.end_turn()
+                await asyncio.sleep(0.1)
+        finally:
+            self.stop_capture()
+            self.speech.stop()
+            self.wikipedia.close()
+
+
+def context_switches() -> Dict[str, int]:
+    """Voluntary plus involuntary context switches of each thread of this process (Linux)."""
+    counts = {}
+    for tid in os.listdir('/proc/self/task'):
+        try:
+            with open(f'/proc/self/task/{tid}/status') as status:
+                counts[tid] = sum(int(line.split()[1]) for line in status if 'ctxt_switches' in line)
+        except OSError:
+            continue  # Thread exited
+    return counts
+
+
+async def measure(mode: str, args, cache_dir: str) -> Dict[str, float]:
+    tk_loop = EventLoopThread()
+    tk_loop.start()
+    channel = UIUpdateChannel(tk_loop, FakeText(), FakeLabel())
+    channel.on_demand = mode == 'event'
+    channel.start()
+
+    microphone = ScriptedMicrophone()
+    engines = []
+
+    def make_engine():
+        engine = TimedEngine(args.ms_per_char)
+        engines.append(engine)
+        return engine
+
+    cls = PollingAssistant if mode == 'polling' else BenchAssistant
+    assistant = cls(microphone, ScriptedRecognizer(microphone, 0.05), make_engine,
+                    make_wikipedia(None, 0.0, cache_dir, 0), WeatherClient('bench'))
+    assistant.app = ChannelSink(channel)
+    assistant.loop = asyncio.get_event_loop()
+    runner = asyncio.ensure_future(assistant.run())
+    result: Dict[str, float] = {}
+    try:
+        await wait_until(lambda: assistant.capture_ready and engines and assistant.quiet()
+                         and assistant.state.state == IDLE, 30)
+        await asyncio.sleep(1.0)  # Let the last status update drain
+
+        switches = context_switches()
+        cpu, wall, ticks = time.process_time(), time.monotonic(), tk_loop.callbacks
+        await asyncio.sleep(args.seconds)
+        wall = time.monotonic() - wall
+        after = context_switches()
+        result['wakeups_per_s'] = sum(after[t] - switches[t] for t in after if t in switches) / wall
+        result['cpu_pct'] = 100.0 * (time.process_time() - cpu) / wall
+        result['ui_drains_per_s'] = (tk_loop.callbacks - ticks) / wall
+
+        # Mic button to the first frame read, then one command end to end
+        frames = assistant.capture.frames_captured
+        pressed = time.monotonic()
+        assistant.start_listening()
+        await wait_until(lambda: assistant.capture.frames_captured > frames, 5, poll=0.0005)
+        result['mic_on_to_first_frame_ms'] = (time.monotonic() - pressed) * 1000
+        await wait_until(lambda: assistant.state.state == LISTENING, 5)
+        engine = engines[0]
+        heard = len(engine.audio_started)
+        microphone.say('help')
+        await wait_until(lambda: microphone.lines_spoken, 10)
+        ended = microphone.speech_ended
+        await wait_until(lambda: any(t >= ended for t, _ in engine.audio_started[heard:]), 10)
+        replies = [t for t, _ in engine.audio_started[heard:] if t >= ended]
+        result['speech_end_to_reply_ms'] = (replies[0] - ended) * 1000 if replies else float('nan')
+    finally:
+        runner.cancel()
+        try:
+            await runner
+        except asyncio.CancelledError:
+            pass
+        channel.stop()
+        tk_loop.stop()
+        await asyncio.sleep(0.5)  # Let the stopped threads exit before the next run
+    return result
+
+
+async def run(args) -> Dict[str, Dict[str, float]]:
+    modes = ['polling', 'event'] if args.mode == 'both' else [args.mode]
+    results = {}
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for mode in modes:
+            results[mode] = await measure(mode, args, cache_dir)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=10.0, help="length of the idle window")
+    parser.add_argument('--mode', choices=('polling', 'event', 'both'), default='both')
+    parser.add_argument('--ms-per-char', type=float, default=0.5, help="TTS playback speed")
+    args = parser.parse_args()
+    if not os.path.isdir('/proc/self/task'):
+        parser.error("counting wakeups needs Linux /proc")
+    logging.getLogger().setLevel(logging.WARNING)
+
+    results = asyncio.run(run(args))
+    rows = ('wakeups_per_s', 'cpu_pct', 'ui_drains_per_s', 'mic_on_to_first_frame_ms', 'speech_end_to_reply_ms')
+    print(f"idle for {args.seconds:.0f} s with the microphone off")
+    print(f"{'':28}" + ''.join(f"{mode:>12}" for mode in results))
+    for row in rows:
+        print(f"{row:28}" + ''.join(f"{results[mode][row]:12.2f}" for mode in results))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Micro-benchmark: intent routing cost as the command table grows.
+
+Usage: python benchmarks/bench_intent_router.py [--repeat N]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intent_router import IntentRouter  # noqa: E402
+
+BASE_COMMANDS = [
+    'wikipedia', 'open youtube', 'open google', 'open spotify', 'weather',
+    'goodbye', 'exit', 'quit', 'help',
+]
+
+UTTERANCES = [
+    "what's the weather in london today",
+    "search wikipedia for the history of the printing press",
+    "please open youtube",
+    "could you play something on spotify",
+    "this sentence matches nothing at all in the table",
+]
+
+
+def build_commands(size: int) -> dict:
+    """Build a command table with the real commands padded by synthetic ones."""
+    commands = {phrase: {'handler': None, 'description': phrase} for phrase in BASE_COMMANDS}
+    for i in range(size - len(commands)):
+        phrase = f"action{i} target{i}"
+        commands[phrase] = {'handler': None, 'description': phrase}
+    return commands
+
+
+def linear_route(commands: dict, command: str):
+    """The previous substring scan, kept for comparison."""
+    for cmd in commands:
+        if cmd in command:
+            return cmd
+    for cmd in commands:
+        if any(word in command for word in cmd.split()):
+            return cmd
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'commands':>9} {'router us/call':>15} {'linear us/call':>15}")
+    for size in (10, 100, 1000):
+        commands = build_commands(size)
+        router = IntentRouter(commands)
+
+        def run_router():
+            for utterance in UTTERANCES:
+                router.route(utterance)
+
+        def run_linear():
+            for utterance in UTTERANCES:
+                linear_route(commands, utterance)
+
+        calls = args.repeat * len(UTTERANCES)
+        router_time = min(timeit.repeat(run_router, number=args.repeat, repeat=3)) / calls
+        linear_time = min(timeit.repeat(run_linear, number=max(1, args.repeat // 10), repeat=3))
+        linear_time /= max(1, args.repeat // 10) * len(UTTERANCES)
+        print(f"{size:>9} {router_time * 1e6:>15.2f} {linear_time * 1e6:>15.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""Benchmark the application launcher: index build, name lookup and loop stalls while spawning.
+
+Builds a fake desktop with generated .desktop entries and a directory of
+allowed executables, scans it, then times resolving exact, prefix and misheard names
+against what "open X" used to cost: a ``which`` subprocess per program and
+a ``webbrowser.get`` per URL. Finally it starts short-lived programs from a
+running event loop, once with Popen on the loop thread and once through the
+launcher's worker thread, and measures how late a 1 ms ticker wakes up.
+
+Usage: python benchmarks/bench_launcher.py [--apps N] [--programs N] [--lookups N] [--spawns N]
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import webbrowser
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from latency import LatencyWindow  # noqa: E402
+from launcher import Launcher  # noqa: E402
+
+WORDS = ['photo', 'studio', 'code', 'music', 'office', 'writer', 'paint', 'mail', 'chat', 'notes', 'video',
+         'player', 'terminal', 'draw', 'calc', 'maps', 'reader', 'sync', 'cloud', 'game', 'editor', 'viewer']
+
+
+def misspell(name: str, rng: random.Random) -> str:
+    """A plausible mishearing: one letter swapped or a space dropped into the name."""
+    letters = list(name)
+    i = rng.randrange(1, len(letters) - 1)
+    if rng.random() < 0.5:
+        letters[i] = rng.choice('aeiou')
+    else:
+        letters.insert(i, ' ')
+    return ''.join(letters)
+
+
+def make_desktop(root: str, apps: int, programs: int, rng: random.Random):
+    """Write .desktop entries and executables; returns (app names, program names, program directory)."""
+    applications = os.path.join(root, 'share', 'applications')
+    bin_dir = os.path.join(root, 'bin')
+    os.makedirs(applications)
+    os.makedirs(bin_dir)
+    names = []
+    for n in range(apps):
+        name = f"{rng.choice(WORDS).title()}{rng.choice(WORDS)} {rng.choice(WORDS).title()} {n}"
+        names.append(name)
+        with open(os.path.join(applications, f'app{n}.desktop'), 'w') as entry:
+            entry.write(f"[Desktop Entry]\nType=Application\nName={name}\nExec=/opt/app{n}/run %U\n"
+                        f"Keywords={rng.choice(WORDS)};{rng.choice(WORDS)};\n")
+    program_names = []
+    for n in range(programs):
+        name = f'tool{n}'
+        program_names.append(name)
+        path = os.path.join(bin_dir, name)
+        with open(path, 'w') as script:
+            script.write('#!/bin/sh\nexit 0\n')
+        os.chmod(path, 0o755)
+    return names, program_names, bin_dir
+
+
+def time_calls(fn, args) -> LatencyWindow:
+    window = LatencyWindow(size=len(args))
+    for arg in args:
+        started = time.perf_counter()
+        fn(arg)
+        window.add(time.perf_counter() - started)
+    return window
+
+
+async def loop_lag(spawn, count: int) -> LatencyWindow:
+    """Wake-up lateness of a 1 ms ticker while ``spawn`` runs ``count`` times."""
+    lag = LatencyWindow(size=count * 200)
+    done = False
+
+    async def ticker():
+        while not done:
+            expected = time.perf_counter() + 0.001
+            await asyncio.sleep(0.001)
+            lag.add(max(0.0, time.perf_counter() - expected))
+
+    task = asyncio.ensure_future(ticker())
+    for _ in range(count):
+        await spawn()
+        await asyncio.sleep(0.005)
+    done = True
+    await task
+    return lag
+
+
+async def spawn_benchmark(launcher: Launcher, program: str, count: int):
+    children = []
+
+    async def direct():
+        children.append(subprocess.Popen([program], stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                         stderr=subprocess.DEVNULL, close_fds=True, start_new_session=True))
+
+    async def offloaded():
+        await launcher.spawn([program])
+
+    await offloaded()  # Start the worker thread outside the measurement
+    direct_lag = await loop_lag(direct, count)
+    offloaded_lag = await loop_lag(offloaded, count)
+    for child in children:
+        child.wait()
+    return direct_lag, offloaded_lag
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--apps', type=int, default=400)
+    parser.add_argument('--programs', type=int, default=3000)
+    parser.add_argument('--lookups', type=int, default=2000)
+    parser.add_argument('--spawns', type=int, default=50)
+    parser.add_argument('--which', type=int, default=50, help="which subprocesses to time for the baseline")
+    parser.add_argument('--heap-mb', type=int, default=300, help="memory to hold while spawning, like loaded models")
+    args = parser.parse_args()
+    rng = random.Random(20)
+    heap = [bytearray(1024 * 1024) for _ in range(args.heap_mb)]  # noqa: F841 - touched pages make fork slower
+
+    with tempfile.TemporaryDirectory() as tmp:
+        apps, programs, bin_dir = make_desktop(tmp, args.apps, args.programs, rng)
+        os.environ['XDG_DATA_HOME'] = os.path.join(tmp, 'share')
+        os.environ['XDG_DATA_DIRS'] = os.path.join(tmp, 'none')
+        os.environ['PATH'] = bin_dir + os.pathsep + os.environ.get('PATH', '')  # For the which baseline
+
+        launcher = Launcher('xdg-open %s', program_dirs=[bin_dir])
+        started = time.perf_counter()
+        size = launcher.scan()
+        scan = time.perf_counter() - started
+
+        picks = [rng.choice(apps) for _ in range(args.lookups)]
+        queries = {
+            'exact app name': picks,
+            'exact program': [rng.choice(programs) for _ in range(args.lookups)],
+            'word prefixes': [' '.join(word[:4] for word in name.split()) for name in picks],
+            'misheard': [misspell(name, rng) for name in picks],
+            'unknown': [f'nothing{n} here' for n in range(args.lookups)],
+        }
+        results, hits = {}, {}
+        for kind, batch in queries.items():
+            results[kind] = time_calls(launcher.resolve, batch)
+            if kind in ('exact app name', 'word prefixes', 'misheard'):
+                hits[kind] = sum(1 for query, name in zip(batch, picks)
+                                 if getattr(launcher.resolve(query), 'name', None) == name) / len(batch)
+
+        which = time_calls(lambda name: subprocess.run(['which', name], stdout=subprocess.DEVNULL),
+                           [rng.choice(programs) for _ in range(args.which)])
+        browser = time_calls(lambda url: webbrowser.get('xdg-open %s'), ['https://youtube.com'] * args.lookups)
+
+        direct_lag, offloaded_lag = asyncio.get_event_loop().run_until_complete(
+            spawn_benchmark(launcher, os.path.join(bin_dir, programs[0]), args.spawns))
+        launcher.close()
+
+    print(f"scanned {args.apps} desktop entries and {args.programs} programs "
+          f"({size} targets) in {scan * 1000:.1f} ms")
+    print(f"{'':28}{'p50 ms':>10}{'p99 ms':>10}{'found':>8}")
+    for kind, window in results.items():
+        s = window.summary((50, 99))
+        found = f"{hits[kind]:8.0%}" if kind in hits else ''
+        print(f"{'resolve ' + kind:28}{s['p50_ms']:10.4f}{s['p99_ms']:10.4f}{found}")
+    for label, window in (('which subprocess (before)', which), ('webbrowser.get (before)', browser)):
+        s = window.summary((50, 99))
+        print(f"{label:28}{s['p50_ms']:10.4f}{s['p99_ms']:10.4f}")
+    print(f"event loop lag of a 1 ms ticker over {args.spawns} spawns with {args.heap_mb} MB resident:")
+    for label, window in (('Popen on the loop', direct_lag), ('launcher worker thread', offloaded_lag)):
+        s = window.summary((50, 99))
+        print(f"  {label:26}{s['p50_ms']:10.3f}{s['p99_ms']:10.3f}  max {window.snapshot()[-1] * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
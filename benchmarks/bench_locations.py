@@ -0,0 +1,133 @@
+"""Benchmark location extraction and multi-city weather fan-out.
+
+Extraction: labelled weather questions (multi-word names, aliases, several
+cities, trailing filler) through the old "word after in/for/of" rule and the
+gazetteer, reporting accuracy and per-query time, plus index build time for
+the bundled list and a large synthetic one.
+
+Fan-out: weather for 1-5 cities at once against a local stub WeatherAPI,
+one lookup after another versus ``WeatherClient.current_many``.
+
+Usage: python benchmarks/bench_locations.py [--queries N] [--synthetic N] [--latency SECONDS]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stubs import weather_server  # noqa: E402
+from gazetteer import DEFAULT_PLACES, Gazetteer, extract_locations, read_places  # noqa: E402
+from latency import LatencyWindow  # noqa: E402
+from weather_service import WeatherClient  # noqa: E402
+
+TEMPLATES = [
+    "what's the weather in {}", "weather for {} today", "how is the weather in {} right now",
+    "tell me the weather of {}", "weather forecast for {} please", "what is it like in {} this morning",
+]
+
+
+def old_rule(query: str):
+    parts = query.split()
+    for i, part in enumerate(parts):
+        if part in ['for', 'in', 'of'] and i < len(parts) - 1:
+            return [parts[i + 1]]
+    return []
+
+
+def labelled_queries(gazetteer: Gazetteer, count: int, seed: int = 3):
+    """(query, expected API queries); a third of them ask about two or three cities."""
+    rng = random.Random(seed)
+    # Only the best-known place for each name can be asked for by its bare name
+    places = [p for p in gazetteer.places if p.query == p.name]
+    queries = []
+    for _ in range(count):
+        chosen = rng.sample(places, rng.choice([1, 1, 2, 3]))
+        spoken = [p.name.lower() if rng.random() < 0.5 else p.name for p in chosen]
+        text = spoken[0] if len(spoken) == 1 else ', '.join(spoken[:-1]) + ' and ' + spoken[-1]
+        queries.append((rng.choice(TEMPLATES).format(text), [p.query for p in chosen]))
+    return queries
+
+
+def synthetic_places(count: int, seed: int = 4):
+    rng = random.Random(seed)
+    syllables = ['ka', 'lo', 'mi', 'san', 'ter', 'vel', 'dor', 'ia', 'po', 'ru', 'bel', 'ham', 'ton', 'ville']
+    for n in range(count):
+        words = [''.join(rng.choice(syllables) for _ in range(rng.randint(2, 3))) for _ in range(rng.randint(1, 3))]
+        yield ' '.join(words).title(), 'Synthetica', rng.randint(1000, 5000000), []
+
+
+def bench_extraction(args) -> None:
+    started = time.perf_counter()
+    gazetteer = Gazetteer(read_places(DEFAULT_PLACES))
+    build_ms = (time.perf_counter() - started) * 1000
+    queries = labelled_queries(gazetteer, args.queries)
+
+    print(f"{'extractor':12} {'accuracy':>9} {'multi-city':>11} {'p50 us':>8} {'p99 us':>8}")
+    for name, extract in (('old rule', old_rule), ('gazetteer', lambda q: extract_locations(q, gazetteer=gazetteer))):
+        latency = LatencyWindow(size=len(queries))
+        correct = multi = multi_correct = 0
+        for query, expected in queries:
+            t = time.perf_counter()
+            found = extract(query)
+            latency.add(time.perf_counter() - t)
+            ok = [f.lower() for f in found] == [e.lower() for e in expected]
+            correct += ok
+            if len(expected) > 1:
+                multi += 1
+                multi_correct += ok
+        summary = latency.summary((50, 99))
+        print(f"{name:12} {correct / len(queries):9.1%} {multi_correct / max(1, multi):11.1%} "
+              f"{summary['p50_ms'] * 1000:8.1f} {summary['p99_ms'] * 1000:8.1f}")
+
+    started = time.perf_counter()
+    large = Gazetteer(list(read_places(DEFAULT_PLACES)) + list(synthetic_places(args.synthetic)))
+    large_ms = (time.perf_counter() - started) * 1000
+    latency = LatencyWindow(size=len(queries))
+    for query, _ in queries:
+        t = time.perf_counter()
+        large.find(query)
+        latency.add(time.perf_counter() - t)
+    print(f"index build: {len(gazetteer)} places {build_ms:.1f} ms, {len(large)} places {large_ms:.0f} ms "
+          f"(lookup p50 {latency.summary((50,))['p50_ms'] * 1000:.1f} us)")
+
+
+async def fan_out(url: str, cities, concurrent: bool) -> float:
+    client = WeatherClient('bench', base_url=url, refresh_ahead=None)
+    started = time.perf_counter()
+    if concurrent:
+        await client.current_many(cities)
+    else:
+        for city in cities:
+            await client.current(city)
+    elapsed = time.perf_counter() - started
+    client.close()
+    return elapsed
+
+
+def bench_fan_out(args) -> None:
+    cities = ['London', 'Paris', 'Tokyo', 'New York', 'Lima']
+    print(f"\n{'cities':>6} {'sequential ms':>14} {'fan-out ms':>11}")
+    with weather_server(args.latency) as server:
+        url = server.url + '/v1/current.json'
+        for count in range(1, len(cities) + 1):
+            sequential = asyncio.run(fan_out(url, cities[:count], concurrent=False))
+            concurrent = asyncio.run(fan_out(url, cities[:count], concurrent=True))
+            print(f"{count:6d} {sequential * 1000:14.1f} {concurrent * 1000:11.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--synthetic', type=int, default=100000, help="extra generated places for the build test")
+    parser.add_argument('--latency', type=float, default=0.1, help="stub server latency per request")
+    args = parser.parse_args()
+    bench_extraction(args)
+    bench_fan_out(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Benchmark time the calling (event-loop) thread spends in logging.
+
+Replays the messages a conversation turn logs (listening, recognizing,
+speaking, the odd warning) through the old synchronous setup - a
+FileHandler plus a console StreamHandler - and through the queue-based
+pipeline with JSON file output and hot-path sampling. The console is a file
+that stalls every few hundred writes, like a busy terminal or a slow disk.
+
+Usage: python benchmarks/bench_logging.py [--turns N] [--stall-ms MS] [--stall-every N]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from latency import LatencyWindow  # noqa: E402
+from log_pipeline import TEXT_FORMAT, LogPipeline  # noqa: E402
+
+
+class SlowStream:
+    """File-backed console that blocks for ``stall`` seconds every ``every`` writes."""
+
+    def __init__(self, path: str, stall: float, every: int):
+        self.file = open(path, 'w', encoding='utf-8')
+        self.stall = stall
+        self.every = every
+        self.writes = 0
+
+    def write(self, text: str) -> int:
+        self.writes += 1
+        if self.stall and self.writes % self.every == 0:
+            time.sleep(self.stall)
+        return self.file.write(text)
+
+    def flush(self) -> None:
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def turn_messages(n: int):
+    yield logging.INFO, "Listening..."
+    if n % 3 == 0:
+        yield logging.INFO, "Listening timed out (no speech detected)"
+        return
+    yield logging.INFO, "Recognizing..."
+    yield logging.INFO, f"Recognized: weather in london number {n}"
+    for sentence in range(3):
+        yield logging.INFO, f"Speaking: sentence {sentence} of the answer to turn {n}"
+    if n % 50 == 0:
+        yield logging.WARNING, f"Weather API error: turn {n} took too long"
+
+
+def replay(logger: logging.Logger, turns: int) -> LatencyWindow:
+    calls = LatencyWindow(size=turns * 8)
+    for n in range(turns):
+        for level, message in turn_messages(n):
+            started = time.perf_counter()
+            logger.log(level, message)
+            calls.add(time.perf_counter() - started)
+    return calls
+
+
+def sync_logger(tmp: str, stream: SlowStream) -> logging.Logger:
+    logger = logging.getLogger('bench.sync')
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    formatter = logging.Formatter(TEXT_FORMAT)
+    for handler in (logging.FileHandler(os.path.join(tmp, 'sync.log')), logging.StreamHandler(stream)):
+        handler.setFormatter(formatter)
+        logger.addHandler(handler)
+    return logger
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--turns', type=int, default=20000)
+    parser.add_argument('--stall-ms', type=float, default=5.0, help="console stall length")
+    parser.add_argument('--stall-every', type=int, default=500, help="console writes between stalls")
+    args = parser.parse_args()
+    stall = args.stall_ms / 1000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sync_stream = SlowStream(os.path.join(tmp, 'sync.console'), stall, args.stall_every)
+        logger = sync_logger(tmp, sync_stream)
+        started = time.perf_counter()
+        sync_calls = replay(logger, args.turns)
+        sync_total = time.perf_counter() - started
+        for handler in logger.handlers:
+            handler.close()
+        sync_stream.close()
+
+        queued_stream = SlowStream(os.path.join(tmp, 'queued.console'), stall, args.stall_every)
+        logger = logging.getLogger('bench.queued')
+        logger.propagate = False
+        pipeline = LogPipeline(os.path.join(tmp, 'queued.log'), queue_size=100000)
+        pipeline.handlers[0].setStream(queued_stream)
+        pipeline.install(logger)
+        started = time.perf_counter()
+        queued_calls = replay(logger, args.turns)
+        queued_total = time.perf_counter() - started
+        pipeline.stop()
+        drained = time.perf_counter() - started
+        queued_stream.close()
+        stats = pipeline.stats()
+
+    print(f"{args.turns} turns, {sync_calls.count} log calls, console stalls {args.stall_ms} ms "
+          f"every {args.stall_every} writes")
+    print(f"{'':26}{'sync handlers':>15}{'queue pipeline':>16}")
+    print(f"{'caller time total ms':26}{sync_total * 1000:15.1f}{queued_total * 1000:16.1f}")
+    for q in (50, 99, 99.9):
+        key = f'p{q}_ms'
+        print(f"{'per call ' + key:26}{sync_calls.summary((q,))[key]:15.4f}{queued_calls.summary((q,))[key]:16.4f}")
+    print(f"{'per call max ms':26}{sync_calls.snapshot()[-1] * 1000:15.2f}{queued_calls.snapshot()[-1] * 1000:16.2f}")
+    print(f"records sampled out {stats['sampled_out']}, dropped on full queue {stats['queue_full_dropped']}, "
+          f"writer drained {drained * 1000:.0f} ms after start")
+
+
+if __name__ == '__main__':
+    main()
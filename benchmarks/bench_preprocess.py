@@ -0,0 +1,142 @@
+"""Benchmark the NumPy preprocessing stage: bytes sent, time per second of audio and accuracy.
+
+Runs each utterance through the stage step by step (trim only, then with
+resampling, noise suppression and normalization) and reports the audio
+bytes that would go to the recognizer and the processing time per second of
+captured audio, next to resampling alone with audioop.ratecv. Without a
+fixture directory, synthetic utterances with silence either side and
+background noise are captured at ``--rate``. With ``--backends`` and WAV
+fixtures that have .txt reference transcripts, each backend's word error
+rate and latency are compared on raw audio and preprocessed audio without
+and with noise suppression (off by default until it is shown to help).
+
+Usage: python benchmarks/bench_preprocess.py [FIXTURE_DIR] [--backends vosk,sphinx] [--rate HZ]
+"""
+import argparse
+import asyncio
+import glob
+import os
+import random
+import sys
+import time
+from typing import List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_capture import Utterance, audioop  # noqa: E402
+from audio_preprocess import AudioPreprocessor, np  # noqa: E402
+from benchmarks.bench_recognizers import load_fixture, word_errors  # noqa: E402
+from benchmarks.fixtures import synth_pcm  # noqa: E402
+from latency import LatencyWindow  # noqa: E402
+from recognizers import RecognitionError, create_backend  # noqa: E402
+
+STAGES = [
+    ('trim', dict(denoise=False, normalize=False, target_rate=None)),
+    ('trim+resample', dict(denoise=False, normalize=False)),
+    ('+denoise', dict(denoise=True, normalize=False)),
+    ('full', dict(denoise=True)),
+]
+
+
+def synthetic_fixtures(count: int, rate: int, seed: int = 23) -> List[Tuple[Utterance, Optional[str]]]:
+    """Captured-looking utterances: preroll silence, speech, the end-of-speech pause."""
+    rng = random.Random(seed)
+    fixtures = []
+    for n in range(count):
+        segments = [('silence', rng.uniform(0.3, 0.6)), ('speech', rng.uniform(0.8, 2.5)),
+                    ('silence', rng.uniform(0.1, 0.3)), ('speech', rng.uniform(0.3, 1.0)),
+                    ('silence', rng.uniform(0.6, 0.9))]
+        pcm = synth_pcm(segments, sample_rate=rate, noise=rng.uniform(50, 400), seed=n)
+        fixtures.append((Utterance(pcm, rate, 2, 0.0, 0.0), None))
+    return fixtures
+
+
+def measure(process, fixtures) -> Tuple[LatencyWindow, int, int]:
+    """Processing time per second of audio, and bytes before and after."""
+    per_second = LatencyWindow(size=len(fixtures))
+    bytes_in = bytes_out = 0
+    for utterance, _ in fixtures:
+        started = time.perf_counter()
+        result = process(utterance)
+        per_second.add((time.perf_counter() - started) / utterance.duration)
+        bytes_in += len(utterance.frame_data)
+        bytes_out += len(result.frame_data)
+    return per_second, bytes_in, bytes_out
+
+
+def ratecv(utterance: Utterance, target_rate: int = 16000) -> Utterance:
+    data, _ = audioop.ratecv(utterance.frame_data, utterance.sample_width, 1, utterance.sample_rate, target_rate, None)
+    return Utterance(data, target_rate, utterance.sample_width, utterance.started_at, utterance.ended_at)
+
+
+async def accuracy(backend, fixtures, preprocessor: Optional[AudioPreprocessor]):
+    latency = LatencyWindow()
+    errors = words = 0
+    for utterance, reference in fixtures:
+        started = time.perf_counter()
+        if preprocessor is not None:
+            utterance = preprocessor.process(utterance)
+        try:
+            hypothesis = await backend.recognize(utterance)
+        except RecognitionError:
+            hypothesis = ''
+        latency.add(time.perf_counter() - started)
+        e, n = word_errors(reference, hypothesis)
+        errors += e
+        words += n
+    return latency, errors / words if words else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('fixtures', nargs='?', help="directory of mono WAV files (+ optional .txt references)")
+    parser.add_argument('--backends', default='', help="recognizers to compare raw and preprocessed audio on")
+    parser.add_argument('--rate', type=int, default=44100, help="capture rate of the synthetic utterances")
+    parser.add_argument('--count', type=int, default=40, help="synthetic utterances")
+    args = parser.parse_args()
+    if np is None:
+        parser.error("NumPy is not installed")
+
+    if args.fixtures:
+        fixtures = [load_fixture(path) for path in sorted(glob.glob(os.path.join(args.fixtures, '*.wav')))]
+        if not fixtures:
+            parser.error(f"no .wav files in {args.fixtures}")
+    else:
+        fixtures = synthetic_fixtures(args.count, args.rate)
+    audio_seconds = sum(utterance.duration for utterance, _ in fixtures)
+    print(f"{len(fixtures)} utterances, {audio_seconds:.1f} s of audio")
+
+    print(f"{'':22}{'bytes out':>12}{'of input':>10}{'ms/s p50':>10}{'ms/s p95':>10}")
+    rows = []
+    for label, options in STAGES:
+        preprocessor = AudioPreprocessor(**options)
+        preprocessor.warm_up()
+        rows.append((label, measure(preprocessor.process, fixtures)))
+    if audioop is not None:
+        rows.append(('audioop.ratecv only', measure(ratecv, fixtures)))
+    for label, (per_second, bytes_in, bytes_out) in rows:
+        s = per_second.summary((50, 95))
+        print(f"{label:22}{bytes_out:12d}{bytes_out / bytes_in:10.0%}{s['p50_ms']:10.2f}{s['p95_ms']:10.2f}")
+
+    backends = [name for name in args.backends.split(',') if name]
+    scored = [(utterance, reference) for utterance, reference in fixtures if reference is not None]
+    if backends and not scored:
+        print("no reference transcripts; skipping the accuracy comparison")
+        return
+    for name in backends:
+        try:
+            backend = create_backend(name)
+            backend.warm_up()
+        except Exception as e:
+            print(f"{name:22}unavailable: {e}")
+            continue
+        for label, preprocessor in (('raw', None), ('preprocessed', AudioPreprocessor()),
+                                    ('+denoise', AudioPreprocessor(denoise=True))):
+            latency, wer = asyncio.get_event_loop().run_until_complete(accuracy(backend, scored, preprocessor))
+            s = latency.summary((50, 95))
+            print(f"{name + ' ' + label:22}  WER {wer:6.1%}  p50 {s['p50_ms']:8.1f} ms  p95 {s['p95_ms']:8.1f} ms")
+        backend.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Compare recognizer backends on recorded WAV fixtures.
+
+For every WAV in a directory (with an optional same-named .txt reference
+transcript) each backend is timed end to end. Reports latency, real-time
+factor (processing time / audio duration; below 1.0 is faster than real
+time) and word error rate where references exist.
+
+Usage: python benchmarks/bench_recognizers.py FIXTURE_DIR [--backends google,vosk,sphinx]
+"""
+import argparse
+import asyncio
+import glob
+import os
+import sys
+import time
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_capture import Utterance  # noqa: E402
+from latency import LatencyWindow  # noqa: E402
+from recognizers import RecognitionError, create_backend  # noqa: E402
+
+
+def load_fixture(path: str):
+    with wave.open(path, 'rb') as wav:
+        if wav.getnchannels() != 1:
+            raise ValueError(f"{path}: fixtures must be mono")
+        frames = wav.readframes(wav.getnframes())
+        utterance = Utterance(frames, wav.getframerate(), wav.getsampwidth(), 0.0, 0.0)
+    reference = None
+    text_path = os.path.splitext(path)[0] + '.txt'
+    if os.path.exists(text_path):
+        with open(text_path, encoding='utf-8') as text:
+            reference = text.read().strip().lower()
+    return utterance, reference
+
+
+def word_errors(reference: str, hypothesis: str):
+    """(edit distance in words, reference length)."""
+    ref, hyp = reference.split(), hypothesis.lower().split()
+    row = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        previous, row[0] = row[0], i
+        for j, hyp_word in enumerate(hyp, 1):
+            current = min(row[j] + 1, row[j - 1] + 1, previous + (ref_word != hyp_word))
+            previous, row[j] = row[j], current
+    return row[-1], len(ref)
+
+
+async def run_backend(backend, fixtures):
+    latency = LatencyWindow()
+    audio_seconds = busy_seconds = 0.0
+    errors = words = failures = 0
+    for utterance, reference in fixtures:
+        started = time.perf_counter()
+        try:
+            hypothesis = await backend.recognize(utterance)
+        except RecognitionError:
+            hypothesis = ''
+            failures += 1
+        elapsed = time.perf_counter() - started
+        latency.add(elapsed)
+        audio_seconds += utterance.duration
+        busy_seconds += elapsed
+        if reference is not None:
+            e, n = word_errors(reference, hypothesis)
+            errors += e
+            words += n
+    return latency, busy_seconds / audio_seconds, (errors / words if words else None), failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('fixtures', help="directory of mono WAV files (+ optional .txt references)")
+    parser.add_argument('--backends', default='google,vosk,sphinx')
+    args = parser.parse_args()
+
+    fixtures = [load_fixture(path) for path in sorted(glob.glob(os.path.join(args.fixtures, '*.wav')))]
+    if not fixtures:
+        sys.exit(f"No WAV files in {args.fixtures}")
+
+    print(f"{'backend':8} {'p50 ms':>9} {'p95 ms':>9} {'RTF':>6} {'WER':>6} {'failed':>7} {'warm-up s':>10}")
+    for name in args.backends.split(','):
+        try:
+            started = time.perf_counter()
+            backend = create_backend(name)
+            backend.warm_up()
+            warm_up = time.perf_counter() - started
+        except Exception as e:
+            print(f"{name:8} unavailable: {e}")
+            continue
+        try:
+            latency, rtf, wer, failures = asyncio.run(run_backend(backend, fixtures))
+        finally:
+            backend.close()
+        summary = latency.summary((50, 95))
+        wer_text = f"{wer:.1%}" if wer is not None else '-'
+        print(f"{name:8} {summary['p50_ms']:>9.1f} {summary['p95_ms']:>9.1f} {rtf:>6.2f} "
+              f"{wer_text:>6} {failures:>7} {warm_up:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
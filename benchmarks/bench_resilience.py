@@ -0,0 +1,141 @@
+"""Benchmark weather lookups against a misbehaving service: tail latency and outcomes.
+
+A local stub WeatherAPI server answers most requests quickly but makes some
+slow, hangs on a few and fails others with a 503; partway through it goes
+down completely for ``--outage`` turns and then comes back. Turns arrive every
+``--interval`` seconds, each a lookup run through the CommandScheduler with a
+``--budget`` deadline, over a short cache TTL so that stale answers exist to
+fall back on. The client as it was (upstream calls awaited for as long as
+they take) is compared with the resilient caller with and without hedging.
+Each turn ends ok, degraded (a stale answer or a quick "unavailable"),
+failed or expired.
+
+Usage: python benchmarks/bench_resilience.py [--turns N] [--budget SECONDS] [--hang-rate R] [--outage N]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+from typing import Dict, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_weather import CITIES  # noqa: E402
+from benchmarks.stubs import faulty_weather_server  # noqa: E402
+from latency import LatencyWindow  # noqa: E402
+from resilience import ServiceUnavailableError  # noqa: E402
+from scheduler import DONE, EXPIRED, CommandScheduler  # noqa: E402
+from weather_service import WeatherClient, WeatherResult  # noqa: E402
+
+OUTCOMES = ('ok', 'degraded', 'failed', 'expired')
+
+
+class UnguardedWeatherClient(WeatherClient):
+    """WeatherClient as it was: every upstream call is awaited for as long as it takes."""
+
+    async def _fetch(self, key: str) -> WeatherResult:
+        started = time.perf_counter()
+        result = await asyncio.get_event_loop().run_in_executor(self._executor, self._get, key)
+        self.upstream_latency.add(time.perf_counter() - started)
+        if result.status_code == 200:
+            self.cache.put(key, result)
+        return result
+
+
+async def lookup(client: WeatherClient, city: str) -> str:
+    """One turn's lookup, classified the way the weather handler would answer it."""
+    try:
+        result = await client.current(city)
+    except ServiceUnavailableError:
+        return 'degraded'
+    if result.status_code != 200:
+        return 'failed'
+    return 'degraded' if result.stale_seconds else 'ok'
+
+
+async def run_mode(client: WeatherClient, stub, args) -> Dict[str, object]:
+    rng = random.Random(7)
+    faults = stub.handler.faults
+    scheduler = CommandScheduler(max_concurrent=args.concurrency, default_deadline=args.budget)
+    turnaround = LatencyWindow(size=args.turns)
+    outcomes = dict.fromkeys(OUTCOMES, 0)
+    requests_before = stub.requests
+
+    def finished(task) -> None:
+        turnaround.add(task.finished_at - task.submitted_at)
+        if task.state == EXPIRED:
+            outcomes['expired'] += 1
+        else:
+            outcomes[task.result if task.state == DONE else 'failed'] += 1
+
+    scheduler.on_result = finished
+    outage_start = args.turns // 2
+    for turn in range(args.turns):
+        faults['outage'] = outage_start <= turn < outage_start + args.outage
+        city = rng.choice(CITIES[:args.cities])
+        scheduler.submit('weather', lambda city=city: lookup(client, city))
+        await asyncio.sleep(args.interval)
+    while scheduler.in_flight or scheduler.queue_depth:
+        await asyncio.sleep(args.interval)
+    faults['outage'] = False
+
+    result: Dict[str, object] = dict(outcomes, upstream=stub.requests - requests_before,
+                                     latency=turnaround.summary((50, 95, 99)), max=max(turnaround.snapshot()))
+    result['caller'] = client.caller.stats() if not isinstance(client, UnguardedWeatherClient) else None
+    client.close()
+    return result
+
+
+def make_client(mode: str, url: str, args) -> WeatherClient:
+    options = dict(base_url=url, ttl=args.ttl, refresh_ahead=None)
+    if mode == 'unguarded':
+        return UnguardedWeatherClient('bench', timeout=600.0, **options)  # No timeout to speak of
+    client = WeatherClient('bench', timeout=args.timeout, hedge=mode == 'hedged', **options)
+    client.caller.breaker.reset_timeout = args.reset
+    return client
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--turns', type=int, default=400)
+    parser.add_argument('--interval', type=float, default=0.05, help="seconds between turns")
+    parser.add_argument('--cities', type=int, default=12, help="distinct cities asked about")
+    parser.add_argument('--ttl', type=float, default=1.0, help="weather cache TTL")
+    parser.add_argument('--budget', type=float, default=3.0, help="deadline of each turn")
+    parser.add_argument('--timeout', type=float, default=2.0, help="per-call timeout of the resilient client")
+    parser.add_argument('--reset', type=float, default=1.0, help="seconds an open circuit waits before probing")
+    parser.add_argument('--concurrency', type=int, default=4, help="turns handled at once")
+    parser.add_argument('--latency', type=float, default=0.05, help="normal stub latency")
+    parser.add_argument('--slow-rate', type=float, default=0.08)
+    parser.add_argument('--slow-latency', type=float, default=0.6)
+    parser.add_argument('--hang-rate', type=float, default=0.05)
+    parser.add_argument('--hang-seconds', type=float, default=5.0)
+    parser.add_argument('--error-rate', type=float, default=0.02)
+    parser.add_argument('--outage', type=int, default=60, help="turns during which every request fails")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.ERROR)
+
+    results = {}
+    for mode in ('unguarded', 'timeouts', 'hedged'):
+        with faulty_weather_server(args.latency, slow_rate=args.slow_rate, slow_latency=args.slow_latency,
+                                   hang_rate=args.hang_rate, hang_seconds=args.hang_seconds,
+                                   error_rate=args.error_rate) as stub:
+            client = make_client(mode, stub.url + '/v1/current.json', args)
+            results[mode] = asyncio.run(run_mode(client, stub, args))
+
+    print(f"{args.turns} turns, {args.budget:.1f} s budget, {args.outage} turns of outage")
+    print(f"{'':11}{'p50':>8}{'p95':>8}{'p99':>8}{'max':>8}" + ''.join(f'{o:>9}' for o in OUTCOMES)
+          + f"{'upstream':>10}{'hedged':>8}{'opens':>7}")
+    for mode, result in results.items():
+        s = result['latency']
+        caller: Optional[Dict[str, object]] = result['caller']
+        print(f"{mode:11}{s['p50_ms']:6.0f}ms{s['p95_ms']:6.0f}ms{s['p99_ms']:6.0f}ms{result['max'] * 1000:6.0f}ms"
+              + ''.join(f"{result[o]:9d}" for o in OUTCOMES)
+              + f"{result['upstream']:10d}{caller['hedged'] if caller else '-':>8}{caller['opens'] if caller else '-':>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""Load-test the multi-session server: latency, rejections and sessions per core.
+
+Starts server.py's AssistantServer in a child process (stub WeatherAPI in
+this process, in-process FakeWikipedia in the child), then for each
+concurrency level runs that many chat sessions at once over keep-alive
+connections. Each session sends a short scripted conversation with think
+time between commands. Server CPU is read from /proc, so sessions-per-core
+is reported on Linux only.
+
+Usage: python benchmarks/bench_server.py [--levels 10,100,500] [--commands N] [--think SECONDS]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Any, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stubs import FakeWikipedia, weather_server  # noqa: E402
+from latency import LatencyWindow  # noqa: E402
+
+COMMANDS = ['weather in london', 'weather in paris', 'wikipedia python', 'wikipedia alan turing',
+            'help', 'open youtube', 'weather in tokyo', 'wikipedia mercury', 'tell me a joke']
+
+
+class Connection:
+    """Minimal keep-alive HTTP/1.1 JSON client."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method: str, path: str, payload: Any = None) -> Tuple[int, Any]:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        self.writer.write(f'{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n'
+                          f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n'.encode() + body)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            if name.lower() == 'content-length':
+                length = int(value)
+        data = await self.reader.readexactly(length) if length else b''
+        return status, json.loads(data) if data else None
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+
+def cpu_seconds(pid: int) -> Optional[float]:
+    try:
+        with open(f'/proc/{pid}/stat') as stat:
+            fields = stat.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+async def run_level(port: int, sessions: int, commands: int, think: float, seed: int):
+    latency = LatencyWindow(size=sessions * commands)
+    counts = {'ok': 0, '429': 0, '503': 0, 'other': 0}
+
+    async def session(index: int) -> None:
+        rng = random.Random(seed + index)
+        connection = Connection('127.0.0.1', port)
+        try:
+            status, created = await connection.request('POST', '/sessions')
+            if status != 201:
+                counts[str(status) if str(status) in counts else 'other'] += 1
+                return
+            path = f"/sessions/{created['session']}/commands"
+            for _ in range(commands):
+                await asyncio.sleep(rng.uniform(0, 2 * think))
+                started = time.perf_counter()
+                status, _ = await connection.request('POST', path, {'command': rng.choice(COMMANDS)})
+                if status == 200:
+                    latency.add(time.perf_counter() - started)
+                    counts['ok'] += 1
+                else:
+                    counts[str(status) if str(status) in counts else 'other'] += 1
+            await connection.request('DELETE', f"/sessions/{created['session']}")
+        finally:
+            connection.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(session(i) for i in range(sessions)))
+    return latency, counts, time.perf_counter() - started
+
+
+def serve_child(args) -> None:
+    """Child process: the server with stand-in services."""
+    from server import AssistantServer
+    from weather_service import WeatherClient
+    from wiki_service import WikipediaService
+
+    os.environ['WEATHERAPI_KEY'] = 'bench'
+    logging.getLogger().setLevel(logging.WARNING)
+
+    async def serve():
+        wikipedia = WikipediaService(module=FakeWikipedia(args.wiki_latency), max_workers=32)
+        weather = WeatherClient('bench', base_url=args.weather_url, pool_size=32)
+        server = AssistantServer(wikipedia, weather, max_sessions=100000, max_inflight=args.max_inflight,
+                                 max_queue=args.max_queue, session_rate=args.session_rate)
+        port = await server.start('127.0.0.1', 0)
+        print(port, flush=True)
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--levels', default='10,100,500', help="concurrent sessions per run")
+    parser.add_argument('--commands', type=int, default=10, help="commands per session")
+    parser.add_argument('--think', type=float, default=0.5, help="mean think time between commands")
+    parser.add_argument('--weather-latency', type=float, default=0.05)
+    parser.add_argument('--wiki-latency', type=float, default=0.1)
+    parser.add_argument('--max-inflight', type=int, default=64)
+    parser.add_argument('--max-queue', type=int, default=256)
+    parser.add_argument('--session-rate', type=float, default=5.0)
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--weather-url', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve_child(args)
+        return
+
+    with weather_server(args.weather_latency) as weather:
+        child = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), '--serve',
+             '--weather-url', f'{weather.url}/v1/current.json',
+             '--wiki-latency', str(args.wiki_latency), '--max-inflight', str(args.max_inflight),
+             '--max-queue', str(args.max_queue), '--session-rate', str(args.session_rate)],
+            stdout=subprocess.PIPE, text=True
+        )
+        try:
+            port = int(child.stdout.readline())
+            print(f"{'sessions':>8} {'cmds/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+                  f"{'429':>5} {'503':>5} {'cpu %':>7} {'sessions/core':>14}")
+            for sessions in (int(level) for level in args.levels.split(',')):
+                cpu_before = cpu_seconds(child.pid)
+                latency, counts, wall = asyncio.run(run_level(port, sessions, args.commands, args.think, seed=sessions))
+                cpu_after = cpu_seconds(child.pid)
+                summary = latency.summary((50, 95, 99))
+                if cpu_before is not None and cpu_after is not None and cpu_after > cpu_before:
+                    cores = (cpu_after - cpu_before) / wall
+                    cpu, per_core = f'{100 * cores:7.1f}', f'{sessions / cores:14.0f}'
+                else:
+                    cpu, per_core = f"{'n/a':>7}", f"{'n/a':>14}"
+                print(f"{sessions:8d} {counts['ok'] / wall:8.1f} {summary['p50_ms']:8.1f} {summary['p95_ms']:8.1f} "
+                      f"{summary['p99_ms']:8.1f} {counts['429']:5d} {counts['503']:5d} {cpu} {per_core}")
+        finally:
+            child.terminate()
+            child.wait()
+
+
+if __name__ == '__main__':
+    main()
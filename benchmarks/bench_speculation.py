@@ -0,0 +1,137 @@
+"""Benchmark speculative lookups from partial transcripts: reply latency saved and work wasted.
+
+Replays spoken commands word by word as a streaming recognizer would report
+them (a partial hypothesis every ``--partial-interval`` seconds, repeated
+through the end-of-speech pause), then hands the final transcript to the
+assistant core and times it until the handler finishes. Weather questions go
+to a local stub WeatherAPI server and Wikipedia questions to an in-process
+fake, both with a fixed latency. Some scripts end differently than the
+partials suggested, as when the recognizer revises the last word. Each run
+without speculation is compared with runs at several stability thresholds.
+
+Usage: python benchmarks/bench_speculation.py [--latency SECONDS] [--stable 2,4,6] [--rounds N]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stubs import FakeWikipedia, weather_server  # noqa: E402
+from headless import HeadlessAssistant  # noqa: E402
+from latency import LatencyWindow  # noqa: E402
+from speculation import SpeculativeDispatcher  # noqa: E402
+from weather_service import WeatherClient  # noqa: E402
+from wiki_service import SummaryCache, WikipediaService  # noqa: E402
+
+# (what the partials say, the final transcript when the recognizer revised it)
+SCRIPTS: List[Tuple[str, Optional[str]]] = [
+    ('weather in paris', None),
+    ("what's the weather in new york", None),
+    ('wikipedia albert einstein', None),
+    ('weather in london and tokyo', None),
+    ('tell me the weather in berlin', None),
+    ('wikipedia mount everest', None),
+    ('weather in boston', 'weather in austin'),
+    ('wikipedia marie curie', 'wikipedia madame curie'),
+    ('search wikipedia for the moon landing', None),
+    ('open youtube', None),
+]
+
+
+async def say(assistant: HeadlessAssistant, heard: str, final: str, args) -> float:
+    """Speak one script as partials, then run the final transcript; returns seconds to the reply."""
+    speculator = assistant.speculator
+    words = heard.split()
+    per_word = max(1, round(1.0 / args.words_per_second / args.partial_interval))
+    pause = max(1, round(args.pause / args.partial_interval))
+    for n in range(1, len(words) + 1):
+        for _ in range(per_word + (pause if n == len(words) else 0)):
+            if speculator is not None:
+                speculator.hypothesize(' '.join(words[:n]))
+            await asyncio.sleep(args.partial_interval)
+    await asyncio.sleep(args.finalize)  # Decoder flushes the final result
+
+    settled = time.perf_counter()
+    if speculator is not None:
+        speculator.settle(final)
+    await assistant.handle(final)
+    return time.perf_counter() - settled
+
+
+async def run_mode(min_stable: Optional[int], args, stub, cache_dir: str, tag: str) -> Dict[str, object]:
+    assistant = HeadlessAssistant(wikipedia=WikipediaService(module=FakeWikipedia(0.0)))
+    speculator = None if min_stable is None else SpeculativeDispatcher(assistant.router, min_stable)
+    assistant.speculator = speculator
+
+    requests_before = stub.requests
+    fetched = 0
+    replies = LatencyWindow()
+    revised = LatencyWindow()
+    for round_no in range(args.rounds):
+        # Cold caches every round, as for questions not asked before
+        fake = FakeWikipedia(args.latency)
+        assistant.weather = WeatherClient('bench', base_url=stub.url + '/v1/current.json')
+        assistant.wikipedia = WikipediaService(
+            SummaryCache(os.path.join(cache_dir, f'wikipedia-{tag}-{round_no}.sqlite3')), module=fake)
+        for heard, final in SCRIPTS:
+            seconds = await say(assistant, heard, final or heard, args)
+            (revised if final else replies).add(seconds)
+        await asyncio.sleep(args.latency * 2)  # Let cancelled lookups already upstream finish
+        fetched += fake.calls
+        assistant.weather.close()
+        assistant.wikipedia.close()
+
+    result: Dict[str, object] = {
+        'reply': replies.summary((50, 95)),
+        'revised': revised.summary((50, 95)),
+        'upstream': stub.requests - requests_before + fetched,
+    }
+    if speculator is not None:
+        result['speculation'] = speculator.stats()
+    return result
+
+
+async def run(args) -> Dict[str, Dict[str, object]]:
+    modes = [('off', None)] + [(f'stable {n}', n) for n in args.stable]
+    results = {}
+    with weather_server(args.latency) as stub, tempfile.TemporaryDirectory() as cache_dir:
+        for label, min_stable in modes:
+            results[label] = await run_mode(min_stable, args, stub, cache_dir, label.replace(' ', '-'))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.3, help="upstream latency of each lookup")
+    parser.add_argument('--stable', default='2,4,6', help="stability thresholds to compare")
+    parser.add_argument('--rounds', type=int, default=2)
+    parser.add_argument('--words-per-second', type=float, default=2.5)
+    parser.add_argument('--partial-interval', type=float, default=0.15)
+    parser.add_argument('--pause', type=float, default=0.5, help="silence before the end of speech is detected")
+    parser.add_argument('--finalize', type=float, default=0.05, help="final decode after the pause")
+    args = parser.parse_args()
+    args.stable = [int(n) for n in args.stable.split(',') if n]
+    os.environ['WEATHERAPI_KEY'] = 'bench'
+    os.environ['ASSISTANT_HISTORY'] = '0'
+    logging.getLogger().setLevel(logging.WARNING)
+
+    results = asyncio.run(run(args))
+    print(f"{len(SCRIPTS) * args.rounds} commands, {args.latency * 1000:.0f} ms per upstream lookup")
+    print(f"{'':12}{'reply p50':>11}{'reply p95':>11}{'revised p50':>13}{'upstream':>10}"
+          f"{'started':>9}{'used':>6}{'wasted':>8}{'saved s':>9}{'wasted s':>10}")
+    for label, result in results.items():
+        spec = result.get('speculation', {})
+        print(f"{label:12}{result['reply']['p50_ms']:9.0f}ms{result['reply']['p95_ms']:9.0f}ms"
+              f"{result['revised']['p50_ms']:11.0f}ms{result['upstream']:10d}"
+              f"{spec.get('started', 0):9d}{spec.get('used', 0):6d}{spec.get('wasted', 0):8d}"
+              f"{spec.get('saved_seconds', 0.0):9.2f}{spec.get('wasted_seconds', 0.0):10.2f}")
+
+
+if __name__ == '__main__':
+    main()
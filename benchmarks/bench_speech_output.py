@@ -0,0 +1,57 @@
+"""Benchmark speech output: caller blocking time and time to first audio.
+
+Uses a timed stand-in for the pyttsx3 engine whose synthesis cost grows with
+text length, comparing the old blocking say()+runAndWait() against the
+queue-fed worker with sentence streaming.
+
+Usage: python benchmarks/bench_speech_output.py [--ms-per-char N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import TimedEngine  # noqa: E402
+from speech_output import SpeechWorker  # noqa: E402
+
+SUMMARY = (
+    "Python is a high-level, general-purpose programming language. "
+    "Its design philosophy emphasizes code readability with the use of significant indentation. "
+    "Python is dynamically typed and garbage-collected. "
+    "It supports multiple programming paradigms, including structured, object-oriented and functional programming."
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ms-per-char', type=float, default=2.0)
+    args = parser.parse_args()
+
+    # Old path: whole text synthesized on the caller's thread
+    engine = TimedEngine(args.ms_per_char)
+    first = []
+    engine.connect('started-utterance', lambda name: first.append(time.monotonic()))
+    start = time.monotonic()
+    engine.say(SUMMARY)
+    engine.runAndWait()
+    blocking_call = time.monotonic() - start
+    blocking_ttfa = first[0] - start
+
+    worker = SpeechWorker(lambda: TimedEngine(args.ms_per_char))
+    worker.start()
+    worker.ready.wait()
+    start = time.monotonic()
+    done = worker.say(SUMMARY)
+    worker_call = time.monotonic() - start
+    done.result()
+    worker.stop()
+
+    print(f"{'':24} {'blocking':>10} {'worker':>10}")
+    print(f"{'speak() returns ms':24} {blocking_call * 1000:>10.1f} {worker_call * 1000:>10.3f}")
+    print(f"{'time to first audio ms':24} {blocking_ttfa * 1000:>10.1f} {worker.stats()['ttfa_p50_ms']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
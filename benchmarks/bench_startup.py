@@ -0,0 +1,89 @@
+"""Startup benchmark: time-to-window, time-to-first-listen and import breakdown.
+
+Launches Main.py in a subprocess with a WAV-backed fake microphone, asks it
+to write its startup timeline and exit once the mic is calibrated, and
+parses ``-X importtime`` output for the slowest top-level imports.
+Needs a display for the Tk window (e.g. run under xvfb-run on servers).
+
+Usage: python benchmarks/bench_startup.py [--runs N]
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fixtures import synth_pcm, write_wav  # noqa: E402
+
+_IMPORTTIME_RE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)')
+
+
+def parse_importtime(stderr: str):
+    """Cumulative microseconds for each top-level (un-nested) import."""
+    totals = {}
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if match and len(match.group(3)) == 1:
+            totals[match.group(4)] = int(match.group(2))
+    return totals
+
+
+def run_once(wav_path: str, timeout: float):
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as report:
+        report_path = report.name
+    env = dict(os.environ,
+               ASSISTANT_FAKE_MIC_WAV=wav_path,
+               ASSISTANT_STARTUP_PROFILE=report_path,
+               ASSISTANT_STARTUP_EXIT='1')
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', os.path.join(ROOT, 'Main.py')],
+                          env=env, cwd=ROOT, capture_output=True, text=True, timeout=timeout)
+    wall = time.perf_counter() - started
+    try:
+        with open(report_path) as report:
+            timeline = json.load(report)
+    except (OSError, ValueError):
+        sys.exit(f"Main.py did not write a startup report:\n{proc.stderr[-2000:]}")
+    finally:
+        os.unlink(report_path)
+    return wall, timeline, parse_importtime(proc.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--timeout', type=float, default=60.0)
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as wav:
+        wav_path = wav.name
+    write_wav(wav_path, synth_pcm([('silence', 3.0)]))
+
+    try:
+        runs = [run_once(wav_path, args.timeout) for _ in range(args.runs)]
+    finally:
+        os.unlink(wav_path)
+
+    print(f"{'run':>4} {'window ms':>10} {'first listen ms':>16} {'process s':>10}")
+    for n, (wall, timeline, _) in enumerate(runs, 1):
+        marks = timeline['marks_ms']
+        print(f"{n:>4} {marks.get('window', float('nan')):>10.1f} "
+              f"{marks.get('first_listen', float('nan')):>16.1f} {wall:>10.2f}")
+
+    _, timeline, imports = runs[-1]
+    print("\nslowest top-level imports at load (ms):")
+    for name, micros in sorted(imports.items(), key=lambda item: -item[1])[:10]:
+        print(f"  {name:30} {micros / 1000:8.1f}")
+    print("\ndeferred imports, loaded in the background (ms):")
+    for name, millis in sorted(timeline['lazy_imports_ms'].items(), key=lambda item: -item[1]):
+        print(f"  {name:30} {millis:8.1f}")
+
+
+if __name__ == '__main__':
+    main()
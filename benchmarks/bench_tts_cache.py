@@ -0,0 +1,101 @@
+"""Benchmark the speech audio cache: hit rate and time to first audio.
+
+Replays a mix of fixed phrases, repeated dynamic answers and one-off text
+through the speech worker twice with a timed pyttsx3 stand-in: once
+synthesizing everything, once with fixed phrases pre-rendered into memory
+and sentences heard again rendered into the disk cache while idle.
+
+Usage: python benchmarks/bench_tts_cache.py [--requests N] [--synth-ms-per-char N]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import TimedEngine, TimedPlayer  # noqa: E402
+from latency import LatencyWindow  # noqa: E402
+from speech_output import SpeechWorker, split_sentences  # noqa: E402
+from tts_cache import TTSAudioCache  # noqa: E402
+
+FIXED = [
+    "Good morning Alex!", "How can I help you today?", "Opening YouTube", "Opening Google",
+    "Opening Spotify", "I didn't catch that. Could you please repeat?",
+    "Sorry, I had trouble executing that command.", "According to Wikipedia",
+]
+CITIES = ['London', 'Paris', 'Delhi', 'Tokyo', 'Berlin', 'Lima']
+
+
+def workload(count: int, seed: int = 5):
+    """60% fixed phrases, 30% weather reports for a few cities, 10% one-off text."""
+    rng = random.Random(seed)
+    texts = []
+    for n in range(count):
+        roll = rng.random()
+        if roll < 0.6:
+            texts.append(rng.choice(FIXED))
+        elif roll < 0.9:
+            city = rng.choice(CITIES)
+            texts.append(f"Current weather in {city}: Condition: Partly cloudy. Temperature: 18.0°C.")
+        else:
+            texts.append(f"Here is answer number {n}, which nobody will ask for again.")
+    return texts
+
+
+def replay(worker: SpeechWorker, texts, gap: float) -> LatencyWindow:
+    worker.start()
+    worker.ready.wait()
+    deadline = time.monotonic() + 30
+    prerender = sum(len(split_sentences(p)) for p in FIXED) if worker.audio_cache is not None else 0
+    while worker.rendered < prerender and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    ttfa = LatencyWindow(size=len(texts))
+    for text in texts:
+        before = len(worker.first_audio_latencies)
+        worker.say(text).result()
+        if len(worker.first_audio_latencies) > before:
+            ttfa.add(worker.first_audio_latencies[-1])
+        time.sleep(gap)  # The user listening and replying; idle time for rendering
+    worker.stop()
+    return ttfa
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--synth-ms-per-char', type=float, default=2.0, help="synthesis cost before audio")
+    parser.add_argument('--ms-per-char', type=float, default=0.2, help="playback time (kept short)")
+    parser.add_argument('--gap', type=float, default=0.05, help="idle time between utterances")
+    args = parser.parse_args()
+
+    texts = workload(args.requests)
+
+    def engine():
+        return TimedEngine(args.ms_per_char, synth_ms_per_char=args.synth_ms_per_char)
+
+    plain = replay(SpeechWorker(engine), texts, args.gap)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = TTSAudioCache(os.path.join(tmp, 'tts.sqlite3'))
+        worker = SpeechWorker(engine, audio_cache=cache, prerender=FIXED, player_factory=TimedPlayer)
+        cached = replay(worker, texts, args.gap)
+        hit_rate, memory_kb = cache.hit_rate, cache.memory_bytes / 1024
+        cache.close()
+
+    print(f"{len(texts)} utterances, synthesis {args.synth_ms_per_char} ms/char")
+    print(f"{'':24}{'synthesized':>12}{'cached':>12}")
+    for q in (50, 95, 99):
+        key = f'p{q}_ms'
+        print(f"TTFA {key:<19}{plain.summary((q,))[key]:12.1f}{cached.summary((q,))[key]:12.1f}")
+    print(f"cache hit rate (sentences) {100 * hit_rate:.1f} %, {worker.rendered} rendered, "
+          f"{memory_kb:.0f} KiB pinned in memory")
+    print(f"cached-play TTFA p50 {worker.cached_ttfa.summary((50,))['p50_ms']:.1f} ms, "
+          f"synthesized TTFA p50 {worker.synthesized_ttfa.summary((50,))['p50_ms']:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Benchmark the wake-word gate: false accepts, false rejects and CPU per hour of audio.
+
+Streams WAV fixtures through the real capture thread (faster than real
+time) with the keyword spotter in front. Positive fixtures contain the wake
+phrase; negatives are background chatter and noise (several minutes of
+synthetic voiced/unvoiced audio are used when no negatives are given).
+Also counts how many utterances would have reached the cloud recognizer
+without the gate.
+
+Usage: python benchmarks/bench_wake_word.py --model VOSK_MODEL_DIR [--positives DIR] [--negatives DIR]
+"""
+import argparse
+import asyncio
+import glob
+import os
+import random
+import sys
+import tempfile
+import time
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_capture import AudioCaptureThread, WavFileSource  # noqa: E402
+from benchmarks.fixtures import SAMPLE_RATE, synth_pcm, write_wav  # noqa: E402
+from wake_word import VoskSpotter  # noqa: E402
+
+
+def synth_chatter(path: str, minutes: float, seed: int = 3) -> None:
+    """Alternating bursts of speech-like sound and pauses of random length."""
+    rng = random.Random(seed)
+    segments = [('silence', 1.5)]
+    total = 1.5
+    while total < minutes * 60:
+        speech, pause = rng.uniform(0.3, 3.0), rng.uniform(0.2, 2.5)
+        segments += [('speech', speech), ('silence', pause)]
+        total += speech + pause
+    write_wav(path, synth_pcm(segments, seed=seed))
+
+
+def wav_seconds(path: str) -> float:
+    with wave.open(path, 'rb') as wav:
+        return wav.getnframes() / float(wav.getframerate())
+
+
+async def scan(path: str, spotter):
+    """Run one file through the capture thread; returns (capture thread, CPU seconds)."""
+    loop = asyncio.get_event_loop()
+    capture = AudioCaptureThread(WavFileSource(path, realtime=False), loop, asyncio.Queue(), spotter=spotter)
+    capture.enabled.set()
+    cpu_started = time.process_time()
+    capture.start()
+    await loop.run_in_executor(None, capture.finished.wait)
+    cpu = time.process_time() - cpu_started
+    await asyncio.sleep(0)  # Let queued deliveries land
+    return capture, cpu
+
+
+async def run(args, positives, negatives):
+    spotter = VoskSpotter(args.model, args.phrase)
+    spotter.open(SAMPLE_RATE)  # Load the model up front so it isn't billed to the first file
+
+    rejected = 0
+    for path in positives:
+        capture, _ = await scan(path, spotter)
+        if capture.wake_words == 0:
+            rejected += 1
+            print(f"  missed: {os.path.basename(path)}")
+
+    hours = sum(wav_seconds(p) for p in negatives) / 3600
+    accepts = gated = ungated = spotted = captured = 0
+    cpu = 0.0
+    for path in negatives:
+        capture, seconds = await scan(path, spotter)
+        accepts += capture.wake_words
+        gated += capture.utterances_delivered
+        spotted += capture.frames_spotted
+        captured += capture.frames_captured
+        cpu += seconds
+        plain, _ = await scan(path, None)
+        ungated += plain.utterances_delivered
+
+    print(f"phrase '{args.phrase}', {len(positives)} positive and {len(negatives)} negative files "
+          f"({hours * 60:.1f} min of negatives)")
+    if positives:
+        print(f"  false reject rate      {100.0 * rejected / len(positives):6.1f} %")
+    print(f"  false accepts          {accepts} ({accepts / hours:.1f} per hour)")
+    print(f"  frames sent to spotter {100.0 * spotted / max(1, captured):6.1f} % (voiced only)")
+    print(f"  CPU per hour of audio  {cpu / hours:8.1f} s ({100.0 * cpu / (hours * 3600):.2f} % of a core)")
+    print(f"  utterances to cloud    {ungated} without gate, {gated} with gate")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', required=True, help="Vosk model directory")
+    parser.add_argument('--phrase', default='hey assistant')
+    parser.add_argument('--positives', help="directory of mono 16-bit WAVs containing the phrase")
+    parser.add_argument('--negatives', help="directory of mono 16-bit WAVs without it")
+    parser.add_argument('--minutes', type=float, default=10.0, help="synthetic negatives when none given")
+    args = parser.parse_args()
+
+    positives = sorted(glob.glob(os.path.join(args.positives, '*.wav'))) if args.positives else []
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.negatives:
+            negatives = sorted(glob.glob(os.path.join(args.negatives, '*.wav')))
+        else:
+            negatives = [os.path.join(tmp, 'chatter.wav')]
+            synth_chatter(negatives[0], args.minutes)
+        asyncio.run(run(args, positives, negatives))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Benchmark the weather client against a local stub WeatherAPI server.
+
+Replays a skewed city workload with bursts of concurrent identical asks and
+compares a fresh requests.get per ask with the pooled, cached and coalescing
+WeatherClient. Reports upstream request count, cache hit rate and p50/p99.
+
+Usage: python benchmarks/bench_weather.py [--asks N] [--latency SECONDS]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests  # noqa: E402
+
+from benchmarks.stubs import weather_server  # noqa: E402
+from latency import LatencyWindow  # noqa: E402
+from weather_service import WeatherClient  # noqa: E402
+
+CITIES = ['London', 'Paris', 'Delhi', 'Tokyo', 'New York', 'Mumbai', 'Berlin', 'Sydney',
+          'Cairo', 'Toronto', 'Lagos', 'Lima', 'Oslo', 'Seoul', 'Dubai', 'Rome']
+
+
+def workload(asks: int, seed: int = 1):
+    """Zipf-like city choice, each ask repeated as a burst of 1-4 concurrent requests."""
+    rng = random.Random(seed)
+    weights = [1.0 / (rank + 1) for rank in range(len(CITIES))]
+    bursts = []
+    while sum(len(b) for b in bursts) < asks:
+        city = rng.choices(CITIES, weights)[0]
+        spelling = rng.choice([city, city.lower(), f" {city.upper()}?"])
+        bursts.append([spelling] * rng.randint(1, 4))
+    return bursts
+
+
+async def run_naive(url, bursts):
+    latency = LatencyWindow()
+    loop = asyncio.get_event_loop()
+
+    def get(city):
+        started = time.perf_counter()
+        requests.get(url, params={'key': 'bench', 'q': city, 'aqi': 'no'})
+        latency.add(time.perf_counter() - started)
+
+    for burst in bursts:
+        await asyncio.gather(*(loop.run_in_executor(None, get, city) for city in burst))
+    return latency
+
+
+async def run_client(url, bursts):
+    client = WeatherClient('bench', base_url=url)
+    for burst in bursts:
+        await asyncio.gather(*(client.current(city) for city in burst))
+    client.close()
+    return client
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--asks', type=int, default=400)
+    parser.add_argument('--latency', type=float, default=0.05, help="stub server latency per request")
+    args = parser.parse_args()
+    bursts = workload(args.asks)
+
+    with weather_server(args.latency) as server:
+        url = server.url + '/v1/current.json'
+        naive = asyncio.run(run_naive(url, bursts))
+        naive_requests = server.requests
+        client = asyncio.run(run_client(url, bursts))
+        client_requests = server.requests - naive_requests
+
+    summary = naive.summary((50, 99))
+    stats = client.stats()
+    print(f"{'':22} {'requests.get':>14} {'WeatherClient':>14}")
+    print(f"{'asks':22} {naive.count:>14} {client.lookup_latency.count:>14}")
+    print(f"{'upstream requests':22} {naive_requests:>14} {client_requests:>14}")
+    print(f"{'cache hit rate':22} {'-':>14} {stats['hit_rate']:>14.1%}")
+    print(f"{'coalesced':22} {'-':>14} {stats['coalesced']:>14}")
+    print(f"{'p50 ms':22} {summary['p50_ms']:>14.2f} {stats['lookup_p50_ms']:>14.2f}")
+    print(f"{'p99 ms':22} {summary['p99_ms']:>14.2f} {stats['lookup_p99_ms']:>14.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Benchmark offline Wikipedia ingestion and lookups on a synthetic abstracts dump.
+
+Reports ingestion throughput and peak Python memory (which should stay
+bounded as the dump grows), index size, and per-lookup latency for exact,
+auto-suggested and disambiguation queries.
+
+Usage: python benchmarks/bench_wiki_offline.py [--docs N]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from xml.sax.saxutils import escape
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from latency import LatencyWindow  # noqa: E402
+from wiki_offline import DisambiguationError, OfflineWikipedia, PageError, ingest  # noqa: E402
+
+WORDS = ('alpha bravo charlie delta echo foxtrot golf hotel india juliet kilo lima mike '
+         'november oscar papa quebec romeo sierra tango uniform victor whiskey xray yankee zulu').split()
+
+
+def write_dump(path: str, docs: int, seed: int = 5) -> list:
+    rng = random.Random(seed)
+    titles = []
+    with open(path, 'w', encoding='utf-8') as dump:
+        dump.write('<feed>\n')
+        for n in range(docs):
+            title = f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()} {n}"
+            abstract = ' '.join(rng.choice(WORDS) for _ in range(40)).capitalize() + '. Second sentence here.'
+            titles.append(title)
+            dump.write(f'<doc><title>Wikipedia: {escape(title)}</title>'
+                       f'<abstract>{escape(abstract)}</abstract></doc>\n')
+        dump.write('<doc><title>Wikipedia: Mercury</title><abstract>Mercury may refer to:</abstract></doc>\n')
+        for option in ('planet', 'element', 'mythology'):
+            dump.write(f'<doc><title>Wikipedia: Mercury ({option})</title>'
+                       f'<abstract>Mercury the {option}. More text.</abstract></doc>\n')
+        dump.write('</feed>\n')
+    return titles
+
+
+def time_lookups(wiki, queries, auto_suggest=True):
+    latency = LatencyWindow(len(queries))
+    for query in queries:
+        started = time.perf_counter()
+        try:
+            wiki.summary(query, sentences=2, auto_suggest=auto_suggest)
+        except (DisambiguationError, PageError):
+            pass
+        latency.add(time.perf_counter() - started)
+    return latency.summary((50, 99))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--docs', type=int, default=100000)
+    parser.add_argument('--run-size', type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dump = os.path.join(tmp, 'abstracts.xml')
+        titles = write_dump(dump, args.docs)
+        out_dir = os.path.join(tmp, 'index')
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        count = ingest(dump, out_dir, run_size=args.run_size)
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        size = sum(os.path.getsize(os.path.join(out_dir, name)) for name in os.listdir(out_dir))
+        print(f"ingested {count} docs in {elapsed:.1f}s ({count / elapsed:,.0f} docs/s), "
+              f"peak Python memory {peak / 2**20:.1f} MiB, index {size / 2**20:.1f} MiB "
+              f"(dump {os.path.getsize(dump) / 2**20:.1f} MiB)")
+
+        wiki = OfflineWikipedia.open(out_dir)
+        rng = random.Random(9)
+        sample = rng.sample(titles, min(2000, len(titles)))
+        rows = [
+            ('exact', time_lookups(wiki, sample, auto_suggest=False)),
+            ('auto-suggest prefix', time_lookups(wiki, [' '.join(t.split()[:2]) for t in sample[:500]])),
+            ('auto-suggest typo', time_lookups(wiki, [t[:3] + t[4:] for t in sample[:500]])),
+            ('disambiguation', time_lookups(wiki, ['mercury'] * 200)),
+        ]
+        print(f"{'lookup':22} {'p50 ms':>8} {'p99 ms':>8}")
+        for name, summary in rows:
+            print(f"{name:22} {summary['p50_ms']:>8.3f} {summary['p99_ms']:>8.3f}")
+        wiki.index.close()
+
+
+if __name__ == '__main__':
+    main()
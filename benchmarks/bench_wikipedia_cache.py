@@ -0,0 +1,78 @@
+"""Benchmark the Wikipedia summary cache with a local stand-in for the wikipedia module.
+
+Replays a repetitive question workload twice (cold cache, then a new service
+on the same SQLite file, as after a restart) and times disambiguation
+follow-ups with and without prefetch.
+
+Usage: python benchmarks/bench_wikipedia_cache.py [--latency SECONDS]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stubs import FakeWikipedia  # noqa: E402
+from latency import LatencyWindow  # noqa: E402
+from wiki_service import SummaryCache, WikipediaService  # noqa: E402
+
+TOPICS = ['Albert Einstein', 'machine learning', 'the Eiffel Tower', 'photosynthesis',
+          'Ada Lovelace', 'black holes', 'the Roman Empire', 'jazz']
+
+
+async def replay(service, queries):
+    latency = LatencyWindow()
+    for query in queries:
+        started = time.perf_counter()
+        await service.summary(query)
+        latency.add(time.perf_counter() - started)
+    return latency
+
+
+async def follow_up(service, prefetch_wait: float):
+    """Ask an ambiguous question, wait as a user would, then ask for the first option."""
+    result = await service.summary('mercury')
+    await asyncio.sleep(prefetch_wait)
+    started = time.perf_counter()
+    await service.summary(result.options[0])
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--queries', type=int, default=60)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    queries = [rng.choice(TOPICS) + rng.choice(['', '?', '!']) for _ in range(args.queries)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'wiki.sqlite3')
+        rows = []
+        for run in ('cold', 'after restart'):
+            fake = FakeWikipedia(args.latency)
+            service = WikipediaService(SummaryCache(path), module=fake)
+            latency = asyncio.run(replay(service, queries))
+            stats = service.stats()
+            service.close()
+            rows.append((run, fake.calls, stats['hit_rate'], latency.summary((50, 99))))
+
+        print(f"{'run':15} {'upstream':>9} {'hit rate':>9} {'p50 ms':>9} {'p99 ms':>9}")
+        for run, calls, hit_rate, summary in rows:
+            print(f"{run:15} {calls:>9} {hit_rate:>9.1%} {summary['p50_ms']:>9.2f} {summary['p99_ms']:>9.2f}")
+
+        for prefetch in (0, 3):
+            service = WikipediaService(SummaryCache(os.path.join(tmp, f'follow{prefetch}.sqlite3')),
+                                       module=FakeWikipedia(args.latency), prefetch=prefetch)
+            elapsed = asyncio.run(follow_up(service, prefetch_wait=args.latency * 2))
+            service.close()
+            print(f"disambiguation follow-up, prefetch={prefetch}: {elapsed * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""In-process stand-ins for the microphone, speech recognizer and TTS engine."""
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+from benchmarks.fixtures import SAMPLE_RATE, synth_pcm, write_wav
+from recognizers import RecognizerBackend, UnknownSpeechError
+
+
+class TimedEngine:
+    """pyttsx3 stand-in: synthesis latency before audio starts, then playback time.
+
+    Both grow with the length of the text handed to say(), like drivers that
+    render a whole utterance before playing it. ``audio_started`` records
+    (monotonic time, text) for every utterance that reached the speaker.
+    save_to_file() pays the synthesis cost and writes silence of the length
+    playback would have taken.
+    """
+
+    def __init__(self, ms_per_char: float, synth_ms_per_char: float = 0.5, startup_ms: float = 20.0):
+        self.ms_per_char = ms_per_char
+        self.synth_ms_per_char = synth_ms_per_char
+        self.startup_ms = startup_ms
+        self.audio_started: List[Tuple[float, str]] = []
+        self._pending = []
+        self._callbacks = []
+
+    def connect(self, topic, callback):
+        if topic == 'started-utterance':
+            self._callbacks.append(callback)
+
+    def getProperty(self, name):
+        return {'voice': 'timed', 'rate': 200}.get(name)
+
+    def say(self, text):
+        self._pending.append((text, None))
+
+    def save_to_file(self, text, path):
+        self._pending.append((text, path))
+
+    def runAndWait(self):
+        pending, self._pending = self._pending, []
+        for text, path in pending:
+            time.sleep((self.startup_ms + len(text) * self.synth_ms_per_char) / 1000)
+            if path is not None:
+                write_wav(path, bytes(int(len(text) * self.ms_per_char * SAMPLE_RATE / 1000) * 2))
+                continue
+            self.audio_started.append((time.monotonic(), text))
+            for callback in self._callbacks:
+                callback(None)
+            time.sleep(len(text) * self.ms_per_char / 1000)
+
+    def stop(self):
+        self._pending = []
+
+
+class TimedPlayer:
+    """PCMPlayer stand-in: a short device start-up delay, then the clip's real duration."""
+
+    def __init__(self, startup_ms: float = 5.0, chunk_seconds: float = 0.05):
+        self.startup_ms = startup_ms
+        self.chunk_seconds = chunk_seconds
+        self.played = 0
+
+    def play(self, clip, on_start=None, should_stop=None) -> bool:
+        self.played += 1
+        time.sleep(self.startup_ms / 1000)
+        if on_start is not None:
+            on_start()
+        remaining = clip.duration
+        while remaining > 0:
+            if should_stop is not None and should_stop():
+                return False
+            time.sleep(min(self.chunk_seconds, remaining))
+            remaining -= self.chunk_seconds
+        return True
+
+    def close(self) -> None:
+        pass
+
+
+class ScriptedMicrophone:
+    """Audio source standing in for sr.Microphone, paced in real time.
+
+    Produces low background noise until ``say()`` queues a line, then a burst
+    of synthetic speech for it. When the burst has been captured the line is
+    appended to ``transcripts`` (for ScriptedRecognizer) and ``speech_ended``
+    holds the monotonic time the user stopped talking.
+    """
+
+    def __init__(self, chunk_size: int = 512, sample_rate: int = SAMPLE_RATE,
+                 speech_seconds: float = 0.8, realtime: bool = True):
+        self.chunk_size = chunk_size
+        self.sample_rate = sample_rate
+        self.sample_width = 2
+        self.realtime = realtime
+        self.transcripts: Deque[str] = deque()
+        self.speech_ended: Optional[float] = None
+        self.lines_spoken = 0
+
+        frame_bytes = chunk_size * self.sample_width
+        silence = synth_pcm([('silence', 1.0)], sample_rate, seed=1)
+        speech = synth_pcm([('speech', speech_seconds)], sample_rate)
+        speech += silence[:-len(speech) % frame_bytes]  # Pad to whole frames
+        self._silence = [silence[i:i + frame_bytes] for i in range(0, len(silence) - frame_bytes + 1, frame_bytes)]
+        self._speech = [speech[i:i + frame_bytes] for i in range(0, len(speech), frame_bytes)]
+        self._queue: Deque[str] = deque()
+        self._lock = threading.Lock()
+        self._line: Optional[str] = None
+        self._position = 0
+        self._silence_index = 0
+        self._next_deadline = 0.0
+
+    @property
+    def frame_samples(self) -> int:
+        return self.chunk_size
+
+    def say(self, text: str) -> None:
+        """Speak a line into the microphone as soon as the current one is done."""
+        with self._lock:
+            self._queue.append(text)
+
+    def open(self) -> None:
+        self._next_deadline = time.monotonic()
+
+    def read(self) -> Optional[bytes]:
+        if self.realtime:
+            self._next_deadline += self.chunk_size / float(self.sample_rate)
+            delay = self._next_deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+        if self._line is None:
+            with self._lock:
+                if self._queue:
+                    self._line = self._queue.popleft()
+                    self._position = 0
+        if self._line is None:
+            self._silence_index = (self._silence_index + 1) % len(self._silence)
+            return self._silence[self._silence_index]
+
+        frame = self._speech[self._position]
+        self._position += 1
+        if self._position == len(self._speech):
+            self.transcripts.append(self._line)
+            self.speech_ended = time.monotonic()
+            self.lines_spoken += 1
+            self._line = None
+        return frame
+
+    def resume(self) -> None:
+        self._next_deadline = time.monotonic()
+
+    def close(self) -> None:
+        pass
+
+
+class ScriptedRecognizer(RecognizerBackend):
+    """Recognizer backend that 'hears' exactly what ScriptedMicrophone said, after a fixed delay."""
+
+    name = 'scripted'
+
+    def __init__(self, microphone: ScriptedMicrophone, latency: float = 0.3):
+        self.microphone = microphone
+        self.latency = latency
+        self.calls = 0
+
+    async def recognize(self, utterance) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if not self.microphone.transcripts:
+            raise UnknownSpeechError("scripted recognizer heard noise")
+        return self.microphone.transcripts.popleft()
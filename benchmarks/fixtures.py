@@ -0,0 +1,53 @@
+"""Synthetic audio fixtures shared by the benchmarks."""
+import math
+import random
+import struct
+import wave
+from typing import List, Tuple
+
+SAMPLE_RATE = 16000
+
+
+def synth_pcm(segments: List[Tuple[str, float]], sample_rate: int = SAMPLE_RATE,
+              noise: float = 60.0, amplitude: float = 6000.0, seed: int = 7) -> bytes:
+    """Render ('silence'|'speech', seconds) segments to 16-bit mono PCM.
+
+    "Speech" is a vowel-like mix of harmonics with a slow amplitude envelope,
+    which is enough to drive energy-based endpointing.
+    """
+    rng = random.Random(seed)
+    samples = []
+    for kind, seconds in segments:
+        count = int(seconds * sample_rate)
+        for n in range(count):
+            value = rng.gauss(0.0, noise)
+            if kind == 'speech':
+                t = n / sample_rate
+                envelope = 0.6 + 0.4 * math.sin(2 * math.pi * 3 * t)
+                value += amplitude * envelope * (
+                    0.6 * math.sin(2 * math.pi * 180 * t)
+                    + 0.3 * math.sin(2 * math.pi * 360 * t)
+                    + 0.1 * math.sin(2 * math.pi * 720 * t)
+                )
+            samples.append(max(-32768, min(32767, int(value))))
+    return struct.pack(f'<{len(samples)}h', *samples)
+
+
+def write_wav(path: str, pcm: bytes, sample_rate: int = SAMPLE_RATE) -> None:
+    """Write 16-bit mono PCM to a WAV file."""
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+
+
+def speech_end_times(segments: List[Tuple[str, float]]) -> List[float]:
+    """Offsets (seconds from start of file) at which each speech segment ends."""
+    ends = []
+    offset = 0.0
+    for kind, seconds in segments:
+        offset += seconds
+        if kind == 'speech':
+            ends.append(offset)
+    return ends
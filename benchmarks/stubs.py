@@ -0,0 +1,225 @@
+"""Local stand-in HTTP servers for the external APIs the assistant calls."""
+import json
+import random
+import threading
+import time
+import zlib
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class StubServer:
+    """Run a request handler class on a background ThreadingHTTPServer bound to localhost."""
+
+    def __init__(self, handler_class, **attributes):
+        handler = type(handler_class.__name__, (handler_class,), dict(attributes, server_stats={'requests': 0}))
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.httpd.daemon_threads = True
+        self.handler = handler
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def requests(self) -> int:
+        return self.handler.server_stats['requests']
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class JSONHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    latency = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status: int, payload) -> None:
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class WeatherAPIHandler(JSONHandler):
+    """Answers /v1/current.json like api.weatherapi.com for any 'q'."""
+
+    unknown = ('atlantis',)
+
+    def do_GET(self):
+        self.server_stats['requests'] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        query = parse_qs(urlparse(self.path).query)
+        city = query.get('q', [''])[0]
+        if not city or city.lower() in self.unknown:
+            self.send_json(400, {'error': {'code': 1006, 'message': 'No matching location found.'}})
+            return
+        self.send_json(200, {
+            'location': {'name': city.title()},
+            'current': {
+                'temp_c': 18.0, 'feelslike_c': 17.0, 'humidity': 60, 'wind_kph': 11.2,
+                'condition': {'text': 'Partly cloudy'},
+            },
+        })
+
+
+def weather_server(latency: float = 0.05) -> StubServer:
+    """Stub WeatherAPI server; point WeatherClient.base_url at url + '/v1/current.json'."""
+    return StubServer(WeatherAPIHandler, latency=latency)
+
+
+class FaultyWeatherAPIHandler(WeatherAPIHandler):
+    """WeatherAPIHandler that misbehaves on a share of requests, as set in ``faults``.
+
+    ``slow_rate`` of requests take ``slow_latency`` instead of the usual
+    latency, ``hang_rate`` stall for ``hang_seconds`` before answering and
+    ``error_rate`` get a 503. While ``outage`` is set every request gets a
+    503; benchmarks flip it on the shared dict to simulate the service going
+    down and coming back.
+    """
+
+    faults = {}
+
+    def do_GET(self):
+        faults = self.faults
+        with faults['lock']:
+            roll = faults['rng'].random()
+        if faults.get('outage') or roll < faults.get('error_rate', 0.0):
+            self.server_stats['requests'] += 1
+            time.sleep(self.latency)
+            self.send_json(503, {'error': {'code': 9999, 'message': 'Service temporarily unavailable.'}})
+            return
+        roll -= faults.get('error_rate', 0.0)
+        if roll < faults.get('hang_rate', 0.0):
+            time.sleep(faults.get('hang_seconds', 30.0))
+        elif roll - faults.get('hang_rate', 0.0) < faults.get('slow_rate', 0.0):
+            time.sleep(max(0.0, faults.get('slow_latency', 1.0) - self.latency))
+        try:
+            super().do_GET()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client timed out and hung up
+
+
+def faulty_weather_server(latency: float = 0.05, seed: int = 24, **faults) -> StubServer:
+    """Stub WeatherAPI server injecting slow, hung and failed responses; change ``server.handler.faults`` to steer it."""
+    return StubServer(FaultyWeatherAPIHandler, latency=latency,
+                      faults=dict(faults, rng=random.Random(seed), lock=threading.Lock()))
+
+
+class MediaWikiHandler(JSONHandler):
+    """Answers the api.php queries the ``wikipedia`` module makes for search() and summary().
+
+    Titles in FakeWikipedia.AMBIGUOUS are disambiguation pages and titles
+    starting with 'zzz' do not exist, matching the in-process fake.
+    """
+
+    def do_GET(self):
+        self.server_stats['requests'] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query, keep_blank_values=True).items()}
+        if params.get('list') == 'search':
+            self.send_json(200, self.search(params.get('srsearch', '')))
+            return
+        title = params.get('titles', '')
+        prop = params.get('prop', '')
+        if 'info' in prop:
+            self.send_json(200, self.info(title))
+        elif prop == 'revisions':
+            self.send_json(200, self.revisions(title))
+        elif prop == 'extracts':
+            self.send_json(200, self.extract(title))
+        else:
+            self.send_json(200, {'error': {'code': 'badparams', 'info': f'unsupported query: {self.path}'}})
+
+    @staticmethod
+    def page_id(title: str) -> str:
+        return str(zlib.crc32(title.lower().encode('utf-8')) & 0x7fffffff)
+
+    @staticmethod
+    def search(query: str):
+        hits = [] if query.lower().startswith('zzz') else [{'ns': 0, 'title': query[:1].upper() + query[1:]}]
+        return {'query': {'search': hits}}
+
+    def info(self, title: str):
+        if title.lower().startswith('zzz'):
+            return {'query': {'pages': {'-1': {'ns': 0, 'title': title, 'missing': ''}}}}
+        page = {'pageid': int(self.page_id(title)), 'ns': 0, 'title': title,
+                'fullurl': f'https://en.wikipedia.org/wiki/{title.replace(" ", "_")}'}
+        if title.lower() in FakeWikipedia.AMBIGUOUS:
+            page['pageprops'] = {'disambiguation': ''}
+        return {'query': {'pages': {self.page_id(title): page}}}
+
+    def revisions(self, title: str):
+        items = ''.join(f'<li><a href="/wiki/{escape(option)}">{escape(option)}</a></li>'
+                        for option in FakeWikipedia.AMBIGUOUS.get(title.lower(), []))
+        html = f'<p><b>{escape(title)}</b> may refer to:</p><ul>{items}</ul>'
+        return {'query': {'pages': {self.page_id(title): {'title': title, 'revisions': [{'*': html}]}}}}
+
+    def extract(self, title: str):
+        return {'query': {'pages': {self.page_id(title): {'title': title, 'extract': FakeWikipedia.text(title)}}}}
+
+
+def wikipedia_server(latency: float = 0.1) -> StubServer:
+    """Stub MediaWiki API; point the wikipedia module's API_URL at url + '/w/api.php'."""
+    return StubServer(MediaWikiHandler, latency=latency)
+
+
+class _DisambiguationError(Exception):
+    def __init__(self, title, options):
+        super().__init__(f'"{title}" may refer to: ' + ', '.join(options))
+        self.title = title
+        self.options = options
+
+
+class _PageError(Exception):
+    pass
+
+
+class FakeWikipedia:
+    """In-process stand-in for the ``wikipedia`` module with a fixed per-call latency."""
+
+    class exceptions:
+        DisambiguationError = _DisambiguationError
+        PageError = _PageError
+
+    AMBIGUOUS = {
+        'mercury': ['Mercury (planet)', 'Mercury (element)', 'Mercury (mythology)', 'Freddie Mercury'],
+        'python': ['Python (programming language)', 'Pythonidae', 'Monty Python'],
+        'java': ['Java (programming language)', 'Java', 'Java coffee'],
+    }
+
+    def __init__(self, latency: float = 0.2):
+        self.latency = latency
+        self.calls = 0
+        self.lang = 'en'
+
+    def set_lang(self, lang):
+        self.lang = lang
+
+    def summary(self, title, sentences=0, auto_suggest=True):
+        self.calls += 1
+        time.sleep(self.latency)
+        key = title.lower()
+        if key in self.AMBIGUOUS:
+            raise _DisambiguationError(title, self.AMBIGUOUS[key])
+        if key.startswith('zzz'):
+            raise _PageError(title)
+        return self.text(title)
+
+    @staticmethod
+    def text(title: str) -> str:
+        return f"{title} is a topic with a summary. This is its second sentence."
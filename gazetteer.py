@@ -0,0 +1,220 @@
+import functools
+import logging
+import os
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from intent_router import tokenize
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PLACES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'places.tsv')
+COUNTRIES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'countries.tsv')
+
+# Words that introduce a location, and filler that trails one ("in paris today")
+_CUES = frozenset(('in', 'for', 'of', 'at', 'around', 'near'))
+_FILLER = frozenset(('today', 'tonight', 'now', 'right', 'please', 'currently', 'like', 'this', 'morning',
+                     'afternoon', 'evening', 'weather', 'forecast', 'the', 'is', 'it', 'what', "what's", 'whats'))
+_SEPARATORS = frozenset(('and', 'or', 'vs', 'versus', 'also', 'plus', 'then'))
+# Place names that are everyday words only count right after a cue or separator
+_COMMON_WORDS = frozenset(('nice', 'split', 'reading', 'mobile', 'bath', 'sale', 'orange', 'hope', 'most',
+                           'best', 'why', 'la'))
+_LEADS = _CUES | _SEPARATORS
+
+
+def normalize(text: str) -> List[str]:
+    """Tokens with accents folded, so "São Paulo" and "Sao Paulo" index alike."""
+    folded = unicodedata.normalize('NFKD', text)
+    return tokenize(''.join(ch for ch in folded if not unicodedata.combining(ch)).replace('.', ''))
+
+
+class Place(NamedTuple):
+    name: str
+    country: str
+    population: int
+    query: str  # What to send to the weather API
+
+
+class PlaceMatch(NamedTuple):
+    place: Place
+    start: int
+    end: int
+
+
+class _TrieNode:
+    __slots__ = ('children', 'places')
+
+    def __init__(self):
+        self.children: Dict[str, '_TrieNode'] = {}
+        self.places: Tuple = ()  # Place indexes, or country names in the country trie
+
+
+class Gazetteer:
+    """Place names and aliases in a token trie, matched longest-first over an utterance.
+
+    Names that are also everyday words ("nice") only count after "in", "for",
+    "and" or another place. A name shared by several places resolves to the most populous one unless
+    the utterance names the country right after it ("london canada", or an alias: "london uk").
+    """
+
+    def __init__(self, places: Iterable[Tuple[str, str, int, Iterable[str]]] = (),
+                 countries: Optional[Iterable[Tuple[str, Iterable[str]]]] = None):
+        self._root = _TrieNode()
+        self._countries = _TrieNode()
+        self.places: List[Place] = []
+        rows = sorted(places, key=lambda row: -row[2])
+        seen_names = set()
+        for name, country, population, aliases in rows:
+            key = ' '.join(normalize(name))
+            query = name
+            if key in seen_names:
+                # Not the best-known place of that name: ask for it by its qualified alias
+                qualified = [a for a in aliases if ' '.join(normalize(a)).startswith(key + ' ')]
+                query = qualified[0] if qualified else f'{name}, {country}'
+            seen_names.add(key)
+            index = len(self.places)
+            self.places.append(Place(name, country, population, query))
+            for phrase in (name, *aliases):
+                self._insert(self._root, normalize(phrase), index)
+            self._insert(self._countries, normalize(country), country)
+        for country, aliases in (country_names().values() if countries is None else countries):
+            for alias in aliases:
+                self._insert(self._countries, normalize(alias), country)
+
+    def __len__(self) -> int:
+        return len(self.places)
+
+    @staticmethod
+    def _insert(root: _TrieNode, tokens: List[str], value) -> None:
+        if not tokens:
+            return
+        node = root
+        for token in tokens:
+            node = node.children.setdefault(token, _TrieNode())
+        if value not in node.places:
+            node.places += (value,)
+
+    @staticmethod
+    def _longest(root: _TrieNode, tokens: List[str], start: int) -> Tuple[int, Tuple[int, ...]]:
+        node, end, found = root, start, (start, ())
+        while end < len(tokens):
+            node = node.children.get(tokens[end])
+            if node is None:
+                break
+            end += 1
+            if node.places:
+                found = (end, node.places)
+        return found
+
+    def find(self, text: str) -> List[PlaceMatch]:
+        """Distinct places mentioned in text, in the order they appear."""
+        tokens = normalize(text)
+        matches: List[PlaceMatch] = []
+        seen = set()
+        position = 0
+        while position < len(tokens):
+            end, candidates = self._longest(self._root, tokens, position)
+            listed = matches and matches[-1].end == position  # "munich, split and london"
+            if not candidates or (end - position == 1 and tokens[position] in _COMMON_WORDS and not listed
+                                  and not (position and tokens[position - 1] in _LEADS)):
+                position += 1
+                continue
+            index = candidates[0]
+            if len(candidates) > 1:
+                country_end, in_country = self._longest(self._countries, tokens, end)
+                qualified = [c for c in candidates if self.places[c].country in in_country]
+                if qualified:
+                    index, end = qualified[0], country_end
+            if index not in seen:
+                seen.add(index)
+                matches.append(PlaceMatch(self.places[index], position, end))
+            position = end
+        return matches
+
+
+def guess_locations(text: str) -> List[str]:
+    """Fallback for places the gazetteer doesn't know: the words after the last cue word."""
+    tokens = normalize(text)
+    cue = max((i for i, token in enumerate(tokens) if token in _CUES), default=None)
+    if cue is None:
+        return []
+    locations, current = [], []
+    for token in tokens[cue + 1:] + ['and']:
+        if token in _SEPARATORS:
+            if current:
+                locations.append(' '.join(current))
+            current = []
+        elif token not in _FILLER:
+            current.append(token)
+    return locations
+
+
+@functools.lru_cache(maxsize=None)
+def country_names(path: str = COUNTRIES) -> Dict[str, Tuple[str, Tuple[str, ...]]]:
+    """ISO 3166 country code -> (country name as places.tsv spells it, aliases)."""
+    countries = {}
+    with open(path, encoding='utf-8') as rows:
+        for line in rows:
+            if not line.strip() or line.startswith('#'):
+                continue
+            fields = line.rstrip('\n').split('\t') + ['']
+            countries[fields[0]] = (fields[1], tuple(a.strip() for a in fields[2].split(',') if a.strip()))
+    return countries
+
+
+def read_places(path: str) -> Iterable[Tuple[str, str, int, List[str]]]:
+    """Rows from the bundled TSV (name, country, population, aliases) or a GeoNames cities file."""
+    with open(path, encoding='utf-8') as places:
+        for line in places:
+            if not line.strip() or line.startswith('#'):
+                continue
+            fields = line.rstrip('\n').split('\t')
+            if len(fields) >= 15:
+                # GeoNames: id, name, asciiname, alternatenames, lat, lon, class, code, country code, ..., population
+                country = country_names().get(fields[8], (fields[8],))[0]
+                # Alternate names include airport and postal codes ("LON"); leave those out
+                aliases = [fields[2]] + [alias for alias in fields[3].split(',')
+                                         if alias and not (len(alias) <= 3 and alias.isupper())]
+                yield fields[1], country, int(fields[14] or 0), aliases
+            else:
+                fields += [''] * (4 - len(fields))
+                aliases = [alias.strip() for alias in fields[3].split(',') if alias.strip()]
+                yield fields[0], fields[1], int(fields[2] or 0), aliases
+
+
+_default: Optional[Gazetteer] = None
+_default_lock = threading.Lock()
+
+
+def default_gazetteer() -> Gazetteer:
+    """The shared gazetteer, built on first use from the bundled list plus ASSISTANT_GAZETTEER."""
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                rows: List[Tuple[str, str, int, List[str]]] = []
+                for path in (DEFAULT_PLACES, os.getenv('ASSISTANT_GAZETTEER')):
+                    if not path:
+                        continue
+                    try:
+                        rows.extend(list(read_places(path)))  # All of a file or none of it
+                    except (OSError, ValueError, IndexError) as e:
+                        logger.warning(f"Couldn't load gazetteer {path}: {e}")
+                try:
+                    gazetteer = Gazetteer(rows)
+                except OSError as e:
+                    logger.warning(f"Couldn't load country names: {e}")
+                    gazetteer = Gazetteer(rows, countries=())
+                logger.info(f"Gazetteer ready with {len(gazetteer)} places")
+                _default = gazetteer
+    return _default
+
+
+def extract_locations(text: str, limit: int = 5, gazetteer: Optional[Gazetteer] = None) -> List[str]:
+    """Weather API queries for the places in an utterance, known places first."""
+    gazetteer = gazetteer or default_gazetteer()
+    locations = [match.place.query for match in gazetteer.find(text)]
+    if not locations:
+        locations = guess_locations(text)
+    return locations[:limit]
@@ -0,0 +1,244 @@
+"""Headless text engine: replay command transcripts through the assistant without Tk, mic or TTS.
+
+Plain text on stdin is one session with one command per line:
+
+    printf 'weather in london\\nhelp\\n' | python headless.py
+
+JSONL input holds one session per line, {"session": "...", "commands": [...]}:
+
+    python headless.py transcripts.jsonl --concurrency 64 > results.jsonl
+
+A command after a follow-up question ("weather" -> "Which city's weather...")
+is taken as its answer. Per-command results go to stdout as JSONL; a
+throughput summary goes to stderr.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from latency import LatencyWindow
+from launcher import Launcher
+from Main import UltimateVoiceAssistant, dotenv
+from weather_service import WeatherClient
+from wiki_service import WikipediaService
+
+
+class TranscriptSink:
+    """Stands in for VoiceAssistantApp: collects what the assistant would show."""
+
+    def __init__(self):
+        self.lines: List[str] = []
+        self.status: Optional[str] = None
+        self.exit_requested = False
+
+    def add_to_conversation(self, text: str, entry_id: Optional[int] = None) -> None:
+        self.lines.append(text)
+
+    def update_status(self, text: str, color: str) -> None:
+        self.status = text
+
+    def request_exit(self) -> None:
+        self.exit_requested = True
+
+
+class NullSpeech:
+    """Speech output that finishes instantly without producing audio."""
+
+    def say(self, text: str, priority: int = 0, interruptible: bool = True) -> Future:
+        done = Future()
+        done.set_result(True)
+        return done
+
+    def interrupt(self) -> int:
+        return 0
+
+    def overlaps(self, started_at: float) -> bool:
+        return False
+
+    def stop(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, float]:
+        return {'count': 0}
+
+
+class HeadlessAssistant(UltimateVoiceAssistant):
+    """Assistant core with text in, text out and no desktop side effects.
+
+    Services passed in (Wikipedia, weather) are shared between instances so
+    many sessions can run concurrently against the same caches and pools.
+    Browser and application launches are recorded instead of performed.
+    When a command asks a follow-up question its result comes back with
+    ``awaiting_answer`` set, and the next command handled is the answer.
+    """
+
+    def __init__(self, sink: Optional[TranscriptSink] = None,
+                 wikipedia: Optional[WikipediaService] = None,
+                 weather: Optional[WeatherClient] = None):
+        self.shared_wikipedia = wikipedia
+        self.shared_weather = weather
+        self.launched: List[str] = []
+        self._turn: Optional[asyncio.Future] = None
+        self._turn_intent: Optional[str] = None
+        self._asked: Optional[asyncio.Future] = None
+        super().__init__(sink or TranscriptSink())
+
+    def setup(self):
+        self.speech = NullSpeech()
+        self.barge_in = False
+        self.recognizer = None
+        self.browser_path = self.get_browser_path()
+        self.spotify_path = 'spotify'
+        self.launcher = Launcher(self.browser_path)  # Known websites only; nothing is scanned
+        self.user_name = self.get_user_name()
+        self.weather_api_key = os.getenv('WEATHER_API_KEY')
+        self.wikipedia = self.shared_wikipedia or self.get_wikipedia_service()
+        self.weather = self.shared_weather
+
+    async def listen(self, timeout: Optional[float] = None) -> Optional[str]:
+        """Wait for the next command handled to answer the question just asked."""
+        answer = asyncio.get_event_loop().create_future()
+        self.pending_answers.append(answer)
+        if self._asked is not None and not self._asked.done():
+            self._asked.set_result(None)  # Hand the question back to whoever sent the command
+        try:
+            return await asyncio.wait_for(answer, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            if answer in self.pending_answers:
+                self.pending_answers.remove(answer)
+
+    async def open_url(self, url: str) -> None:
+        self.launched.append(url)
+
+    async def launch_application(self, path) -> None:
+        self.launched.append(path if isinstance(path, str) else ' '.join(path))
+
+    async def handle(self, command: str) -> Dict[str, Any]:
+        """Run one command and report what it did."""
+        sink = self.app
+        first_line = len(sink.lines)
+        first_launch = len(self.launched)
+        started = time.perf_counter()
+        match = self.router.route(command)
+        if self.pending_answers and not (match is not None and match.info.get('immediate')):
+            # The command answers a question; the turn that asked it carries on
+            self.pending_answers.popleft().set_result(command)
+        else:
+            self._turn_intent = match.key if match is not None else None
+            self.tracer.begin_turn()
+            self._turn = asyncio.ensure_future(self.run_turn(command))
+        turn = self._turn
+        self._asked = asyncio.get_event_loop().create_future()
+        try:
+            await asyncio.wait((turn, self._asked), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            self._asked.cancel()
+            self._asked = None
+        exit_requested = turn.result() if turn.done() else False
+        latency = time.perf_counter() - started
+        return {
+            'command': command,
+            'intent': self._turn_intent,
+            'responses': [line[len("Assistant: "):] if line.startswith("Assistant: ") else line
+                          for line in sink.lines[first_line:]],
+            'launched': self.launched[first_launch:],
+            'exit': bool(exit_requested),
+            'awaiting_answer': not turn.done(),
+            'latency_ms': round(latency * 1000, 3),
+        }
+
+
+def read_sessions(stream: Iterable[str], jsonl: bool) -> Iterator[Tuple[str, List[str]]]:
+    """Yield (session id, commands) from plain-text or JSONL input."""
+    if not jsonl:
+        commands = [line.strip() for line in stream if line.strip()]
+        yield 'stdin', commands
+        return
+    for number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        commands = record.get('commands')
+        if commands is None:
+            commands = [record['command']]
+        yield str(record.get('session', number)), commands
+
+
+async def replay(sessions: Iterable[Tuple[str, List[str]]], concurrency: int,
+                 wikipedia: WikipediaService, weather: Optional[WeatherClient], out) -> Dict[str, float]:
+    """Replay sessions concurrently; write per-command results and return a summary."""
+    limit = asyncio.Semaphore(concurrency)
+    latency = LatencyWindow(size=100000)
+    counts = {'sessions': 0, 'commands': 0}
+
+    async def run_session(session_id: str, commands: List[str]) -> None:
+        async with limit:
+            assistant = HeadlessAssistant(wikipedia=wikipedia, weather=weather)
+            for index, command in enumerate(commands):
+                result = await assistant.handle(command)
+                latency.add(result['latency_ms'] / 1000)
+                counts['commands'] += 1
+                out.write(json.dumps(dict(result, session=session_id, index=index)) + '\n')
+                if result['exit']:
+                    break
+            counts['sessions'] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run_session(session_id, commands) for session_id, commands in sessions))
+    elapsed = time.perf_counter() - started
+
+    summary = dict(counts, elapsed_s=elapsed,
+                   commands_per_s=counts['commands'] / elapsed if elapsed else 0.0)
+    summary.update(latency.summary())
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Replay command transcripts through the assistant")
+    parser.add_argument('input', nargs='?', help="JSONL transcript file (default: stdin)")
+    parser.add_argument('--jsonl', action='store_true', help="treat stdin as JSONL")
+    parser.add_argument('--concurrency', type=int, default=32, help="sessions processed at once")
+    parser.add_argument('--weather-url', help="WeatherAPI-compatible endpoint (e.g. a local stub)")
+    parser.add_argument('--log-level', default='WARNING')
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(args.log_level.upper())
+    dotenv.load_dotenv()
+
+    weather = None
+    api_key = os.getenv('WEATHERAPI_KEY')
+    if api_key:
+        weather = WeatherClient(api_key, base_url=args.weather_url)
+
+    wikipedia = HeadlessAssistant.get_wikipedia_service()
+    if args.input:
+        stream = open(args.input, encoding='utf-8')
+        jsonl = True
+    else:
+        stream = sys.stdin
+        jsonl = args.jsonl
+
+    try:
+        summary = asyncio.run(replay(read_sessions(stream, jsonl), args.concurrency,
+                                     wikipedia, weather, sys.stdout))
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+        wikipedia.close()
+        if weather is not None:
+            weather.close()
+
+    print(json.dumps(summary), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+import itertools
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional
+
+from intent_router import tokenize
+from tracing import Turn
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class HistoryEntry(NamedTuple):
+    id: int
+    timestamp: float
+    speaker: str
+    text: str
+
+    def line(self) -> str:
+        """The entry as it appears in the conversation display."""
+        return f"{self.speaker}: {self.text}" if self.speaker else self.text
+
+    def when(self) -> str:
+        moment = datetime.fromtimestamp(self.timestamp)
+        return f"{moment.day} {moment:%B at %H:%M}"
+
+
+class HistoryStore:
+    """Append-only conversation history in SQLite with a full-text index.
+
+    ``append`` hands out the entry id at once and leaves the insert to a
+    writer thread, which commits whatever has queued up in one transaction.
+    Turns passed to ``record_turn`` (a tracer turn listener; the tracer
+    must keep turns, see ``Tracer.keep_turns``) are stored with their stage
+    latencies and linked to the lines spoken in them. Reads use their own connection and
+    never wait for the writer.
+    """
+
+    def __init__(self, path: str, batch: int = 256):
+        self.path = path
+        self.batch = batch
+        self.session = int(time.time() * 1000)
+        self.written = 0
+        self._queue: 'queue.SimpleQueue' = queue.SimpleQueue()
+        self._read_lock = threading.Lock()
+        self._pending = 0
+        self._idle = threading.Condition()
+
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS messages ('
+            ' id INTEGER PRIMARY KEY, created REAL NOT NULL, session INTEGER NOT NULL, turn INTEGER,'
+            ' speaker TEXT NOT NULL, text TEXT NOT NULL)'
+        )
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS turns ('
+            ' session INTEGER NOT NULL, turn INTEGER NOT NULL, started REAL NOT NULL,'
+            ' seconds REAL NOT NULL, stages TEXT NOT NULL, PRIMARY KEY (session, turn))'
+        )
+        try:
+            conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5("
+                         "text, content='messages', content_rowid='id')")
+            self.full_text = True
+        except sqlite3.OperationalError as e:
+            logger.warning(f"SQLite has no FTS5, history search will scan: {e}")
+            self.full_text = False
+        conn.commit()
+        last = conn.execute('SELECT MAX(id) FROM messages').fetchone()[0]
+        self._ids = itertools.count((last or 0) + 1)
+
+        self._reader = sqlite3.connect(path, check_same_thread=False)
+        self._writer = threading.Thread(target=self._write_loop, args=(conn,), name="history-writer", daemon=True)
+        self._writer.start()
+
+    def append(self, speaker: str, text: str, turn: Optional[int] = None) -> int:
+        """Queue a conversation line for storage and return its id."""
+        with self._idle:
+            entry_id = next(self._ids)
+            self._pending += 1
+        self._queue.put(('message', (entry_id, time.time(), self.session, turn, speaker, text)))
+        return entry_id
+
+    def record_turn(self, turn: Turn) -> None:
+        """Store a finished turn's stage latencies (a tracer turn listener)."""
+        if turn.ended is None:
+            return
+        started = time.time() - (time.monotonic() - turn.started)
+        with self._idle:
+            self._pending += 1
+        self._queue.put(('turn', (self.session, turn.id, started, turn.ended - turn.started,
+                                  json.dumps(turn.stage_latencies()))))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything appended so far is committed."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def _write_loop(self, conn: sqlite3.Connection) -> None:
+        while True:
+            items = [self._queue.get()]
+            while len(items) < self.batch:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = _STOP in items
+            items = [item for item in items if item is not _STOP]
+            try:
+                self._write(conn, items)
+            except sqlite3.Error as e:
+                logger.error(f"Couldn't write conversation history: {e}")
+            with self._idle:
+                self._pending -= len(items)
+                self._idle.notify_all()
+            if stop:
+                conn.close()
+                return
+
+    def _write(self, conn: sqlite3.Connection, items) -> None:
+        messages = [row for kind, row in items if kind == 'message']
+        turns = [row for kind, row in items if kind == 'turn']
+        with conn:
+            conn.executemany('INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?)', messages)
+            if self.full_text:
+                conn.executemany('INSERT INTO messages_fts (rowid, text) VALUES (?, ?)',
+                                 [(row[0], row[5]) for row in messages])
+            conn.executemany('INSERT OR REPLACE INTO turns VALUES (?, ?, ?, ?, ?)', turns)
+        self.written += len(messages)
+
+    def page(self, before: Optional[int] = None, limit: int = 100) -> List[HistoryEntry]:
+        """Up to ``limit`` entries older than id ``before`` (newest overall if None), oldest first."""
+        with self._read_lock:
+            rows = self._reader.execute(
+                'SELECT id, created, speaker, text FROM messages WHERE id < ? ORDER BY id DESC LIMIT ?',
+                (before if before is not None else 1 << 62, limit)
+            ).fetchall()
+        return [HistoryEntry(*row) for row in reversed(rows)]
+
+    def search(self, query: str, limit: int = 20) -> List[HistoryEntry]:
+        """Most recent entries containing every word of the query."""
+        words = tokenize(query)
+        if not words:
+            return []
+        with self._read_lock:
+            if self.full_text:
+                match = ' '.join('"' + word.replace('"', '') + '"' for word in words)
+                rows = self._reader.execute(
+                    'SELECT m.id, m.created, m.speaker, m.text FROM messages_fts f'
+                    ' JOIN messages m ON m.id = f.rowid'
+                    ' WHERE messages_fts MATCH ? ORDER BY f.rowid DESC LIMIT ?',
+                    (match, limit)
+                ).fetchall()
+            else:
+                clauses = ' AND '.join('text LIKE ?' for _ in words)
+                rows = self._reader.execute(
+                    f'SELECT id, created, speaker, text FROM messages WHERE {clauses} ORDER BY id DESC LIMIT ?',
+                    [f'%{word}%' for word in words] + [limit]
+                ).fetchall()
+        return [HistoryEntry(*row) for row in rows]
+
+    def turn_latencies(self, entry: HistoryEntry) -> Dict[str, float]:
+        """Stage latencies of the turn an entry was spoken in, if it was recorded."""
+        with self._read_lock:
+            row = self._reader.execute(
+                'SELECT t.stages FROM messages m JOIN turns t ON t.session = m.session AND t.turn = m.turn'
+                ' WHERE m.id = ?', (entry.id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def close(self) -> None:
+        """Write what is queued and close the database."""
+        self._queue.put(_STOP)
+        self._writer.join(timeout=5)
+        with self._read_lock:
+            self._reader.close()
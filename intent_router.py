@@ -0,0 +1,116 @@
+import re
+from typing import Any, Dict, List, NamedTuple, Optional
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+class IntentMatch(NamedTuple):
+    key: str
+    info: Dict[str, Any]
+    score: float
+    exact: bool
+    start: int
+    end: int
+
+
+class _TrieNode:
+    __slots__ = ('children', 'key')
+
+    def __init__(self):
+        self.children: Dict[str, '_TrieNode'] = {}
+        self.key: Optional[str] = None
+
+
+class IntentRouter:
+    """Route utterances to commands through a token trie built once from the command table.
+
+    Phrases only match on whole words, so "it" never fires inside "exit".
+    A full phrase match always beats a partial one; among full matches the
+    longest phrase wins, then the higher ``priority`` entry, then the entry
+    registered first. Partial matches only count words that belong to a
+    single command, so a bare "open" is not silently routed to whichever
+    "open ..." entry happens to come first, and a partial match scoring
+    below ``min_partial_score`` (the share of the phrase's words heard) is
+    no match at all.
+    """
+
+    def __init__(self, commands: Optional[Dict[str, Dict[str, Any]]] = None, min_partial_score: float = 0.0):
+        self.min_partial_score = min_partial_score
+        self._root = _TrieNode()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._order: Dict[str, int] = {}
+        self._word_index: Dict[str, set] = {}
+        for phrase, info in (commands or {}).items():
+            self.register(phrase, info)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def register(self, phrase: str, info: Dict[str, Any]) -> None:
+        """Add (or replace) a command phrase."""
+        tokens = tokenize(phrase)
+        if not tokens:
+            raise ValueError(f"Command phrase has no words: {phrase!r}")
+
+        node = self._root
+        for token in tokens:
+            node = node.children.setdefault(token, _TrieNode())
+        node.key = phrase
+
+        self._entries[phrase] = info
+        self._order.setdefault(phrase, len(self._order))
+        for token in tokens:
+            self._word_index.setdefault(token, set()).add(phrase)
+
+    def _rank(self, key: str) -> tuple:
+        return (self._entries[key].get('priority', 0), -self._order[key])
+
+    def route(self, command: str) -> Optional[IntentMatch]:
+        """Return the best matching command for an utterance, or None."""
+        tokens = tokenize(command)
+        if not tokens:
+            return None
+
+        best = None
+        best_rank = None
+        for start in range(len(tokens)):
+            node = self._root
+            end = start
+            while end < len(tokens):
+                node = node.children.get(tokens[end])
+                if node is None:
+                    break
+                end += 1
+                if node.key is not None:
+                    rank = (end - start,) + self._rank(node.key)
+                    if best_rank is None or rank > best_rank:
+                        best, best_rank = (node.key, start, end), rank
+
+        if best is not None:
+            key, start, end = best
+            return IntentMatch(key, self._entries[key], float(end - start), True, start, end)
+
+        # No full phrase: fall back to words that identify exactly one command
+        hits: Dict[str, int] = {}
+        first_seen: Dict[str, int] = {}
+        for position, token in enumerate(tokens):
+            keys = self._word_index.get(token)
+            if keys is not None and len(keys) == 1:
+                key = next(iter(keys))
+                hits[key] = hits.get(key, 0) + 1
+                first_seen.setdefault(key, position)
+
+        if not hits:
+            return None
+
+        key = max(hits, key=lambda k: (hits[k],) + self._rank(k))
+        score = hits[key] / len(tokenize(key))
+        if score < self.min_partial_score:
+            return None
+        position = first_seen[key]
+        return IntentMatch(key, self._entries[key], score, False, position, position + 1)
@@ -0,0 +1,43 @@
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, Sequence
+
+
+def percentile(sorted_samples: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted samples (q in 0..100)."""
+    if not sorted_samples:
+        return 0.0
+    rank = int(round(q / 100.0 * (len(sorted_samples) - 1)))
+    return sorted_samples[min(len(sorted_samples) - 1, max(0, rank))]
+
+
+class LatencyWindow:
+    """Rolling window of latency samples (seconds) with percentile summaries."""
+
+    def __init__(self, size: int = 1024):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+            self.total += seconds
+
+    def extend(self, samples: Iterable[float]) -> None:
+        for seconds in samples:
+            self.add(seconds)
+
+    def snapshot(self) -> List[float]:
+        with self._lock:
+            return sorted(self._samples)
+
+    def summary(self, quantiles: Iterable[float] = (50, 95, 99)) -> Dict[str, float]:
+        """Percentiles of the current window in milliseconds, keyed like 'p50_ms'."""
+        samples = self.snapshot()
+        return {f'p{q:g}_ms': percentile(samples, q) * 1000 for q in quantiles}
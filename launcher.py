@@ -0,0 +1,294 @@
+import asyncio
+import bisect
+import configparser
+import glob
+import logging
+import os
+import platform
+import shlex
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple, Union
+
+from intent_router import tokenize
+
+logger = logging.getLogger(__name__)
+
+APP = 'app'
+SITE = 'site'
+COMMAND = 'command'
+_KIND_RANK = {APP: 0, SITE: 1, COMMAND: 2}
+
+DEFAULT_SITES = {
+    'youtube': 'https://youtube.com',
+    'google': 'https://google.com',
+    'gmail': 'https://mail.google.com',
+    'google maps': 'https://maps.google.com',
+    'google drive': 'https://drive.google.com',
+    'google calendar': 'https://calendar.google.com',
+    'google translate': 'https://translate.google.com',
+    'google news': 'https://news.google.com',
+    'wikipedia': 'https://wikipedia.org',
+    'github': 'https://github.com',
+    'stack overflow': 'https://stackoverflow.com',
+    'reddit': 'https://reddit.com',
+    'netflix': 'https://netflix.com',
+    'amazon': 'https://amazon.com',
+    'linkedin': 'https://linkedin.com',
+    'facebook': 'https://facebook.com',
+    'instagram': 'https://instagram.com',
+    'twitter': 'https://twitter.com',
+}
+SITE_ALIASES = {'maps': 'google maps', 'translate': 'google translate', 'mail': 'gmail', 'email': 'gmail'}
+
+# Programs that must never start from a misheard "open ...", even when allowed by configuration
+_UNSAFE = frozenset(('shutdown', 'reboot', 'halt', 'poweroff', 'rm', 'rmdir', 'dd', 'kill', 'killall', 'pkill',
+                     'sudo', 'su', 'doas', 'init', 'telinit', 'systemctl', 'format', 'fdisk', 'parted', 'wipefs',
+                     'shred', 'truncate', 'logout', 'mv', 'chmod', 'chown'))
+
+
+class Target(NamedTuple):
+    name: str
+    kind: str  # APP, SITE or COMMAND (an allowed program)
+    command: Tuple[str, ...]  # argv, or (url,) for a site
+
+
+def desktop_dirs() -> List[str]:
+    """XDG application directories, most specific first."""
+    data_home = os.getenv('XDG_DATA_HOME', os.path.expanduser('~/.local/share'))
+    data_dirs = os.getenv('XDG_DATA_DIRS', '/usr/local/share:/usr/share').split(':')
+    dirs = [data_home] + data_dirs + ['/var/lib/flatpak/exports/share', '/var/lib/snapd/desktop']
+    return [os.path.join(d, 'applications') for d in dirs if d]
+
+
+def parse_desktop_file(path: str) -> Optional[Tuple[str, List[str], Tuple[str, ...]]]:
+    """(name, extra names, argv) for a launchable Type=Application entry, else None."""
+    parser = configparser.RawConfigParser(interpolation=None, strict=False)
+    try:
+        parser.read(path, encoding='utf-8')
+        entry = parser['Desktop Entry']
+    except (configparser.Error, KeyError, UnicodeDecodeError, OSError):
+        return None
+    if entry.get('Type', 'Application') != 'Application' or entry.get('NoDisplay') == 'true' \
+            or entry.get('Hidden') == 'true' or entry.get('Terminal') == 'true' or not entry.get('Exec'):
+        return None
+    try:
+        # Drop field codes (%f, %U, ...) that a launcher would fill in with files or URLs
+        argv = tuple(arg.replace('%%', '%') for arg in shlex.split(entry['Exec'])
+                     if not (len(arg) == 2 and arg[0] == '%'))
+    except ValueError:
+        return None
+    if not argv or not entry.get('Name'):
+        return None
+    extra = [entry.get('GenericName', '')] + entry.get('Keywords', '').split(';')
+    return entry['Name'], [name for name in extra if name.strip()], argv
+
+
+class Launcher:
+    """Resolves "open <anything>" to an application, website or program and starts it off the loop.
+
+    Websites are known from the start; desktop entries and macOS application
+    bundles are scanned once in the background and swapped in as a new
+    index. Other programs are only launchable when listed in ``programs``
+    (looked up on PATH) or found in one of ``program_dirs``; the rest of PATH
+    is never indexed. Lookups try the exact name, then words that are
+    prefixes of a name's words and cover at least ``min_coverage`` of it,
+    then trigram similarity of at least ``min_similarity`` for misheard
+    names. Programs only match exactly and never if they are unsafe.
+    """
+
+    def __init__(self, browser_command: str, sites: Optional[Dict[str, str]] = None,
+                 min_similarity: float = 0.45, min_coverage: float = 0.4,
+                 programs: Iterable[str] = (), program_dirs: Iterable[str] = ()):
+        self.browser_command = browser_command
+        self.sites = dict(DEFAULT_SITES if sites is None else sites)
+        self.min_similarity = min_similarity
+        self.min_coverage = min_coverage
+        self.programs = [name.strip() for name in programs if name.strip()]
+        self.program_dirs = [directory for directory in program_dirs if directory]
+        self.spawned = 0
+        self.scanned = False
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="launcher")
+        self._children: List[subprocess.Popen] = []
+        self._install(self._build(self._site_entries()))
+
+    def __len__(self) -> int:
+        return len(self._targets)
+
+    def _site_entries(self) -> Iterable[Tuple[Target, List[str]]]:
+        aliases: Dict[str, List[str]] = {}
+        for alias, name in SITE_ALIASES.items():
+            aliases.setdefault(name, []).append(alias)
+        for name, url in self.sites.items():
+            yield Target(name, SITE, (url,)), aliases.get(name, [])
+
+    def scan(self) -> int:
+        """Find installed applications and allowed programs and rebuild the index; returns its size."""
+        entries = list(self._site_entries())
+        system = platform.system()
+        if system == 'Darwin':
+            for bundle in glob.glob('/Applications/*.app') + glob.glob(os.path.expanduser('~/Applications/*.app')):
+                name = os.path.splitext(os.path.basename(bundle))[0]
+                entries.append((Target(name, APP, ('open', '-a', bundle)), []))
+        elif system != 'Windows':
+            seen: Set[str] = set()
+            for directory in desktop_dirs():
+                for path in sorted(glob.glob(os.path.join(directory, '*.desktop'))):
+                    desktop_id = os.path.basename(path)
+                    if desktop_id in seen:
+                        continue  # The user's own entry overrides the system one
+                    seen.add(desktop_id)
+                    parsed = parse_desktop_file(path)
+                    if parsed is not None:
+                        name, extra, argv = parsed
+                        entries.append((Target(name, APP, argv), extra + [os.path.basename(argv[0])]))
+
+        programs: Set[str] = set()
+        for name in self.programs:
+            path = shutil.which(name)
+            if path is not None and name not in programs:
+                programs.add(name)
+                entries.append((Target(name, COMMAND, (path,)), []))
+        for directory in self.program_dirs:
+            try:
+                with os.scandir(directory) as listing:
+                    for item in listing:
+                        if item.name not in programs and item.is_file() and os.access(item.path, os.X_OK):
+                            programs.add(item.name)
+                            entries.append((Target(item.name, COMMAND, (item.path,)), []))
+            except OSError as e:
+                logger.warning(f"Couldn't scan program directory {directory}: {e}")
+
+        self._install(self._build(entries))
+        self.scanned = True
+        logger.info(f"Launcher indexed {len(self._targets)} apps, sites and programs")
+        return len(self._targets)
+
+    @staticmethod
+    def _trigrams(text: str) -> Set[str]:
+        padded = f'  {text} '
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def _build(self, entries: Iterable[Tuple[Target, List[str]]]):
+        targets: List[Target] = []
+        names: List[List[str]] = []  # Indexed name keys per target, to score prefix matches
+        exact: Dict[str, int] = {}
+        words: Dict[str, Set[int]] = {}
+        trigrams: Dict[str, Set[int]] = {}
+        phrases: List[Tuple[int, int]] = []  # (target, trigram count) per indexed name
+        for target, extra in sorted(entries, key=lambda e: (_KIND_RANK[e[0].kind], len(e[0].name))):
+            if target.kind == COMMAND and (target.name in _UNSAFE or target.name.startswith('mkfs')):
+                continue
+            index = len(targets)
+            targets.append(target)
+            names.append([])
+            for phrase in [target.name] + extra:
+                key = ' '.join(tokenize(phrase))
+                if not key:
+                    continue
+                exact.setdefault(key, index)  # Entries are sorted so the best one keeps a name
+                if target.kind == COMMAND:
+                    continue
+                names[index].append(key)
+                for word in key.split():
+                    words.setdefault(word, set()).add(index)
+                grams = self._trigrams(key)
+                for gram in grams:
+                    trigrams.setdefault(gram, set()).add(len(phrases))
+                phrases.append((index, len(grams)))
+        return targets, names, exact, words, sorted(words), trigrams, phrases
+
+    def _install(self, index) -> None:
+        # One assignment so lookups on other threads see the old index or the new one
+        self._index = index
+        self._targets = index[0]
+
+    def resolve(self, phrase: str) -> Optional[Target]:
+        """The best application, site or program for a spoken name, or None."""
+        targets, names, exact, words, sorted_words, trigrams, phrases = self._index
+        tokens = tokenize(phrase)
+        if not tokens:
+            return None
+        key = ' '.join(tokens)
+        if key in exact:
+            return targets[exact[key]]
+        url = phrase.strip().lower().replace(' dot ', '.')
+        if '.' in url.strip('.') and ' ' not in url:  # "example.com" or "example dot com"
+            return Target(url, SITE, (url if '://' in url else f'https://{url}',))
+
+        # Every spoken word starts a word of the name: "libre writer" -> "LibreOffice Writer"
+        spoken = [t for t in tokens if len(t) > 1]
+        candidates: Optional[Set[int]] = None
+        for token in spoken:
+            matched: Set[int] = set()
+            start = bisect.bisect_left(sorted_words, token)
+            for word in sorted_words[start:]:
+                if not word.startswith(token):
+                    break
+                matched |= words[word]
+            candidates = matched if candidates is None else candidates & matched
+            if not candidates:
+                break
+        for index in sorted(candidates or ()):
+            # ...and says enough of it: "te" alone shouldn't start "Terminal"
+            if max((self._coverage(spoken, name) for name in names[index]), default=0.0) >= self.min_coverage:
+                return targets[index]
+
+        # Misheard names: the name or alias sharing the largest part of its trigrams
+        grams = self._trigrams(key)
+        overlap: Dict[int, int] = {}
+        for gram in grams:
+            for phrase_id in trigrams.get(gram, ()):
+                overlap[phrase_id] = overlap.get(phrase_id, 0) + 1
+        best, best_score = None, self.min_similarity
+        for phrase_id, shared in overlap.items():
+            index, count = phrases[phrase_id]
+            score = shared / (len(grams) + count - shared)
+            if score > best_score or (score == best_score and best is not None and index < best):
+                best, best_score = index, score
+        return targets[best] if best is not None else None
+
+    @staticmethod
+    def _coverage(tokens: List[str], name: str) -> float:
+        """Share of a name's letters the spoken words give, if each of them starts one of its words."""
+        name_words = name.split()
+        if not all(any(word.startswith(token) for word in name_words) for token in tokens):
+            return 0.0
+        return min(1.0, sum(map(len, tokens)) / len(name.replace(' ', '')))
+
+    def browser_argv(self, url: str) -> List[str]:
+        """The configured browser command ("xdg-open %s") with the URL filled in."""
+        argv = shlex.split(self.browser_command)
+        if any('%s' in arg for arg in argv):
+            return [arg.replace('%s', url) for arg in argv]
+        return argv + [url]
+
+    async def open_url(self, url: str) -> None:
+        await self.spawn(self.browser_argv(url))
+
+    async def launch(self, target: Target) -> None:
+        if target.kind == SITE:
+            await self.open_url(target.command[0])
+        else:
+            await self.spawn(target.command)
+
+    async def spawn(self, command: Union[str, Sequence[str]]) -> None:
+        """Start a program detached from us; fork/exec runs on a worker thread, not the loop."""
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(self._executor, self._start, command)
+
+    def _start(self, command: Union[str, Sequence[str]]) -> None:
+        self._children = [child for child in self._children if child.poll() is None]  # Reap exited ones
+        if platform.system() == 'Windows' and isinstance(command, str):
+            os.startfile(command)
+        else:
+            argv = [command] if isinstance(command, str) else list(command)
+            self._children.append(subprocess.Popen(
+                argv, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                close_fds=True, start_new_session=platform.system() != 'Windows'
+            ))
+        self.spawned += 1
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
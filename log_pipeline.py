@@ -0,0 +1,186 @@
+import atexit
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Informational messages logged on every turn (or every listen timeout): keep 1 in N
+DEFAULT_SAMPLING = {
+    'Listening...': 20,
+    'Listening timed out': 20,
+    'Recognizing...': 10,
+    'Speaking: ': 5,
+    'Recognized: ': 5,
+}
+
+# Attributes every LogRecord has; anything else was passed with extra= and is kept in JSON
+_RECORD_FIELDS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the standard fields plus anything passed via ``extra``."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep one in N of the chatty messages starting with each configured prefix.
+
+    Warnings and errors always pass. Kept records carry ``sampled=N`` so
+    counts can be scaled back up.
+    """
+
+    def __init__(self, rates: Dict[str, int]):
+        super().__init__()
+        self.rates = {prefix: rate for prefix, rate in rates.items() if rate > 1}
+        self.seen: Dict[str, int] = {}
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        message = record.msg if isinstance(record.msg, str) else str(record.msg)
+        for prefix, rate in self.rates.items():
+            if message.startswith(prefix):
+                with self._lock:
+                    count = self.seen.get(prefix, 0)
+                    self.seen[prefix] = count + 1
+                    if count % rate:
+                        self.dropped += 1
+                        return False
+                record.sampled = rate
+                return True
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the writer thread; drops them rather than wait when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def gzip_namer(name: str) -> str:
+    return name + '.gz'
+
+
+def gzip_rotator(source: str, dest: str) -> None:
+    """Compress the finished log file (runs on the writer thread)."""
+    with open(source, 'rb') as plain, gzip.open(dest, 'wb') as packed:
+        shutil.copyfileobj(plain, packed)
+    os.remove(source)
+
+
+def file_handler(path: str, max_bytes: int, backups: int, when: Optional[str]) -> logging.Handler:
+    """Rotating log file, by time when ``when`` is given (e.g. 'midnight') and otherwise by size."""
+    if when:
+        handler = logging.handlers.TimedRotatingFileHandler(path, when=when, backupCount=backups,
+                                                            encoding='utf-8', delay=True)
+    else:
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                                       encoding='utf-8', delay=True)
+    handler.namer = gzip_namer
+    handler.rotator = gzip_rotator
+    return handler
+
+
+class LogPipeline:
+    """Root logging through a bounded queue to a background writer thread.
+
+    Callers only filter, format the message and enqueue; console output and
+    the rotating, compressed log file are written by the listener thread.
+    """
+
+    def __init__(self, path: Optional[str] = 'assistant.log', level: int = logging.INFO, json_file: bool = True,
+                 max_bytes: int = 10 * 1024 * 1024, backups: int = 5, when: Optional[str] = None,
+                 sampling: Optional[Dict[str, int]] = None, console: bool = True, queue_size: int = 10000):
+        handlers = []
+        if console:
+            stream = logging.StreamHandler()
+            stream.setFormatter(logging.Formatter(TEXT_FORMAT))
+            handlers.append(stream)
+        if path:
+            log_file = file_handler(path, max_bytes, backups, when)
+            log_file.setFormatter(JsonFormatter() if json_file else logging.Formatter(TEXT_FORMAT))
+            handlers.append(log_file)
+        self.handlers = handlers
+        self.sampler = SamplingFilter(DEFAULT_SAMPLING if sampling is None else sampling)
+        self.handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+        self.handler.addFilter(self.sampler)
+        self.listener = logging.handlers.QueueListener(self.handler.queue, *handlers, respect_handler_level=True)
+        self.level = level
+        self.running = False
+
+    def install(self, logger: Optional[logging.Logger] = None) -> 'LogPipeline':
+        """Replace the logger's handlers (root by default) with the queue and start writing."""
+        logger = logger or logging.getLogger()
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+        logger.addHandler(self.handler)
+        logger.setLevel(self.level)
+        self.listener.start()
+        self.running = True
+        atexit.register(self.stop)
+        return self
+
+    def stop(self) -> None:
+        """Write out everything queued and stop the writer thread."""
+        if self.running:
+            self.running = False
+            self.listener.stop()
+            for handler in self.handlers:
+                handler.close()
+
+    def stats(self) -> Dict[str, int]:
+        return {'sampled_out': self.sampler.dropped, 'queue_full_dropped': self.handler.dropped}
+
+
+_pipeline: Optional[LogPipeline] = None
+
+
+def configure_logging() -> LogPipeline:
+    """Install the logging pipeline once, configured from ASSISTANT_LOG_* environment variables."""
+    global _pipeline
+    if _pipeline is None:
+        sampling = None if os.getenv('ASSISTANT_LOG_SAMPLING', '1') != '0' else {}
+        _pipeline = LogPipeline(
+            path=os.getenv('ASSISTANT_LOG_FILE', 'assistant.log') or None,
+            level=logging.getLevelName(os.getenv('ASSISTANT_LOG_LEVEL', 'INFO').upper()),
+            json_file=os.getenv('ASSISTANT_LOG_FORMAT', 'json') == 'json',
+            max_bytes=int(os.getenv('ASSISTANT_LOG_MAX_BYTES', str(10 * 1024 * 1024))),
+            backups=int(os.getenv('ASSISTANT_LOG_BACKUPS', '5')),
+            when=os.getenv('ASSISTANT_LOG_ROTATE_WHEN') or None,
+            sampling=sampling,
+        ).install()
+    return _pipeline
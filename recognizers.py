@@ -0,0 +1,324 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Dict, Optional
+
+from audio_capture import Utterance
+from resilience import ResilientCaller, ServiceUnavailableError
+
+logger = logging.getLogger(__name__)
+
+
+class RecognitionError(Exception):
+    """Base class for recognizer backend failures."""
+
+
+class UnknownSpeechError(RecognitionError):
+    """The audio could not be understood."""
+
+
+class RecognizerUnavailableError(RecognitionError):
+    """The recognition service or engine could not be reached."""
+
+
+class RecognizerBackend:
+    """Turns a captured utterance into text without blocking the event loop.
+
+    Streaming backends also take the audio while it is being captured
+    (``feed``) and report partial hypotheses through ``on_partial``.
+    """
+
+    name = 'base'
+    streaming = False
+    on_partial: Optional[Callable[[float, str], None]] = None
+
+    async def recognize(self, utterance: Utterance) -> str:
+        raise NotImplementedError
+
+    def feed(self, started_at: float, frame: Optional[bytes], sample_rate: int) -> None:
+        """Audio of the utterance that started at ``started_at``; None when it has ended."""
+
+    def warm_up(self) -> None:
+        """Load models or open connections ahead of the first utterance."""
+
+    def close(self) -> None:
+        pass
+
+
+class GoogleBackend(RecognizerBackend):
+    """Google Web Speech API via speech_recognition, called from a worker thread.
+
+    Requests time out after ``timeout`` seconds, a slow one is hedged with a
+    second upload, and after repeated failures the backend fails fast for a
+    while instead of waiting on the service every turn.
+    """
+
+    name = 'google'
+
+    def __init__(self, recognizer=None, language: str = 'en-in', timeout: float = 8.0):
+        self.language = language
+        self.timeout = timeout
+        self._recognizer = recognizer
+        self.caller = ResilientCaller('google', timeout=timeout, failures=(RecognizerUnavailableError,))
+
+    def warm_up(self) -> None:
+        if self._recognizer is None:
+            import speech_recognition as sr
+            self._recognizer = sr.Recognizer()
+        if getattr(self._recognizer, 'operation_timeout', 0) is None:
+            self._recognizer.operation_timeout = self.timeout  # Socket timeout for the upload itself
+
+    async def recognize(self, utterance: Utterance) -> str:
+        self.warm_up()
+        try:
+            return await self.caller.call(self._recognize, utterance)
+        except ServiceUnavailableError as e:
+            raise RecognizerUnavailableError(str(e))
+
+    def _recognize(self, utterance: Utterance) -> str:
+        import speech_recognition as sr
+        try:
+            return self._recognizer.recognize_google(utterance.to_audio_data(), language=self.language)
+        except sr.UnknownValueError as e:
+            raise UnknownSpeechError(str(e))
+        except (sr.RequestError, OSError) as e:  # OSError: the socket timed out
+            raise RecognizerUnavailableError(str(e))
+
+
+# Per-process state for the local decoders; lives in the pool workers only
+_worker: Dict[str, object] = {}
+
+
+def _vosk_init(model_path: str) -> None:
+    import vosk
+    vosk.SetLogLevel(-1)
+    _worker['model'] = vosk.Model(model_path)
+
+
+def _vosk_decode(frame_data: bytes, sample_rate: int, sample_width: int) -> str:
+    import vosk
+    recognizer = vosk.KaldiRecognizer(_worker['model'], sample_rate)
+    recognizer.AcceptWaveform(frame_data)
+    return json.loads(recognizer.FinalResult()).get('text', '')
+
+
+def _sphinx_init(language: str) -> None:
+    import speech_recognition as sr
+    _worker['recognizer'] = sr.Recognizer()
+    _worker['language'] = language
+
+
+def _sphinx_decode(frame_data: bytes, sample_rate: int, sample_width: int) -> str:
+    import speech_recognition as sr
+    audio = sr.AudioData(frame_data, sample_rate, sample_width)
+    try:
+        return _worker['recognizer'].recognize_sphinx(audio, language=_worker['language'])
+    except sr.UnknownValueError:
+        return ''
+    except sr.RequestError as e:
+        raise RecognizerUnavailableError(str(e))
+
+
+def _noop() -> None:
+    pass
+
+
+class ProcessPoolBackend(RecognizerBackend):
+    """Offline decoder running in a process pool so CPU-heavy decoding stays off the loop and UI."""
+
+    decode = None
+    initializer = None
+
+    def __init__(self, initargs: tuple = (), workers: Optional[int] = None):
+        self.workers = workers or max(1, min(2, (os.cpu_count() or 2) // 2))
+        # spawn: the parent has audio, TTS and Tk threads that must not be forked
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=type(self).initializer,
+            initargs=initargs
+        )
+
+    def warm_up(self) -> None:
+        # Each worker loads its model in the initializer; make them all start now
+        for future in [self._pool.submit(_noop) for _ in range(self.workers)]:
+            future.result()
+
+    async def recognize(self, utterance: Utterance) -> str:
+        loop = asyncio.get_event_loop()
+        try:
+            text = await loop.run_in_executor(
+                self._pool, type(self).decode,
+                utterance.frame_data, utterance.sample_rate, utterance.sample_width
+            )
+        except RecognitionError:
+            raise
+        except Exception as e:
+            raise RecognizerUnavailableError(f"{self.name} decoder failed: {e}")
+        if not text.strip():
+            raise UnknownSpeechError(f"{self.name} heard no words")
+        return text
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False)
+
+
+class VoskBackend(ProcessPoolBackend):
+    """Fully local Kaldi decoding with a Vosk model directory."""
+
+    name = 'vosk'
+    decode = staticmethod(_vosk_decode)
+    initializer = staticmethod(_vosk_init)
+
+    def __init__(self, model_path: str, workers: Optional[int] = None):
+        if not os.path.isdir(model_path):
+            raise RecognizerUnavailableError(f"Vosk model not found: {model_path}")
+        super().__init__((model_path,), workers)
+
+
+class SphinxBackend(ProcessPoolBackend):
+    """Fully local CMU PocketSphinx decoding through speech_recognition."""
+
+    name = 'sphinx'
+    decode = staticmethod(_sphinx_decode)
+    initializer = staticmethod(_sphinx_init)
+
+    def __init__(self, language: str = 'en-US', workers: Optional[int] = None):
+        super().__init__((language,), workers)
+
+
+class VoskStreamingBackend(RecognizerBackend):
+    """Vosk decoding in this process while the user is still speaking.
+
+    Frames are decoded on a thread as they are captured, so the transcript is
+    ready almost as soon as the utterance ends, and the hypothesis so far is
+    passed to ``on_partial`` (on that thread) every ``partial_interval``
+    seconds of decoding, repeated while it holds still so listeners can judge
+    how stable it is. Utterances whose audio was never fed are decoded whole.
+    """
+
+    name = 'vosk-stream'
+    streaming = True
+
+    def __init__(self, model_path: str, partial_interval: float = 0.15, keep_results: int = 16):
+        if not os.path.isdir(model_path):
+            raise RecognizerUnavailableError(f"Vosk model not found: {model_path}")
+        self.model_path = model_path
+        self.partial_interval = partial_interval
+        self.keep_results = keep_results
+        self.on_partial = None
+        self.partials = 0
+        self._model = None
+        self._frames: 'queue.SimpleQueue' = queue.SimpleQueue()
+        # Transcript of each utterance by start time, for recognize() to pick up
+        self._results: 'OrderedDict[float, Future]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._feeding: Optional[float] = None
+
+    def warm_up(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            import vosk
+            vosk.SetLogLevel(-1)
+            self._model = vosk.Model(self.model_path)
+            self._thread = threading.Thread(target=self._decode_loop, name="vosk-stream", daemon=True)
+            self._thread.start()
+
+    def _result(self, started_at: float) -> Future:
+        with self._lock:
+            future = self._results.get(started_at)
+            if future is None:
+                future = self._results[started_at] = Future()
+                while len(self._results) > self.keep_results:
+                    self._results.popitem(last=False)  # Abandoned utterances nobody asked for
+            return future
+
+    def feed(self, started_at: float, frame: Optional[bytes], sample_rate: int) -> None:
+        if self._thread is None:
+            return
+        if started_at != self._feeding:
+            self._feeding = started_at
+            self._result(started_at)  # Marks the utterance as streamed before recognize() can look
+        self._frames.put((started_at, frame, sample_rate))
+
+    async def recognize(self, utterance: Utterance) -> str:
+        self.warm_up()
+        with self._lock:
+            streamed = utterance.started_at in self._results
+        future = self._result(utterance.started_at)
+        if not streamed:
+            self._frames.put((utterance.started_at, utterance.frame_data, utterance.sample_rate))
+            self._frames.put((utterance.started_at, None, utterance.sample_rate))
+        try:
+            text = await asyncio.wrap_future(future)
+        finally:
+            with self._lock:
+                self._results.pop(utterance.started_at, None)
+        if not text.strip():
+            raise UnknownSpeechError(f"{self.name} heard no words")
+        return text
+
+    def _decode_loop(self) -> None:
+        import vosk
+        current = None
+        decoder = None
+        segments = []
+        partial_at = 0.0
+        while True:
+            item = self._frames.get()
+            if item is None:
+                return
+            started_at, frame, sample_rate = item
+            try:
+                if frame is None:
+                    future = self._result(started_at)
+                    if decoder is not None and started_at == current and not future.done():
+                        segments.append(json.loads(decoder.FinalResult()).get('text', ''))
+                        future.set_result(' '.join(s for s in segments if s))
+                    current = decoder = None
+                    continue
+                if started_at != current:
+                    current, segments = started_at, []
+                    decoder = vosk.KaldiRecognizer(self._model, sample_rate)
+                    partial_at = time.monotonic()
+                if decoder.AcceptWaveform(frame):
+                    segments.append(json.loads(decoder.Result()).get('text', ''))
+                elif self.on_partial is not None and time.monotonic() - partial_at >= self.partial_interval:
+                    partial_at = time.monotonic()
+                    partial = json.loads(decoder.PartialResult()).get('partial', '')
+                    text = ' '.join(s for s in segments + [partial] if s)
+                    if text:
+                        self.partials += 1
+                        self.on_partial(started_at, text)
+            except Exception as e:
+                logger.error(f"Streaming decoder failed: {e}")
+                future = self._result(started_at)
+                if not future.done():
+                    future.set_exception(RecognizerUnavailableError(f"{self.name} decoder failed: {e}"))
+                current = decoder = None
+
+    def close(self) -> None:
+        self._frames.put(None)
+
+
+def create_backend(name: Optional[str] = None, recognizer=None) -> RecognizerBackend:
+    """Build the backend named by ASSISTANT_RECOGNIZER (google, vosk, vosk-stream or sphinx)."""
+    name = (name or os.getenv('ASSISTANT_RECOGNIZER', 'google')).lower()
+    if name == 'google':
+        return GoogleBackend(recognizer)
+    if name == 'vosk':
+        return VoskBackend(os.getenv('VOSK_MODEL_PATH', 'model'))
+    if name == 'vosk-stream':
+        return VoskStreamingBackend(os.getenv('VOSK_MODEL_PATH', 'model'))
+    if name == 'sphinx':
+        return SphinxBackend()
+    raise ValueError(f"Unknown recognizer backend: {name}")
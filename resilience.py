@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from latency import LatencyWindow, percentile
+from scheduler import CommandScheduler
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class ServiceUnavailableError(Exception):
+    """An external service could not answer in time or is known to be down."""
+
+
+class CircuitOpenError(ServiceUnavailableError):
+    """Refused without calling: the service's circuit breaker is open."""
+
+
+class CallTimeoutError(ServiceUnavailableError):
+    """The call, hedge included, did not finish within its budget."""
+
+
+class CircuitBreaker:
+    """Fail fast while a service keeps failing.
+
+    ``failure_threshold`` failures in a row open the circuit; calls are then
+    refused until ``reset_timeout`` has passed, after which one probe call is
+    let through (half open). Its success closes the circuit, its failure
+    opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opens = 0
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go out now; in half-open state only one probe at a time does."""
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        if self._state != CLOSED:
+            logger.info(f"{self.name} recovered; circuit closed")
+        self._state = CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._probing or (self._state == CLOSED and self.failures >= self.failure_threshold):
+            if self._state == CLOSED:
+                logger.warning(f"{self.name} failed {self.failures} times in a row; circuit open")
+            self._state = OPEN
+            self._opened_at = self.clock()
+            self.opens += 1
+        self._probing = False
+
+    def abandon(self) -> None:
+        """A call that was let through ended without a verdict (it was cancelled)."""
+        self._probing = False
+
+
+class ResilientCaller:
+    """Blocking calls to one external service with a budget, a hedge and a circuit breaker.
+
+    Each call gets the service ``timeout``, cut to what is left of the
+    calling command's deadline (less ``reserve`` to say something about it).
+    If the first attempt is still out after the service's recent p95
+    latency, one duplicate is sent and whichever answers first wins; at most
+    ``max_hedge_ratio`` of calls are hedged. Timeouts and exceptions of the
+    ``failures`` types count against the breaker; other exceptions mean the
+    service did answer. Attempts that lose or time out keep their worker
+    thread until the underlying request gives up, so every call should also
+    carry its own socket timeout.
+    """
+
+    def __init__(self, name: str, executor: Optional[Executor] = None, timeout: float = 5.0,
+                 hedge: bool = True, min_hedge_delay: float = 0.05, max_hedge_delay: Optional[float] = None,
+                 min_samples: int = 20, max_hedge_ratio: float = 0.1, reserve: float = 0.5,
+                 failures: Tuple[Type[BaseException], ...] = (Exception,),
+                 is_failure: Optional[Callable[[Any], bool]] = None,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.name = name
+        self.executor = executor
+        self.timeout = timeout
+        self.hedge = hedge
+        self.min_hedge_delay = min_hedge_delay
+        self.max_hedge_delay = timeout / 2 if max_hedge_delay is None else max_hedge_delay
+        self.min_samples = min_samples
+        self.max_hedge_ratio = max_hedge_ratio
+        self.reserve = reserve
+        self.failures = failures
+        self.is_failure = is_failure
+        self.breaker = breaker or CircuitBreaker(name)
+        self.latency = LatencyWindow(size=256)
+        self.counts = {'calls': 0, 'hedged': 0, 'hedge_wins': 0, 'timeouts': 0, 'errors': 0,
+                       'rejected': 0, 'out_of_budget': 0}
+
+    def budget(self) -> float:
+        """Seconds the next call may take: the timeout, or less if the current command is due sooner."""
+        timeout = self.timeout
+        task = CommandScheduler.current()
+        if task is not None and task.deadline is not None:
+            timeout = min(timeout, task.deadline - time.monotonic() - self.reserve)
+        return timeout
+
+    def hedge_delay(self) -> float:
+        """When to send the duplicate: the recent p95 latency, or the maximum until there is history."""
+        samples = self.latency.snapshot()
+        if len(samples) < self.min_samples:
+            return self.max_hedge_delay
+        return min(self.max_hedge_delay, max(self.min_hedge_delay, percentile(samples, 95)))
+
+    async def call(self, fn: Callable[..., Any], *args, hedge: Optional[bool] = None) -> Any:
+        """``fn(*args)`` on the executor, within budget; raises ServiceUnavailableError if it can't be had."""
+        self.counts['calls'] += 1
+        timeout = self.budget()
+        if timeout <= 0:
+            self.counts['out_of_budget'] += 1
+            raise CallTimeoutError(f"{self.name}: no time left for this turn")
+        if not self.breaker.allow():
+            self.counts['rejected'] += 1
+            raise CircuitOpenError(f"{self.name} is unavailable")
+
+        loop = asyncio.get_event_loop()
+        started = time.monotonic()
+        deadline = started + timeout
+        hedge_at = None
+        if (self.hedge if hedge is None else hedge) and \
+                self.counts['hedged'] < self.max_hedge_ratio * self.counts['calls'] + 1:
+            hedge_at = started + self.hedge_delay()
+        attempts: Dict[asyncio.Future, float] = {}
+        launched: List[asyncio.Future] = []
+
+        def launch() -> None:
+            future = loop.run_in_executor(self.executor, fn, *args)
+            future.add_done_callback(_consume)
+            attempts[future] = time.monotonic()
+            launched.append(future)
+
+        launch()
+        error: Optional[BaseException] = None
+        while attempts:
+            now = time.monotonic()
+            wake = deadline if hedge_at is None or len(launched) > 1 else min(deadline, hedge_at)
+            try:
+                done, _ = await asyncio.wait(list(attempts), timeout=max(0.0, wake - now),
+                                             return_when=asyncio.FIRST_COMPLETED)
+            except asyncio.CancelledError:
+                self.breaker.abandon()
+                raise
+            for future in done:
+                submitted = attempts.pop(future)
+                if future.exception() is None:
+                    return self._succeeded(future.result(), time.monotonic() - submitted, future is not launched[0])
+                if not isinstance(future.exception(), self.failures):
+                    self.breaker.record_success()  # The service answered; the answer was an error
+                    raise future.exception()
+                error = future.exception()
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            if attempts and hedge_at is not None and len(launched) == 1 and now >= hedge_at:
+                self.counts['hedged'] += 1
+                launch()
+
+        self.breaker.record_failure()
+        if error is not None and not attempts:
+            self.counts['errors'] += 1
+            raise error
+        self.counts['timeouts'] += 1
+        raise CallTimeoutError(f"{self.name} did not answer within {timeout:.1f} s")
+
+    def _succeeded(self, result: Any, seconds: float, by_hedge: bool) -> Any:
+        self.latency.add(seconds)
+        if by_hedge:
+            self.counts['hedge_wins'] += 1
+        if self.is_failure is not None and self.is_failure(result):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Call outcomes, breaker state and attempt latency percentiles."""
+        stats: Dict[str, Any] = dict(self.counts, breaker=self.breaker.state, opens=self.breaker.opens,
+                                     hedge_delay_ms=round(self.hedge_delay() * 1000, 1))
+        stats.update(self.latency.summary())
+        return stats
+
+
+def _consume(future: asyncio.Future) -> None:
+    # Losing attempts finish unobserved; fetch their exception so asyncio doesn't log it
+    if not future.cancelled():
+        future.exception()
@@ -0,0 +1,195 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from latency import LatencyWindow
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_URGENT = 0
+PRIORITY_NORMAL = 10
+PRIORITY_LOW = 20
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+EXPIRED = 'expired'
+FINISHED = (DONE, FAILED, CANCELLED, EXPIRED)
+
+_current_task: contextvars.ContextVar = contextvars.ContextVar('command_task', default=None)
+
+
+class CommandTask:
+    """One recognized command tracked from submission to delivery."""
+
+    __slots__ = ('seq', 'name', 'factory', 'priority', 'deadline', 'state', 'result',
+                 'error', 'task', 'outputs', 'context', 'submitted_at', 'started_at', 'finished_at')
+
+    def __init__(self, seq: int, name: str, factory: Callable[[], Awaitable[Any]],
+                 priority: int, deadline: Optional[float]):
+        self.seq = seq
+        self.name = name
+        self.factory = factory
+        self.priority = priority
+        self.deadline = deadline
+        self.state = QUEUED
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.task: Optional[asyncio.Future] = None
+        self.outputs: List[Callable[[], None]] = []
+        # Handlers run in the submitter's context, whichever task later starts them
+        self.context = contextvars.copy_context()
+        self.submitted_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+
+class CommandScheduler:
+    """Run command handlers as concurrent tasks with priorities and deadlines.
+
+    Up to ``max_concurrent`` handlers run at once; the rest wait in a priority
+    queue (lower value first, then submission order). A task that passes its
+    deadline is cancelled and reported as expired. Results are delivered to
+    ``on_result`` strictly in submission order, and output a handler produces
+    through ``emit`` is held back until every earlier command has delivered,
+    so answers never come out interleaved.
+    """
+
+    def __init__(self, max_concurrent: int = 4, default_deadline: Optional[float] = 30.0,
+                 on_result: Optional[Callable[[CommandTask], None]] = None):
+        self.max_concurrent = max_concurrent
+        self.default_deadline = default_deadline
+        self.on_result = on_result
+        self.max_queue_depth = 0
+        self.counts: Dict[str, int] = {state: 0 for state in FINISHED}
+        self.queue_wait = LatencyWindow()
+        self.run_time = LatencyWindow()
+        self.turnaround = LatencyWindow()
+
+        self._seq = itertools.count()
+        self._heap: list = []
+        self._running: Dict[int, CommandTask] = {}
+        self._undelivered: Dict[int, CommandTask] = {}
+        self._next_delivery = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._heap)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._running)
+
+    @staticmethod
+    def current() -> Optional[CommandTask]:
+        """The command task the calling coroutine belongs to, if any."""
+        return _current_task.get()
+
+    def submit(self, name: str, factory: Callable[[], Awaitable[Any]],
+               priority: int = PRIORITY_NORMAL, deadline: Optional[float] = None) -> CommandTask:
+        """Queue a handler coroutine factory; ``deadline`` is seconds from now."""
+        if deadline is None:
+            deadline = self.default_deadline
+        seq = next(self._seq)
+        task = CommandTask(seq, name, factory, priority,
+                           time.monotonic() + deadline if deadline is not None else None)
+        self._undelivered[seq] = task
+        heapq.heappush(self._heap, (priority, seq, task))
+        self.max_queue_depth = max(self.max_queue_depth, len(self._heap))
+        self._pump()
+        return task
+
+    def emit(self, deliver: Callable[[], None]) -> None:
+        """Deliver output now, or hold it until the calling command's turn comes."""
+        task = _current_task.get()
+        if task is None or task.seq <= self._next_delivery:
+            deliver()
+        elif task.state == RUNNING:
+            task.outputs.append(deliver)
+
+    def cancel_all(self) -> int:
+        """Abort queued and running commands; returns how many were cancelled."""
+        queued, self._heap = self._heap, []
+        for _, _, task in queued:
+            self._finish(task, CANCELLED)
+        running = list(self._running.values())
+        for task in running:
+            task.task.cancel()
+        return len(queued) + len(running)
+
+    def _pump(self) -> None:
+        while self._heap and len(self._running) < self.max_concurrent:
+            _, _, task = heapq.heappop(self._heap)
+            if task.deadline is not None and time.monotonic() >= task.deadline:
+                self._finish(task, EXPIRED)
+                continue
+            task.state = RUNNING
+            task.started_at = time.monotonic()
+            self.queue_wait.add(task.started_at - task.submitted_at)
+            self._running[task.seq] = task
+            task.task = task.context.run(asyncio.ensure_future, self._run(task))
+
+    async def _run(self, task: CommandTask) -> None:
+        _current_task.set(task)
+        timeout = None
+        if task.deadline is not None:
+            timeout = max(0.0, task.deadline - time.monotonic())
+        try:
+            task.result = await asyncio.wait_for(task.factory(), timeout)
+            state = DONE
+        except asyncio.TimeoutError:
+            logger.warning(f"Command '{task.name}' missed its deadline")
+            state = EXPIRED
+        except asyncio.CancelledError:
+            state = CANCELLED
+        except Exception as e:
+            logger.error(f"Command '{task.name}' failed: {e}")
+            task.error = e
+            state = FAILED
+        self._finish(task, state)
+
+    def _finish(self, task: CommandTask, state: str) -> None:
+        task.state = state
+        task.finished_at = time.monotonic()
+        self.counts[state] += 1
+        self.turnaround.add(task.finished_at - task.submitted_at)
+        if self._running.pop(task.seq, None) is not None:
+            self.run_time.add(task.finished_at - task.started_at)
+        if state in (CANCELLED, EXPIRED):
+            task.outputs.clear()
+        self._deliver_ready()
+        self._pump()
+
+    def _deliver_ready(self) -> None:
+        while self._next_delivery in self._undelivered:
+            task = self._undelivered[self._next_delivery]
+            outputs, task.outputs = task.outputs, []
+            for deliver in outputs:
+                deliver()
+            if task.state not in FINISHED:
+                break  # Head is still running; its further output now flows straight through
+            del self._undelivered[self._next_delivery]
+            self._next_delivery += 1
+            if self.on_result is not None:
+                try:
+                    self.on_result(task)
+                except Exception as e:
+                    logger.error(f"Error delivering result of '{task.name}': {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, outcome counts and per-task latency percentiles."""
+        stats: Dict[str, Any] = {
+            'queue_depth': self.queue_depth,
+            'in_flight': self.in_flight,
+            'max_queue_depth': self.max_queue_depth,
+        }
+        stats.update(self.counts)
+        for name, window in (('wait', self.queue_wait), ('run', self.run_time), ('total', self.turnaround)):
+            stats.update({f'{name}_{k}': v for k, v in window.summary().items()})
+        return stats
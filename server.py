@@ -0,0 +1,363 @@
+"""Multi-session server: one assistant core serving many kiosk, web and chat clients over local HTTP.
+
+    python server.py --port 8765
+
+Each session has its own conversation state; the Wikipedia cache, weather
+connection pool and recognizer workers are shared by all of them.
+
+    POST   /sessions                  -> {"session": "<id>"}
+    POST   /sessions/<id>/commands    {"command": "weather in paris"} -> result
+    POST   /sessions/<id>/audio       16-bit mono WAV body -> result
+    DELETE /sessions/<id>
+    GET    /health
+    GET    /metrics                   Prometheus text
+
+Overload is pushed back to clients: 429 when a session sends too fast or
+queues too much, 503 (with Retry-After) when the server is full.
+"""
+import argparse
+import asyncio
+import io
+import itertools
+import json
+import logging
+import os
+import time
+import wave
+from typing import Any, Dict, Optional, Tuple
+
+from audio_capture import Utterance
+from audio_preprocess import AudioPreprocessor, create_preprocessor
+from headless import HeadlessAssistant
+from Main import dotenv
+from recognizers import RecognitionError, RecognizerBackend, create_backend
+from tracing import TRACER
+from weather_service import WeatherClient
+from wiki_service import WikipediaService
+
+logger = logging.getLogger(__name__)
+
+REASONS = {200: 'OK', 201: 'Created', 204: 'No Content', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 411: 'Length Required', 413: 'Payload Too Large',
+           422: 'Unprocessable Entity', 429: 'Too Many Requests', 500: 'Internal Server Error',
+           503: 'Service Unavailable'}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class Session:
+    """One client's conversation: its own assistant state, request queue and rate budget."""
+
+    __slots__ = ('id', 'assistant', 'lock', 'waiting', 'tokens', 'refilled', 'last_seen')
+
+    def __init__(self, session_id: str, assistant: HeadlessAssistant, burst: float):
+        self.id = session_id
+        self.assistant = assistant
+        self.lock = asyncio.Lock()  # Commands in a session run one at a time, in order
+        self.waiting = 0
+        self.tokens = burst
+        self.refilled = time.monotonic()
+        self.last_seen = self.refilled
+
+    def take_token(self, rate: float, burst: float) -> float:
+        """Token bucket; returns 0 if allowed, else seconds until a token is available."""
+        now = time.monotonic()
+        self.tokens = min(burst, self.tokens + (now - self.refilled) * rate)
+        self.refilled = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / rate
+
+
+class AssistantServer:
+    """asyncio HTTP/1.1 front end with per-session state and admission control."""
+
+    def __init__(self, wikipedia: WikipediaService, weather: Optional[WeatherClient] = None,
+                 recognizer: Optional[RecognizerBackend] = None,
+                 preprocessor: Optional[AudioPreprocessor] = None, max_sessions: int = 1000,
+                 max_inflight: int = 64, max_queue: int = 256, session_queue: int = 4,
+                 session_rate: float = 5.0, session_burst: float = 10.0,
+                 idle_timeout: float = 600.0, max_body: int = 2 * 1024 * 1024):
+        self.wikipedia = wikipedia
+        self.weather = weather
+        self.recognizer = recognizer
+        self.preprocessor = preprocessor
+        self.max_sessions = max_sessions
+        self.max_queue = max_queue
+        self.session_queue = session_queue
+        self.session_rate = session_rate
+        self.session_burst = session_burst
+        self.idle_timeout = idle_timeout
+        self.max_body = max_body
+        self.sessions: Dict[str, Session] = {}
+        self.counts = {'requests': 0, 'commands': 0, 'rejected_429': 0, 'rejected_503': 0, 'errors': 0}
+        self._ids = itertools.count(1)
+        self._slots = asyncio.Semaphore(max_inflight)
+        self._queued = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._sweeper: Optional[asyncio.Task] = None
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8765) -> int:
+        """Start listening; returns the bound port (useful with port 0)."""
+        self._server = await asyncio.start_server(self._serve_connection, host, port)
+        self._sweeper = asyncio.ensure_future(self._sweep_idle())
+        port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Assistant server listening on http://{host}:{port}")
+        return port
+
+    async def close(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                self.counts['requests'] += 1
+                extra = {}
+                try:
+                    status, payload = await self._route(method, path, body)
+                except HTTPError as e:
+                    status, payload = e.status, {'error': str(e)}
+                    if e.retry_after is not None:
+                        extra['Retry-After'] = str(max(1, round(e.retry_after)))
+                except Exception as e:
+                    logger.error(f"Error handling {method} {path}: {e}")
+                    self.counts['errors'] += 1
+                    status, payload = 500, {'error': 'internal error'}
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                await self._write_response(writer, status, payload, extra, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except HTTPError as e:
+            await self._write_response(writer, e.status, {'error': str(e)}, {}, False)
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, path, _ = line.decode('latin-1').split(' ', 2)
+        except ValueError:
+            raise HTTPError(400, "malformed request line")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            raise HTTPError(411, "chunked bodies are not supported")
+        try:
+            length = int(headers.get('content-length', '0') or 0)
+        except ValueError:
+            raise HTTPError(400, "bad Content-Length")
+        if length > self.max_body:
+            raise HTTPError(413, f"body larger than {self.max_body} bytes")
+        body = await reader.readexactly(length) if length else b''
+        return method.upper(), path.split('?', 1)[0], headers, body
+
+    @staticmethod
+    async def _write_response(writer: asyncio.StreamWriter, status: int, payload: Any,
+                              extra: Dict[str, str], keep_alive: bool) -> None:
+        if isinstance(payload, str):
+            body, content_type = payload.encode('utf-8'), 'text/plain; version=0.0.4'
+        elif payload is None:
+            body, content_type = b'', 'application/json'
+        else:
+            body, content_type = json.dumps(payload).encode('utf-8'), 'application/json'
+        head = [f'HTTP/1.1 {status} {REASONS.get(status, "")}',
+                f'Content-Type: {content_type}', f'Content-Length: {len(body)}',
+                f'Connection: {"keep-alive" if keep_alive else "close"}']
+        head += [f'{name}: {value}' for name, value in extra.items()]
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+
+    async def _route(self, method: str, path: str, body: bytes) -> Tuple[int, Any]:
+        parts = [p for p in path.split('/') if p]
+        if parts == ['health'] and method == 'GET':
+            return 200, {'status': 'ok', 'sessions': len(self.sessions)}
+        if parts == ['metrics'] and method == 'GET':
+            return 200, self.metrics()
+        if parts == ['sessions'] and method == 'POST':
+            return 201, {'session': self.create_session().id}
+        if len(parts) >= 2 and parts[0] == 'sessions':
+            session = self.sessions.get(parts[1])
+            if session is None:
+                raise HTTPError(404, f"no session {parts[1]}")
+            if len(parts) == 2 and method == 'DELETE':
+                self.sessions.pop(session.id, None)
+                return 204, None
+            if len(parts) == 3 and method == 'POST' and parts[2] == 'commands':
+                try:
+                    command = json.loads(body or b'{}')['command']
+                except (ValueError, KeyError, TypeError):
+                    raise HTTPError(400, 'expected {"command": "..."}')
+                return 200, await self.run_command(session, command)
+            if len(parts) == 3 and method == 'POST' and parts[2] == 'audio':
+                return 200, await self.run_command(session, None, audio=body)
+            raise HTTPError(405, f"{method} not allowed on {path}")
+        raise HTTPError(404, f"unknown path {path}")
+
+    def create_session(self) -> Session:
+        if len(self.sessions) >= self.max_sessions:
+            self.counts['rejected_503'] += 1
+            raise HTTPError(503, "too many sessions", retry_after=self.idle_timeout / 10)
+        assistant = HeadlessAssistant(wikipedia=self.wikipedia, weather=self.weather)
+        session = Session(f's{next(self._ids)}', assistant, self.session_burst)
+        self.sessions[session.id] = session
+        return session
+
+    async def run_command(self, session: Session, command: Optional[str],
+                          audio: Optional[bytes] = None) -> Dict[str, Any]:
+        """Admit, queue and run one command for a session."""
+        session.last_seen = time.monotonic()
+        wait = session.take_token(self.session_rate, self.session_burst)
+        if wait:
+            self.counts['rejected_429'] += 1
+            raise HTTPError(429, "session is sending too fast", retry_after=wait)
+        if session.waiting >= self.session_queue:
+            self.counts['rejected_429'] += 1
+            raise HTTPError(429, "too many commands queued for this session", retry_after=1)
+        if self._queued >= self.max_queue:
+            self.counts['rejected_503'] += 1
+            raise HTTPError(503, "server is busy", retry_after=1)
+
+        session.waiting += 1
+        self._queued += 1
+        admitted = False
+        try:
+            async with session.lock, self._slots:
+                admitted = True
+                self._queued -= 1
+                session.waiting -= 1
+                if audio is not None:
+                    command = await self.recognize(audio)
+                result = await session.assistant.handle(command)
+        finally:
+            if not admitted:
+                self._queued -= 1
+                session.waiting -= 1
+        self.counts['commands'] += 1
+        if result['exit']:
+            self.sessions.pop(session.id, None)
+        return dict(result, session=session.id)
+
+    async def recognize(self, audio: bytes) -> str:
+        if self.recognizer is None:
+            raise HTTPError(422, "no speech recognizer configured")
+        try:
+            with wave.open(io.BytesIO(audio), 'rb') as wav:
+                if wav.getnchannels() != 1:
+                    raise HTTPError(422, "audio must be mono")
+                frames = wav.readframes(wav.getnframes())
+                now = time.monotonic()
+                utterance = Utterance(frames, wav.getframerate(), wav.getsampwidth(), now, now)
+        except (wave.Error, EOFError) as e:
+            raise HTTPError(422, f"unreadable WAV: {e}")
+        if self.preprocessor is not None:
+            with TRACER.span('preprocess'):
+                utterance = await asyncio.get_event_loop().run_in_executor(None, self.preprocessor.process, utterance)
+        try:
+            with TRACER.span('recognize'):
+                return (await self.recognizer.recognize(utterance)).lower()
+        except RecognitionError as e:
+            raise HTTPError(422, f"couldn't recognize speech: {e}")
+
+    async def _sweep_idle(self) -> None:
+        """Forget sessions that have been quiet for longer than idle_timeout."""
+        while True:
+            await asyncio.sleep(min(30.0, self.idle_timeout / 2))
+            cutoff = time.monotonic() - self.idle_timeout
+            for session_id in [s.id for s in self.sessions.values() if s.last_seen < cutoff and not s.waiting]:
+                del self.sessions[session_id]
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self.counts, sessions=len(self.sessions), queued=self._queued)
+
+    def metrics(self) -> str:
+        lines = [TRACER.export_prometheus().rstrip('\n')]
+        for name, value in self.stats().items():
+            lines.append(f'assistant_server_{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+async def serve(args) -> None:
+    wikipedia = HeadlessAssistant.get_wikipedia_service()
+    weather = None
+    api_key = os.getenv('WEATHERAPI_KEY')
+    if api_key:
+        weather = WeatherClient(api_key, base_url=args.weather_url, pool_size=args.max_inflight)
+    recognizer = None
+    if args.recognizer != 'none':
+        try:
+            recognizer = create_backend(args.recognizer)
+            recognizer.warm_up()
+        except Exception as e:
+            logger.warning(f"Audio sessions disabled, recognizer unavailable: {e}")
+            recognizer = None
+
+    preprocessor = create_preprocessor() if recognizer is not None else None
+    if preprocessor is not None:
+        preprocessor.warm_up()
+    server = AssistantServer(wikipedia, weather, recognizer, preprocessor, max_sessions=args.max_sessions,
+                             max_inflight=args.max_inflight, max_queue=args.max_queue,
+                             session_queue=args.session_queue, session_rate=args.session_rate)
+    port = await server.start(args.host, args.port)
+    print(f"listening on {args.host}:{port}", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+        logger.info(f"Server stats: {server.stats()}")
+        wikipedia.close()
+        if weather is not None:
+            weather.close()
+        if recognizer is not None:
+            recognizer.close()
+        if preprocessor is not None:
+            logger.info(f"Audio preprocessing: {preprocessor.stats()}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the assistant to many clients over local HTTP")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765, help="0 picks a free port")
+    parser.add_argument('--max-sessions', type=int, default=1000)
+    parser.add_argument('--max-inflight', type=int, default=64, help="commands running at once")
+    parser.add_argument('--max-queue', type=int, default=256, help="commands waiting before 503")
+    parser.add_argument('--session-queue', type=int, default=4, help="commands waiting per session before 429")
+    parser.add_argument('--session-rate', type=float, default=5.0, help="commands per second per session")
+    parser.add_argument('--recognizer', default=os.getenv('ASSISTANT_RECOGNIZER', 'google'),
+                        help="backend for /audio (google, vosk, sphinx or none)")
+    parser.add_argument('--weather-url', help="WeatherAPI-compatible endpoint (e.g. a local stub)")
+    parser.add_argument('--log-level', default='INFO')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(args.log_level.upper())
+    dotenv.load_dotenv()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
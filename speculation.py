@@ -0,0 +1,127 @@
+import asyncio
+import functools
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from intent_router import IntentRouter
+from latency import LatencyWindow
+
+logger = logging.getLogger(__name__)
+
+# A command's 'prefetch' entry maps a transcript to the lookups its handler will make, by key
+Prefetch = Callable[[str], Dict[str, Callable[[], Awaitable]]]
+
+
+class Speculation:
+    """A lookup started from a partial transcript."""
+
+    __slots__ = ('key', 'task', 'started', 'finished')
+
+    def __init__(self, key: str, task: asyncio.Future):
+        self.key = key
+        self.task = task
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+
+
+class SpeculativeDispatcher:
+    """Start the likely handler's slow lookups from partial transcripts while the user is still talking.
+
+    Each partial hypothesis is routed; when it fully matches a command with
+    a ``prefetch`` entry, the lookups that entry names are started once
+    their key has shown up in ``min_stable`` consecutive hypotheses. The
+    services coalesce and cache requests, so the handler picks up the
+    speculative result without knowing about it. ``settle`` with the final
+    transcript keeps the lookups it needs and cancels the rest; upstream
+    calls already on a worker thread still finish and only fill the cache.
+    """
+
+    def __init__(self, router: IntentRouter, min_stable: int = 4, max_active: int = 4):
+        self.router = router
+        self.min_stable = min_stable
+        self.max_active = max_active
+        self.hypotheses = 0
+        self.started = 0
+        self.used = 0
+        self.wasted = 0
+        self.cancelled = 0
+        self.saved = LatencyWindow()
+        self.wasted_seconds = 0.0
+        self._active: Dict[str, Speculation] = {}
+        self._seen: Dict[str, int] = {}
+        self._settled = 0.0
+
+    def hypothesize(self, text: str, utterance: float = 0.0) -> None:
+        """Consider a partial transcript of the utterance in progress (on the event loop).
+
+        ``utterance`` (its start time) lets partials that arrive after the
+        utterance was settled be ignored.
+        """
+        if utterance and utterance <= self._settled:
+            return
+        self.hypotheses += 1
+        match = self.router.route(text)
+        prefetch: Optional[Prefetch] = match.info.get('prefetch') if match is not None and match.exact else None
+        lookups = prefetch(text) if prefetch is not None else {}
+        self._seen = {key: self._seen.get(key, 0) + 1 for key in lookups}
+        for key, lookup in lookups.items():
+            if key in self._active or self._seen[key] < self.min_stable or len(self._active) >= self.max_active:
+                continue
+            speculation = Speculation(key, asyncio.ensure_future(lookup()))
+            speculation.task.add_done_callback(functools.partial(self._finished, speculation))
+            self._active[key] = speculation
+            self.started += 1
+            logger.debug(f"Speculating on {key} from '{text}'")
+
+    @staticmethod
+    def _finished(speculation: Speculation, task: asyncio.Future) -> None:
+        speculation.finished = time.monotonic()
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"Speculative lookup {speculation.key} failed: {task.exception()}")
+
+    def settle(self, text: str, utterance: float = 0.0) -> None:
+        """The final transcript is in: keep the speculations it needs and drop the others."""
+        now = time.monotonic()
+        self._settled = max(self._settled, utterance)
+        needed = set()
+        match = self.router.route(text) if text else None
+        prefetch: Optional[Prefetch] = match.info.get('prefetch') if match is not None else None
+        if prefetch is not None:
+            needed = set(prefetch(text))
+
+        for key, speculation in self._active.items():
+            task = speculation.task
+            if key in needed:
+                self.used += 1
+                # Without it the lookup would only have started now
+                if task.done():
+                    self._record_saved((speculation.finished or now) - speculation.started, task)
+                else:
+                    task.add_done_callback(functools.partial(self._record_saved, now - speculation.started))
+                continue
+            self.wasted += 1
+            self.wasted_seconds += (speculation.finished or now) - speculation.started
+            if not task.done():
+                task.cancel()
+                self.cancelled += 1
+        self._active = {}
+        self._seen = {}
+
+    def _record_saved(self, seconds: float, task: asyncio.Future) -> None:
+        if not task.cancelled() and task.exception() is None:
+            self.saved.add(seconds)
+
+    def stats(self) -> Dict[str, float]:
+        """Speculations started, used and wasted, and the lookup time they saved."""
+        stats = {
+            'hypotheses': self.hypotheses,
+            'started': self.started,
+            'used': self.used,
+            'wasted': self.wasted,
+            'cancelled': self.cancelled,
+            'saved_seconds': round(self.saved.total, 3),
+            'wasted_seconds': round(self.wasted_seconds, 3),
+        }
+        stats.update({f'saved_{k}': v for k, v in self.saved.summary((50, 95)).items()})
+        return stats
@@ -0,0 +1,292 @@
+import heapq
+import itertools
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from latency import LatencyWindow
+from tts_cache import PCMPlayer, TTSAudioCache, audio_key, render
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_URGENT = 0
+PRIORITY_NORMAL = 10
+PRIORITY_LOW = 20
+
+MAX_TRACKED_MISSES = 1024
+
+_SENTENCE_RE = re.compile(r'(?<=[.!?;:])\s+|\n+')
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into speakable sentences so the first can start right away."""
+    return [part.strip() for part in _SENTENCE_RE.split(text) if part and part.strip()]
+
+
+class SpeechRequest:
+    """A queued piece of speech and the future that resolves when it finishes."""
+
+    __slots__ = ('sentences', 'priority', 'interruptible', 'cancelled', 'future', 'enqueued_at', 'first_audio_at')
+
+    def __init__(self, text: str, priority: int, interruptible: bool):
+        self.sentences = deque(split_sentences(text))
+        self.priority = priority
+        self.interruptible = interruptible
+        self.cancelled = False
+        self.future: Future = Future()
+        self.enqueued_at = time.monotonic()
+        self.first_audio_at: Optional[float] = None
+
+
+class SpeechWorker(threading.Thread):
+    """Queue-fed TTS thread that owns the pyttsx3 engine.
+
+    Requests are spoken sentence by sentence in priority order (lower value
+    first, FIFO within a priority). A more urgent request can cut in between
+    two sentences of a longer one, and ``interrupt()`` drops queued speech and
+    stops the sentence being spoken.
+
+    With an ``audio_cache`` sentences that have been rendered before are
+    played straight from PCM buffers. A sentence that has had to be
+    synthesized ``render_after`` times is rendered into the cache while the
+    worker is otherwise idle (one-off answers are not worth a second
+    synthesis), and ``prerender`` phrases are rendered and pinned in memory
+    at startup.
+    """
+
+    def __init__(self, engine_factory: Callable[[], Any],
+                 on_error: Optional[Callable[[Exception], None]] = None,
+                 audio_cache: Optional[TTSAudioCache] = None,
+                 prerender: Sequence[str] = (),
+                 player_factory: Callable[[], Any] = PCMPlayer,
+                 render_after: int = 2):
+        super().__init__(name="speech-output", daemon=True)
+        self.engine_factory = engine_factory
+        self.on_error = on_error
+        self.audio_cache = audio_cache
+        self.player_factory = player_factory
+        self.render_after = render_after
+        self.engine = None
+        self.player = None
+        self.ready = threading.Event()
+        self.speaking = False
+        self.last_audio_end = 0.0
+        self.first_audio_latencies = deque(maxlen=200)
+        self.cached_ttfa = LatencyWindow()
+        self.synthesized_ttfa = LatencyWindow()
+        self.rendered = 0
+
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._current: Optional[SpeechRequest] = None
+        self._stopped = False
+        self._has_callbacks = False
+        self._error: Optional[Exception] = None
+        self._voice = ''
+        self._rate = ''
+        # (sentence, pin in memory) waiting to be rendered while idle
+        self._to_render = deque((sentence, True) for phrase in prerender for sentence in split_sentences(phrase))
+        # Cache misses per audio key, most recent last; only the worker thread touches it
+        self._misses: OrderedDict = OrderedDict()
+
+    def say(self, text: str, priority: int = PRIORITY_NORMAL, interruptible: bool = True) -> Future:
+        """Queue text for speaking and return a future that resolves when it is done."""
+        request = SpeechRequest(text, priority, interruptible)
+        if self._error is not None:
+            request.future.set_exception(self._error)
+            return request.future
+        if not request.sentences:
+            request.future.set_result(True)
+            return request.future
+        with self._cond:
+            heapq.heappush(self._heap, (priority, next(self._seq), request))
+            self._cond.notify()
+        return request.future
+
+    def interrupt(self) -> int:
+        """Barge-in: cancel queued and in-progress interruptible speech."""
+        with self._cond:
+            kept, dropped = [], []
+            for entry in self._heap:
+                (dropped if entry[2].interruptible else kept).append(entry)
+            heapq.heapify(kept)
+            self._heap = kept
+            current = self._current
+        for _, _, request in dropped:
+            request.future.set_result(False)
+        cancelled = len(dropped)
+        if current is not None and current.interruptible:
+            current.cancelled = True
+            current.sentences.clear()
+            cancelled += 1
+            try:
+                self.engine.stop()
+            except Exception as e:
+                logger.warning(f"Could not stop speech in progress: {e}")
+        return cancelled
+
+    @property
+    def idle(self) -> bool:
+        """Nothing queued and nothing being spoken."""
+        with self._cond:
+            return self._current is None and not self._heap
+
+    def overlaps(self, started_at: float) -> bool:
+        """Whether audio captured at ``started_at`` could be our own speech."""
+        return self.speaking or self.last_audio_end > started_at
+
+    def stop(self) -> None:
+        """Stop the worker after the current sentence."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def stats(self) -> Dict[str, float]:
+        """Time-to-first-audio summary over recent requests, in milliseconds."""
+        samples = sorted(self.first_audio_latencies)
+        if not samples:
+            return {'count': 0}
+        stats = {
+            'count': len(samples),
+            'ttfa_p50_ms': samples[len(samples) // 2] * 1000,
+            'ttfa_max_ms': samples[-1] * 1000,
+        }
+        if self.audio_cache is not None:
+            stats['cache_hit_rate'] = self.audio_cache.hit_rate
+            stats.update({f'cached_{k}': v for k, v in self.cached_ttfa.summary((50, 95)).items()})
+            stats.update({f'synthesized_{k}': v for k, v in self.synthesized_ttfa.summary((50, 95)).items()})
+        return stats
+
+    def run(self) -> None:
+        try:
+            self.engine = self.engine_factory()
+            try:
+                self.engine.connect('started-utterance', self._on_started_utterance)
+                self._has_callbacks = True
+            except Exception:
+                pass  # Fall back to timing just before say()
+            if self.audio_cache is not None:
+                self._open_player()
+        except Exception as e:
+            logger.error(f"TTS engine initialization failed: {e}")
+            self._error = e
+            self._fail_pending(e)
+            return
+        finally:
+            self.ready.set()
+
+        while True:
+            with self._cond:
+                while not self._heap and not self._to_render and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    break
+                if not self._heap:
+                    job = self._to_render.popleft()
+                    request = None
+                else:
+                    priority, seq, request = heapq.heappop(self._heap)
+                    self._current = request
+
+            if request is None:
+                self._render(*job)
+                continue
+
+            try:
+                self._speak_next(request)
+            except Exception as e:
+                logger.error(f"Error in speech synthesis: {e}")
+                request.sentences.clear()
+                request.future.set_exception(e)
+                if self.on_error is not None:
+                    self.on_error(e)
+            finally:
+                self.speaking = False
+                self.last_audio_end = time.monotonic()
+
+            with self._cond:
+                self._current = None
+                if request.sentences:
+                    # Put the rest back; anything more urgent queued meanwhile goes first
+                    heapq.heappush(self._heap, (priority, seq, request))
+                elif not request.future.done():
+                    request.future.set_result(not request.cancelled)
+
+        self._error = RuntimeError("Speech output stopped")
+        self._fail_pending(self._error)
+        if self.player is not None:
+            self.player.close()
+
+    def _speak_next(self, request: SpeechRequest) -> None:
+        sentence = request.sentences.popleft()
+        self.speaking = True
+        if self.player is not None:
+            key = audio_key(sentence, self._voice, self._rate)
+            clip = self.audio_cache.get(key)
+            if clip is not None:
+                self.player.play(clip, on_start=lambda: self._on_started_utterance(cached=True),
+                                 should_stop=lambda: request.cancelled)
+                return
+            misses = self._misses.pop(key, 0) + 1
+            if misses >= self.render_after:
+                with self._cond:
+                    self._to_render.append((sentence, False))
+            else:
+                self._misses[key] = misses
+                if len(self._misses) > MAX_TRACKED_MISSES:
+                    self._misses.popitem(last=False)
+        if request.first_audio_at is None and not self._has_callbacks:
+            self._mark_first_audio(request)
+        self.engine.say(sentence)
+        self.engine.runAndWait()
+
+    def _on_started_utterance(self, name=None, cached: bool = False) -> None:
+        request = self._current
+        if request is not None and request.first_audio_at is None:
+            self._mark_first_audio(request, cached)
+
+    def _mark_first_audio(self, request: SpeechRequest, cached: bool = False) -> None:
+        request.first_audio_at = time.monotonic()
+        latency = request.first_audio_at - request.enqueued_at
+        self.first_audio_latencies.append(latency)
+        (self.cached_ttfa if cached else self.synthesized_ttfa).add(latency)
+
+    def _open_player(self) -> None:
+        """Cached playback needs a PCM output device and an engine that can render to file."""
+        try:
+            self._voice = self.engine.getProperty('voice')
+            self._rate = self.engine.getProperty('rate')
+        except Exception:
+            pass
+        if not hasattr(self.engine, 'save_to_file'):
+            logger.warning("TTS engine can't render to file; speech audio cache disabled")
+            return
+        try:
+            self.player = self.player_factory()
+        except Exception as e:
+            logger.warning(f"No PCM audio output, speech audio cache disabled: {e}")
+
+    def _render(self, sentence: str, pinned: bool) -> None:
+        """Render one sentence into the audio cache; runs only when nothing is waiting to be spoken."""
+        if self.player is None:
+            return
+        key = audio_key(sentence, self._voice, self._rate)
+        if self.audio_cache.pin(key) if pinned else self.audio_cache.contains(key):
+            return
+        try:
+            self.audio_cache.put(key, render(self.engine, sentence), pinned)
+            self.rendered += 1
+        except Exception as e:
+            logger.warning(f"Couldn't render speech for the cache: {e}")
+
+    def _fail_pending(self, error: Exception) -> None:
+        with self._cond:
+            pending, self._heap = self._heap, []
+        for _, _, request in pending:
+            if not request.future.done():
+                request.future.set_exception(error)
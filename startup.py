@@ -0,0 +1,86 @@
+import importlib
+import json
+import logging
+import threading
+import time
+import types
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimeline:
+    """Named milestones measured from when the application started loading."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.marks: Dict[str, float] = {}
+        self.imports: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def mark(self, name: str) -> None:
+        """Record the first time a milestone is reached."""
+        with self._lock:
+            self.marks.setdefault(name, time.perf_counter() - self.started)
+
+    def record_import(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.imports[name] = seconds
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                'marks_ms': {k: v * 1000 for k, v in self.marks.items()},
+                'lazy_imports_ms': {k: v * 1000 for k, v in self.imports.items()},
+            }
+
+    def dump(self, path: str) -> None:
+        with open(path, 'w') as report:
+            json.dump(self.report(), report, indent=2)
+
+
+TIMELINE = StartupTimeline()
+
+
+class LazyModule(types.ModuleType):
+    """Module proxy that imports the real module on first attribute access."""
+
+    def __init__(self, name: str, timeline: Optional[StartupTimeline] = None):
+        super().__init__(name)
+        self.__dict__['_lazy_lock'] = threading.Lock()
+        self.__dict__['_lazy_module'] = None
+        self.__dict__['_lazy_timeline'] = timeline
+
+    def _lazy_load(self) -> types.ModuleType:
+        module = self.__dict__['_lazy_module']
+        if module is None:
+            with self.__dict__['_lazy_lock']:
+                module = self.__dict__['_lazy_module']
+                if module is None:
+                    started = time.perf_counter()
+                    module = importlib.import_module(self.__name__)
+                    timeline = self.__dict__['_lazy_timeline']
+                    if timeline is not None:
+                        timeline.record_import(self.__name__, time.perf_counter() - started)
+                    self.__dict__['_lazy_module'] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._lazy_load(), attr)
+
+    def __dir__(self):
+        return dir(self._lazy_load())
+
+
+def lazy_import(name: str) -> LazyModule:
+    """Defer importing a heavy module until it is first used."""
+    return LazyModule(name, TIMELINE)
+
+
+def warm_imports(*modules: LazyModule) -> None:
+    """Import lazy modules now (meant to run on a background thread)."""
+    for module in modules:
+        try:
+            module._lazy_load()
+        except ImportError as e:
+            logger.warning(f"Couldn't preload {module.__name__}: {e}")
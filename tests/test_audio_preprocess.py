@@ -0,0 +1,59 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from audio_capture import Utterance  # noqa: E402
+from audio_preprocess import AudioPreprocessor, create_preprocessor  # noqa: E402
+from benchmarks.fixtures import synth_pcm  # noqa: E402
+
+RATE = 16000
+
+
+def utterance(segments, noise=300.0, seed=1):
+    return Utterance(synth_pcm(segments, RATE, noise=noise, seed=seed), RATE, 2, 0.0, 0.0)
+
+
+def samples(utterance):
+    return np.frombuffer(utterance.frame_data, dtype='<i2').astype(np.float64)
+
+
+def test_trim_keeps_speech_and_padding():
+    captured = utterance([('silence', 0.5), ('speech', 0.5), ('silence', 0.5)])
+    trimmed = AudioPreprocessor(normalize=False).process(captured)
+    assert 0.6 <= trimmed.duration <= 1.0
+
+
+def test_noise_estimated_from_trimmed_silence():
+    captured = utterance([('silence', 0.4), ('speech', 0.5), ('silence', 0.4)])
+    plain = AudioPreprocessor(normalize=False).process(captured)
+    denoiser = AudioPreprocessor(normalize=False, denoise=True)
+    cleaned = denoiser.process(captured)
+    # The padding kept either side of the speech is background noise only
+    pad = int(0.1 * RATE)
+    assert np.std(samples(cleaned)[:pad]) < 0.5 * np.std(samples(plain)[:pad])
+    assert denoiser.denoise_skipped == 0
+
+
+def test_no_silence_no_subtraction():
+    captured = utterance([('speech', 0.6)])
+    plain = AudioPreprocessor(normalize=False).process(captured)
+    denoiser = AudioPreprocessor(normalize=False, denoise=True)
+    assert denoiser.process(captured).frame_data == plain.frame_data
+    assert denoiser.denoise_skipped == 1
+
+
+def test_noise_profile_carries_over_to_utterance_without_silence():
+    denoiser = AudioPreprocessor(normalize=False, denoise=True)
+    denoiser.warm_up()
+    denoiser.process(utterance([('silence', 0.4), ('speech', 0.5), ('silence', 0.4)]))
+    captured = utterance([('speech', 0.6)], seed=2)
+    plain = AudioPreprocessor(normalize=False).process(captured)
+    assert denoiser.process(captured).frame_data != plain.frame_data
+    assert denoiser.denoise_skipped == 0
+
+
+def test_denoise_off_by_default(monkeypatch):
+    monkeypatch.delenv('ASSISTANT_DENOISE', raising=False)
+    assert not create_preprocessor().denoise
+    monkeypatch.setenv('ASSISTANT_DENOISE', '1')
+    assert create_preprocessor().denoise
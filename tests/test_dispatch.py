@@ -0,0 +1,80 @@
+import asyncio
+
+from benchmarks.stubs import FakeWikipedia
+from headless import HeadlessAssistant
+from scheduler import CANCELLED, DONE
+from wiki_service import WikipediaService
+
+
+def run(monkeypatch, scenario):
+    monkeypatch.setenv('ASSISTANT_HISTORY', '0')
+
+    async def main():
+        assistant = HeadlessAssistant(wikipedia=WikipediaService(module=FakeWikipedia(0.0)))
+        try:
+            return await scenario(assistant)
+        finally:
+            assistant.wikipedia.close()
+
+    return asyncio.run(main())
+
+
+def test_utterance_answers_pending_question(monkeypatch):
+    async def scenario(assistant):
+        task = assistant.scheduler.submit('ask', lambda: assistant.ask("Which city?"))
+        await asyncio.sleep(0.01)
+        assert len(assistant.pending_answers) == 1
+        assistant.dispatch('paris')
+        await asyncio.sleep(0.01)
+        return task
+
+    task = run(monkeypatch, scenario)
+    assert task.state == DONE
+    assert task.result == 'paris'
+
+
+def test_stop_cancels_pending_question(monkeypatch):
+    async def scenario(assistant):
+        task = assistant.scheduler.submit('ask', lambda: assistant.ask("Which city?"))
+        await asyncio.sleep(0.01)
+        assistant.dispatch('stop')
+        await asyncio.sleep(0.01)
+        return task, list(assistant.pending_answers)
+
+    task, pending = run(monkeypatch, scenario)
+    assert task.state == CANCELLED
+    assert task.result is None
+    assert pending == []
+
+
+def test_question_held_back_is_not_awaiting_an_answer(monkeypatch):
+    async def scenario(assistant):
+        release = asyncio.Event()
+        assistant.scheduler.submit('earlier', release.wait)
+        task = assistant.scheduler.submit('ask', lambda: assistant.ask("Which city?", timeout=0.05))
+        await asyncio.sleep(0.1)
+        # The question is still held behind the earlier command; nothing may answer it yet
+        assert assistant.app.lines == []
+        assert not assistant.pending_answers
+        release.set()
+        await asyncio.sleep(0.01)
+        assert assistant.app.lines == ["Assistant: Which city?"]
+        assistant.dispatch('paris')
+        await asyncio.sleep(0.01)
+        return task
+
+    task = run(monkeypatch, scenario)
+    assert task.state == DONE
+    assert task.result == 'paris'
+
+
+def test_unanswered_question_times_out(monkeypatch):
+    async def scenario(assistant):
+        task = assistant.scheduler.submit('ask', lambda: assistant.ask("Which city?", timeout=0.02))
+        await asyncio.sleep(0.05)
+        return task, list(assistant.pending_answers)
+
+    task, pending = run(monkeypatch, scenario)
+    assert task.state == DONE
+    assert task.result is None
+    assert pending == []
@@ -0,0 +1,51 @@
+import asyncio
+
+from benchmarks.stubs import FakeWikipedia, weather_server
+from headless import HeadlessAssistant
+from weather_service import WeatherClient
+from wiki_service import WikipediaService
+
+
+def run_session(monkeypatch, commands):
+    monkeypatch.setenv('WEATHERAPI_KEY', 'test')
+    monkeypatch.setenv('ASSISTANT_HISTORY', '0')
+
+    async def replay(url):
+        weather = WeatherClient('test', base_url=url + '/v1/current.json')
+        assistant = HeadlessAssistant(wikipedia=WikipediaService(module=FakeWikipedia(0.0)), weather=weather)
+        try:
+            return [await assistant.handle(command) for command in commands]
+        finally:
+            weather.close()
+            assistant.wikipedia.close()
+
+    with weather_server(0.0) as stub:
+        return asyncio.run(replay(stub.url))
+
+
+def test_follow_up_question_goes_through_ask(monkeypatch):
+    result, = run_session(monkeypatch, ['weather'])
+    assert result['intent'] == 'weather'
+    assert result['responses'] == ["Which city's weather would you like to know?"]
+
+
+def test_next_command_answers_pending_question(monkeypatch):
+    asked, answered = run_session(monkeypatch, ['weather', 'paris'])
+    assert asked['awaiting_answer']
+    assert answered['intent'] == 'weather'
+    assert not answered['awaiting_answer']
+    assert answered['responses'][0].startswith("Current weather in Paris")
+
+
+def test_stop_drops_pending_question(monkeypatch):
+    asked, stopped, command = run_session(monkeypatch, ['weather', 'stop', 'paris'])
+    assert asked['awaiting_answer']
+    assert stopped['intent'] == 'stop'
+    assert not stopped['awaiting_answer']
+    assert command['intent'] is None
+    assert not any(line.startswith("Current weather") for line in command['responses'])
+
+
+def test_stray_command_word_is_not_that_command(monkeypatch):
+    result, = run_session(monkeypatch, ['what is the history of rome'])
+    assert result['intent'] is None
@@ -0,0 +1,45 @@
+import asyncio
+
+from history import HistoryStore
+from tracing import Tracer
+
+
+def test_search_finds_lines_with_every_word(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.sqlite3'))
+    try:
+        store.append("You", "tell me about alan turing")
+        store.append("Assistant", "According to Wikipedia, Alan Turing was a mathematician.")
+        store.append("You", "weather in paris")
+        assert store.flush(5)
+        assert [entry.text for entry in store.search("Turing")] == [
+            "According to Wikipedia, Alan Turing was a mathematician.", "tell me about alan turing"]
+        assert store.search("turing paris") == []
+        assert [entry.speaker for entry in store.page(limit=2)] == ["Assistant", "You"]
+    finally:
+        store.close()
+
+
+def test_turn_latencies_stored_without_tracing(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.sqlite3'))
+    tracer = Tracer(enabled=False, keep_turns=True)
+    tracer.turn_listeners.append(store.record_turn)
+
+    async def turn():
+        started = tracer.begin_turn()
+        with tracer.span('route'):
+            pass
+        tracer.record('handler.weather', 0.25)
+        entry_id = store.append("Assistant", "Current weather in Paris", started.id)
+        tracer.end_turn()
+        return entry_id
+
+    try:
+        entry_id = asyncio.run(turn())
+        assert store.flush(5)
+        entry, = [entry for entry in store.page() if entry.id == entry_id]
+        stages = store.turn_latencies(entry)
+        assert stages['handler.weather'] == 0.25
+        assert {'route', 'turn'} <= set(stages)
+        assert tracer.histograms == {}  # Histograms stay off
+    finally:
+        store.close()
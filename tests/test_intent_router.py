@@ -0,0 +1,62 @@
+from intent_router import IntentRouter, tokenize
+
+COMMANDS = {
+    'open youtube': {'name': 'youtube'},
+    'open spotify': {'name': 'spotify'},
+    'open': {'name': 'open'},
+    'weather': {'name': 'weather'},
+    'exit': {'name': 'exit'},
+    'it': {'name': 'it'},
+    'search history': {'name': 'history'},
+}
+
+
+def test_tokenize_lowercases_and_drops_punctuation():
+    assert tokenize("What's the Weather, in Paris?") == ["what's", 'the', 'weather', 'in', 'paris']
+
+
+def test_exact_phrase_match():
+    match = IntentRouter(COMMANDS).route("what's the weather in paris")
+    assert match.key == 'weather'
+    assert match.exact
+    assert (match.start, match.end) == (2, 3)
+
+
+def test_longest_phrase_wins():
+    router = IntentRouter(COMMANDS)
+    assert router.route("open youtube please").key == 'open youtube'
+    assert router.route("open firefox").key == 'open'
+
+
+def test_phrases_match_whole_words_only():
+    assert IntentRouter(COMMANDS).route("exit now").key == 'exit'
+    assert IntentRouter({'it': {}}).route("exit") is None
+
+
+def test_priority_then_registration_order_breaks_ties():
+    router = IntentRouter({'weather': {}, 'paris': {}})
+    assert router.route("paris weather").key == 'weather'
+    router = IntentRouter({'weather': {}, 'paris': {'priority': 1}})
+    assert router.route("weather in paris").key == 'paris'
+
+
+def test_fallback_on_word_unique_to_one_command():
+    match = IntentRouter(COMMANDS).route("play spotify")
+    assert match.key == 'open spotify'
+    assert not match.exact
+    assert match.score == 0.5
+
+
+def test_fallback_ignores_words_shared_by_commands():
+    assert IntentRouter({'open youtube': {}, 'open spotify': {}}).route("open") is None
+
+
+def test_partial_match_below_min_score_is_no_match():
+    router = IntentRouter(COMMANDS, min_partial_score=1.0)
+    assert router.route("what is the history of rome") is None
+    assert router.route("history search").key == 'search history'
+    assert router.route("search history for turing").exact
+
+
+def test_no_words_no_match():
+    assert IntentRouter(COMMANDS).route("?!") is None
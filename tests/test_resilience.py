@@ -0,0 +1,225 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from resilience import (CLOSED, HALF_OPEN, OPEN, CallTimeoutError, CircuitBreaker, CircuitOpenError,
+                        ResilientCaller)
+from scheduler import DONE, CommandScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def open_breaker(clock, threshold=3):
+    breaker = CircuitBreaker('test', failure_threshold=threshold, reset_timeout=10.0, clock=clock)
+    for _ in range(threshold):
+        assert breaker.allow()
+        breaker.record_failure()
+    return breaker
+
+
+def test_failure_threshold_opens_circuit():
+    clock = FakeClock()
+    breaker = CircuitBreaker('test', failure_threshold=3, reset_timeout=10.0, clock=clock)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.opens == 1
+    assert not breaker.allow()
+
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker('test', failure_threshold=3, clock=FakeClock())
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_half_open_lets_one_probe_through_and_closes_on_success():
+    clock = FakeClock()
+    breaker = open_breaker(clock)
+    clock.now = 10.0
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()  # Only one probe at a time
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_circuit():
+    clock = FakeClock()
+    breaker = open_breaker(clock)
+    clock.now = 10.0
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.opens == 2
+    clock.now = 19.0
+    assert not breaker.allow()
+    clock.now = 20.0
+    assert breaker.allow()
+
+
+def test_abandoned_probe_releases_the_slot():
+    clock = FakeClock()
+    breaker = open_breaker(clock)
+    clock.now = 10.0
+    assert breaker.allow()
+    breaker.abandon()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+
+
+def test_cancelled_probe_call_releases_the_slot():
+    clock = FakeClock()
+    release = threading.Event()
+    caller = ResilientCaller('test', timeout=5.0, hedge=False, breaker=open_breaker(clock))
+    clock.now = 10.0
+
+    async def scenario():
+        probe = asyncio.ensure_future(caller.call(release.wait))
+        await asyncio.sleep(0.01)
+        assert caller.breaker._probing
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        release.set()
+        return caller.breaker.allow()
+
+    assert asyncio.run(scenario())
+
+
+def test_open_circuit_refuses_without_calling():
+    calls = []
+    caller = ResilientCaller('test', hedge=False, breaker=open_breaker(FakeClock()))
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(caller.call(calls.append, 'called'))
+    assert calls == []
+    assert caller.counts['rejected'] == 1
+
+
+def test_probe_through_caller_closes_circuit():
+    clock = FakeClock()
+    caller = ResilientCaller('test', hedge=False, breaker=open_breaker(clock))
+    clock.now = 10.0
+    assert asyncio.run(caller.call(lambda: 'ok')) == 'ok'
+    assert caller.breaker.state == CLOSED
+
+
+def test_failures_count_against_breaker_and_other_errors_do_not():
+    def refuse():
+        raise ConnectionError("refused")
+
+    def bad_request():
+        raise ValueError("bad request")
+
+    caller = ResilientCaller('test', hedge=False, failures=(ConnectionError,),
+                             breaker=CircuitBreaker('test', failure_threshold=2, clock=FakeClock()))
+
+    async def scenario():
+        for _ in range(3):
+            with pytest.raises(ValueError):
+                await caller.call(bad_request)
+        assert caller.breaker.state == CLOSED
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                await caller.call(refuse)
+        assert caller.breaker.state == OPEN
+
+    asyncio.run(scenario())
+    assert caller.counts['errors'] == 2
+
+
+def test_timeout_raises_call_timeout():
+    release = threading.Event()
+    caller = ResilientCaller('test', timeout=0.05, hedge=False)
+
+    async def scenario():
+        try:
+            with pytest.raises(CallTimeoutError):
+                await caller.call(release.wait)
+        finally:
+            release.set()  # Let the worker go so the loop can shut down
+
+    asyncio.run(scenario())
+    assert caller.counts['timeouts'] == 1
+    assert caller.breaker.failures == 1
+
+
+def test_hedge_fires_after_hedge_delay_and_wins():
+    first = threading.Event()
+    release = threading.Event()
+    sent = []
+
+    def fetch():
+        sent.append(time.monotonic())
+        if not first.is_set():
+            first.set()
+            release.wait()
+            return 'first'
+        return 'hedge'
+
+    caller = ResilientCaller('test', timeout=1.0, min_hedge_delay=0.05, max_hedge_delay=0.05)
+
+    async def scenario():
+        try:
+            return await caller.call(fetch)
+        finally:
+            release.set()
+
+    assert asyncio.run(scenario()) == 'hedge'
+    assert len(sent) == 2
+    assert sent[1] - sent[0] >= 0.045
+    assert caller.counts['hedged'] == 1
+    assert caller.counts['hedge_wins'] == 1
+
+
+def test_fast_answer_is_not_hedged():
+    calls = []
+    caller = ResilientCaller('test', timeout=1.0, min_hedge_delay=0.05, max_hedge_delay=0.05)
+    assert asyncio.run(caller.call(lambda: calls.append(1) or 'ok')) == 'ok'
+    assert calls == [1]
+    assert caller.counts['hedged'] == 0
+
+
+def test_hedge_ratio_cap():
+    caller = ResilientCaller('test', timeout=1.0, min_hedge_delay=0.01, max_hedge_delay=0.01,
+                             max_hedge_ratio=0.0)
+
+    async def scenario():
+        for _ in range(3):
+            await caller.call(time.sleep, 0.05)
+
+    asyncio.run(scenario())
+    assert caller.counts['calls'] == 3
+    assert caller.counts['hedged'] == 1
+
+
+def test_out_of_budget_call_is_refused():
+    calls = []
+    caller = ResilientCaller('test', timeout=5.0, reserve=0.5)
+
+    async def scenario():
+        scheduler = CommandScheduler()
+        task = scheduler.submit('turn', lambda: caller.call(calls.append, 'called'), deadline=0.2)
+        await asyncio.sleep(0.01)
+        return task
+
+    task = asyncio.run(scenario())
+    assert task.state != DONE
+    assert isinstance(task.error, CallTimeoutError)
+    assert calls == []
+    assert caller.counts['out_of_budget'] == 1
+    assert caller.breaker.failures == 0
@@ -0,0 +1,141 @@
+import asyncio
+
+from scheduler import CANCELLED, DONE, EXPIRED, FAILED, PRIORITY_URGENT, CommandScheduler
+
+
+def run(scenario):
+    return asyncio.run(scenario())
+
+
+def test_results_delivered_in_submission_order():
+    async def scenario():
+        delivered = []
+        scheduler = CommandScheduler(on_result=lambda task: delivered.append(task.name))
+
+        async def answer(name, delay):
+            await asyncio.sleep(delay)
+            return name
+
+        slow = scheduler.submit('slow', lambda: answer('slow', 0.05))
+        fast = scheduler.submit('fast', lambda: answer('fast', 0.0))
+        await asyncio.sleep(0.01)
+        assert fast.state == DONE and delivered == []
+        await asyncio.sleep(0.1)
+        assert slow.result == 'slow'
+        return delivered
+
+    assert run(scenario) == ['slow', 'fast']
+
+
+def test_output_held_back_until_earlier_commands_deliver():
+    async def scenario():
+        spoken = []
+        scheduler = CommandScheduler()
+        release = asyncio.Event()
+
+        async def first():
+            await release.wait()
+            scheduler.emit(lambda: spoken.append('first'))
+
+        async def second():
+            scheduler.emit(lambda: spoken.append('second'))
+
+        scheduler.submit('first', first)
+        scheduler.submit('second', second)
+        await asyncio.sleep(0.01)
+        assert spoken == []
+        release.set()
+        await asyncio.sleep(0.01)
+        return spoken
+
+    assert run(scenario) == ['first', 'second']
+
+
+def test_missed_deadline_expires_and_drops_output():
+    async def scenario():
+        spoken = []
+        scheduler = CommandScheduler()
+        blocker = asyncio.Event()
+
+        async def late():
+            scheduler.emit(lambda: spoken.append('late'))
+            await asyncio.sleep(1)
+
+        scheduler.submit('blocker', blocker.wait)
+        task = scheduler.submit('late', late, deadline=0.02)
+        await asyncio.sleep(0.05)
+        blocker.set()
+        await asyncio.sleep(0.01)
+        return task, spoken
+
+    task, spoken = run(scenario)
+    assert task.state == EXPIRED
+    assert spoken == []
+
+
+def test_queued_task_past_deadline_never_starts():
+    async def scenario():
+        scheduler = CommandScheduler(max_concurrent=1)
+        started = []
+
+        async def record():
+            started.append(True)
+
+        scheduler.submit('busy', lambda: asyncio.sleep(0.05))
+        task = scheduler.submit('waiting', record, deadline=0.01)
+        await asyncio.sleep(0.1)
+        return task, started
+
+    task, started = run(scenario)
+    assert task.state == EXPIRED
+    assert started == []
+
+
+def test_priority_orders_the_queue():
+    async def scenario():
+        order = []
+        scheduler = CommandScheduler(max_concurrent=1)
+
+        async def record(name):
+            order.append(name)
+
+        scheduler.submit('busy', lambda: asyncio.sleep(0.01))
+        scheduler.submit('normal', lambda: record('normal'))
+        scheduler.submit('urgent', lambda: record('urgent'), priority=PRIORITY_URGENT)
+        await asyncio.sleep(0.05)
+        return order
+
+    assert run(scenario) == ['urgent', 'normal']
+
+
+def test_cancel_all_cancels_running_and_queued():
+    async def scenario():
+        results = []
+        scheduler = CommandScheduler(max_concurrent=1, on_result=results.append)
+        running = scheduler.submit('running', lambda: asyncio.sleep(1))
+        queued = scheduler.submit('queued', lambda: asyncio.sleep(1))
+        await asyncio.sleep(0.01)
+        assert scheduler.cancel_all() == 2
+        await asyncio.sleep(0.01)
+        return running, queued, results
+
+    running, queued, results = run(scenario)
+    assert running.state == CANCELLED and queued.state == CANCELLED
+    assert results == [running, queued]
+
+
+def test_failed_handler_is_reported():
+    async def scenario():
+        scheduler = CommandScheduler()
+
+        async def broken():
+            raise ValueError("boom")
+
+        task = scheduler.submit('broken', broken)
+        await asyncio.sleep(0.01)
+        return task, scheduler.stats()
+
+    task, stats = run(scenario)
+    assert task.state == FAILED
+    assert isinstance(task.error, ValueError)
+    assert stats[FAILED] == 1
@@ -0,0 +1,36 @@
+import time
+
+from benchmarks.fakes import TimedEngine, TimedPlayer
+from speech_output import SpeechWorker, split_sentences
+from tts_cache import TTSAudioCache
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+def test_split_sentences():
+    assert split_sentences("Hello there. How are you?\nFine") == ["Hello there.", "How are you?", "Fine"]
+
+
+def test_only_repeated_sentences_are_rendered_into_cache(tmp_path):
+    cache = TTSAudioCache(str(tmp_path / 'tts.sqlite3'))
+    worker = SpeechWorker(lambda: TimedEngine(0.0, synth_ms_per_char=0.0, startup_ms=0.0),
+                          audio_cache=cache, player_factory=TimedPlayer)
+    worker.start()
+    try:
+        worker.say("Said once.").result(5)
+        worker.say("Said twice.").result(5)
+        time.sleep(0.05)
+        assert worker.rendered == 0
+        worker.say("Said twice.").result(5)
+        assert wait_until(lambda: worker.rendered == 1)
+        before = worker.cached_ttfa.count
+        worker.say("Said twice.").result(5)
+        assert worker.cached_ttfa.count == before + 1
+    finally:
+        worker.stop()
+        cache.close()
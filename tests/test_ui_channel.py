@@ -0,0 +1,95 @@
+import threading
+
+from ui_channel import UIUpdateChannel
+
+
+class FakeRoot:
+    """Records ``after`` callbacks; refuses calls from other threads while ``in_main_loop`` is off."""
+
+    def __init__(self):
+        self.callbacks = {}
+        self.in_main_loop = True
+        self._thread = threading.current_thread()
+        self._next_id = 0
+
+    def after(self, ms, func):
+        if threading.current_thread() is not self._thread and not self.in_main_loop:
+            raise RuntimeError("main thread is not in main loop")
+        self._next_id += 1
+        self.callbacks[self._next_id] = func
+        return self._next_id
+
+    def after_cancel(self, after_id):
+        self.callbacks.pop(after_id, None)
+
+    def run_pending(self):
+        callbacks, self.callbacks = self.callbacks, {}
+        for func in callbacks.values():
+            func()
+
+
+class FakeText:
+    def __init__(self):
+        self.text = ''
+
+    def configure(self, **options):
+        pass
+
+    def insert(self, index, text):
+        self.text += text
+
+    def index(self, index):
+        return f"{self.text.count(chr(10)) + 1}.0"
+
+    def see(self, index):
+        pass
+
+
+class FakeLabel:
+    def config(self, **options):
+        self.options = options
+
+
+def make_channel(root):
+    channel = UIUpdateChannel(root, FakeText(), FakeLabel())
+    channel.on_demand = True
+    channel.start()
+    root.run_pending()  # First drain finds nothing; only the slow poll stays armed
+    return channel
+
+
+def from_other_thread(func):
+    thread = threading.Thread(target=func)
+    thread.start()
+    thread.join()
+
+
+def test_update_from_other_thread_schedules_drain():
+    root = FakeRoot()
+    channel = make_channel(root)
+    from_other_thread(lambda: channel.add_line("Assistant: hello"))
+    assert len(root.callbacks) == 2  # Drain and poll
+    root.run_pending()
+    assert channel.conversation_text.text == "Assistant: hello\n"
+
+
+def test_refused_after_falls_back_to_tk_side_timer():
+    root = FakeRoot()
+    channel = make_channel(root)
+    root.in_main_loop = False
+    from_other_thread(lambda: channel.add_line("Assistant: hello"))
+    assert not channel.on_demand
+    assert channel.conversation_text.text == ''
+    root.run_pending()  # The poll notices the queued line and starts the timer
+    root.run_pending()
+    assert channel.conversation_text.text == "Assistant: hello\n"
+    from_other_thread(lambda: channel.set_status("Listening", 'green'))
+    root.run_pending()  # The timer keeps draining without being scheduled again
+    assert channel.status_label.options == {'text': "Listening", 'foreground': 'green'}
+
+
+def test_stop_cancels_pending_callbacks():
+    root = FakeRoot()
+    channel = make_channel(root)
+    channel.stop()
+    assert root.callbacks == {}
@@ -0,0 +1,47 @@
+import pytest
+
+from wiki_offline import DisambiguationError, OfflineWikipedia, PageError, ingest
+
+ARTICLES = [
+    ("Mercury", "Mercury may refer to:"),
+    ("Mercury (planet)", "Mercury is the smallest planet in the Solar System. It is closest to the Sun."),
+    ("Mercury (element)", "Mercury is a chemical element with the symbol Hg."),
+    ("Lonely", "Lonely may refer to:"),
+    ("Eiffel Tower", "The Eiffel Tower is a wrought-iron lattice tower in Paris."),
+]
+
+
+@pytest.fixture
+def offline(tmp_path):
+    dump = tmp_path / 'abstracts.xml'
+    dump.write_text('<feed>\n' + ''.join(
+        f'<doc><title>Wikipedia: {title}</title><abstract>{abstract}</abstract></doc>\n'
+        for title, abstract in ARTICLES) + '</feed>\n')
+    ingest(str(dump), str(tmp_path / 'index'))
+    wikipedia = OfflineWikipedia.open(str(tmp_path / 'index'))
+    yield wikipedia
+    wikipedia.index.close()
+
+
+def test_summary_and_sentence_limit(offline):
+    assert offline.summary("Mercury (planet)", sentences=1) == "Mercury is the smallest planet in the Solar System."
+
+
+def test_auto_suggest_extends_the_query(offline):
+    assert offline.summary("eiffel").startswith("The Eiffel Tower")
+
+
+def test_unknown_title_is_page_error(offline):
+    with pytest.raises(PageError):
+        offline.summary("Atlantis")
+
+
+def test_disambiguation_lists_options(offline):
+    with pytest.raises(DisambiguationError) as raised:
+        offline.summary("Mercury")
+    assert sorted(raised.value.options) == ["Mercury (element)", "Mercury (planet)"]
+
+
+def test_disambiguation_without_options_is_not_found(offline):
+    with pytest.raises(PageError):
+        offline.summary("Lonely")
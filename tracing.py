@@ -0,0 +1,200 @@
+import contextvars
+import itertools
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+from latency import LatencyWindow, percentile
+
+logger = logging.getLogger(__name__)
+
+QUANTILES = (50, 95, 99)
+
+_current_turn: contextvars.ContextVar = contextvars.ContextVar('turn', default=None)
+
+
+class Turn:
+    """Spans recorded for one conversational turn, from the start of speech to the handler's end."""
+
+    __slots__ = ('id', 'started', 'spans', 'ended')
+
+    def __init__(self, turn_id: int, started: float):
+        self.id = turn_id
+        self.started = started
+        self.spans: List[Tuple[str, float]] = []
+        self.ended: Optional[float] = None
+
+    def stage_latencies(self) -> Dict[str, float]:
+        """Total seconds per stage within this turn."""
+        totals: Dict[str, float] = {}
+        for name, seconds in self.spans:
+            totals[name] = totals.get(name, 0.0) + seconds
+        return totals
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'started')
+
+    def __init__(self, tracer: 'Tracer', name: str):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.monotonic()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.record(self.name, time.monotonic() - self.started)
+        return False
+
+
+class Tracer:
+    """Per-turn spans and rolling per-stage latency histograms.
+
+    Disabled by default; while disabled ``span()`` hands back a shared no-op
+    context manager and ``record()`` returns immediately, so instrumented
+    code pays one attribute check. With ``keep_turns`` set, turns and their
+    spans are kept for the turn listeners even while the histograms are off.
+    """
+
+    def __init__(self, enabled: bool = False, window: int = 2048, keep_turns: bool = False):
+        self.enabled = enabled
+        self.keep_turns = keep_turns
+        self.window = window
+        self.histograms: Dict[str, LatencyWindow] = {}
+        self.turn_listeners: List[Callable[[Turn], None]] = []
+        self._turn_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def configure(self) -> None:
+        """Turn tracing on from ASSISTANT_TRACING; called at startup once .env is loaded."""
+        self.enabled = os.getenv('ASSISTANT_TRACING') == '1'
+
+    def span(self, name: str):
+        """Context manager timing one stage."""
+        if not self.enabled and not self.keep_turns:
+            return _NOOP_SPAN
+        return _Span(self, name)
+
+    def record(self, name: str, seconds: float, turn: Optional[Turn] = None) -> None:
+        """Add a stage timing to its histogram and to the current (or given) turn."""
+        if self.enabled:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                with self._lock:
+                    histogram = self.histograms.setdefault(name, LatencyWindow(self.window))
+            histogram.add(seconds)
+        elif not self.keep_turns:
+            return
+        turn = turn or _current_turn.get()
+        if turn is not None:
+            turn.spans.append((name, seconds))
+
+    def begin_turn(self, started: Optional[float] = None) -> Optional[Turn]:
+        """Start a turn in the current context; ``started`` is a time.monotonic() value."""
+        if not self.enabled and not self.keep_turns:
+            return None
+        turn = Turn(next(self._turn_ids), started if started is not None else time.monotonic())
+        _current_turn.set(turn)
+        return turn
+
+    @staticmethod
+    def current_turn() -> Optional[Turn]:
+        return _current_turn.get()
+
+    def end_turn(self, turn: Optional[Turn] = None) -> None:
+        """Close the current (or given) turn, record its total and notify listeners."""
+        turn = turn or _current_turn.get()
+        if turn is None or turn.ended is not None:
+            return
+        turn.ended = time.monotonic()
+        if _current_turn.get() is turn:
+            _current_turn.set(None)
+        self.record('turn', turn.ended - turn.started, turn)
+        for listener in self.turn_listeners:
+            try:
+                listener(turn)
+            except Exception as e:
+                logger.error(f"Turn listener failed: {e}")
+
+    def detach(self) -> None:
+        """Forget the current turn here without ending it; tasks it was handed to keep it."""
+        if self.enabled or self.keep_turns:
+            _current_turn.set(None)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Percentiles in milliseconds per stage."""
+        return {name: dict(histogram.summary(QUANTILES), count=histogram.count)
+                for name, histogram in sorted(self.histograms.items())}
+
+    def export_prometheus(self) -> str:
+        """Render the histograms in Prometheus text exposition format (as summaries)."""
+        lines = [
+            '# HELP assistant_stage_seconds Latency of voice assistant pipeline stages.',
+            '# TYPE assistant_stage_seconds summary',
+        ]
+        for name, histogram in sorted(self.histograms.items()):
+            samples = histogram.snapshot()
+            for q in QUANTILES:
+                lines.append(f'assistant_stage_seconds{{stage="{name}",quantile="{q / 100:g}"}} '
+                             f'{percentile(samples, q):.6f}')
+            lines.append(f'assistant_stage_seconds_sum{{stage="{name}"}} {histogram.total:.6f}')
+            lines.append(f'assistant_stage_seconds_count{{stage="{name}"}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str) -> None:
+        """Write the exposition atomically so scrapers never see a partial file."""
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as metrics:
+            metrics.write(self.export_prometheus())
+        os.replace(tmp_path, path)
+
+    def serve(self, port: int, host: str = '127.0.0.1') -> None:
+        """Expose /metrics on a local HTTP endpoint from a daemon thread."""
+        tracer = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = tracer.export_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+        logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+
+    def shutdown(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+TRACER = Tracer()
@@ -0,0 +1,180 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import wave
+from typing import Callable, Dict, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AudioClip(NamedTuple):
+    pcm: bytes
+    sample_rate: int
+    sample_width: int
+    channels: int = 1
+
+    @property
+    def duration(self) -> float:
+        return len(self.pcm) / float(self.sample_rate * self.sample_width * self.channels)
+
+
+def audio_key(text: str, voice: str, rate) -> str:
+    """Cache key for an utterance: whitespace-normalized text plus the voice and rate it was rendered with."""
+    normalized = ' '.join(text.split())
+    return hashlib.sha1(f'{voice}\0{rate}\0{normalized}'.encode('utf-8')).hexdigest()
+
+
+def read_wav(path: str) -> AudioClip:
+    with wave.open(path, 'rb') as wav:
+        return AudioClip(wav.readframes(wav.getnframes()), wav.getframerate(),
+                         wav.getsampwidth(), wav.getnchannels())
+
+
+def render(engine, text: str) -> AudioClip:
+    """Synthesize text to PCM with a pyttsx3 engine (on the thread that owns it)."""
+    fd, path = tempfile.mkstemp(suffix='.wav')
+    os.close(fd)
+    try:
+        engine.save_to_file(text, path)
+        engine.runAndWait()
+        return read_wav(path)
+    finally:
+        os.remove(path)
+
+
+class TTSAudioCache:
+    """Rendered speech: pinned in-memory clips for fixed phrases, SQLite LRU for the rest.
+
+    Disk entries are evicted least recently used first once their PCM adds
+    up to more than ``max_bytes``.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.memory: Dict[str, AudioClip] = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS clips ('
+            ' key TEXT PRIMARY KEY, sample_rate INTEGER NOT NULL, sample_width INTEGER NOT NULL,'
+            ' channels INTEGER NOT NULL, pcm BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS clips_accessed ON clips (accessed)')
+        self._conn.commit()
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(len(clip.pcm) for clip in self.memory.values())
+
+    def get(self, key: str) -> Optional[AudioClip]:
+        clip = self.memory.get(key) or self._load(key)
+        if clip is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return clip
+
+    def _load(self, key: str, touch: bool = True) -> Optional[AudioClip]:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT pcm, sample_rate, sample_width, channels FROM clips WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if touch:
+                self._conn.execute('UPDATE clips SET accessed = ? WHERE key = ?', (time.time(), key))
+                self._conn.commit()
+        return AudioClip(bytes(row[0]), row[1], row[2], row[3])
+
+    def contains(self, key: str) -> bool:
+        if key in self.memory:
+            return True
+        with self._lock:
+            return self._conn.execute('SELECT 1 FROM clips WHERE key = ?', (key,)).fetchone() is not None
+
+    def pin(self, key: str) -> bool:
+        """Keep an already stored clip in memory; False if it has not been rendered yet."""
+        clip = self.memory.get(key) or self._load(key, touch=False)
+        if clip is None:
+            return False
+        self.memory[key] = clip
+        return True
+
+    def put(self, key: str, clip: AudioClip, pinned: bool = False) -> None:
+        if pinned:
+            self.memory[key] = clip
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO clips VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key, clip.sample_rate, clip.sample_width, clip.channels, clip.pcm, len(clip.pcm), time.time())
+            )
+            total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM clips').fetchone()[0]
+            if total > self.max_bytes:
+                excess = total - self.max_bytes
+                for old_key, size in self._conn.execute('SELECT key, size FROM clips ORDER BY accessed').fetchall():
+                    if excess <= 0:
+                        break
+                    if old_key in self.memory:
+                        continue
+                    self._conn.execute('DELETE FROM clips WHERE key = ?', (old_key,))
+                    excess -= size
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class PCMPlayer:
+    """Plays PCM buffers through PyAudio, in short chunks so playback can be cut off."""
+
+    def __init__(self, chunk_seconds: float = 0.05):
+        import pyaudio
+        self.chunk_seconds = chunk_seconds
+        self._pyaudio = pyaudio.PyAudio()
+        self._format_for_width = self._pyaudio.get_format_from_width
+        self._streams = {}
+
+    def play(self, clip: AudioClip, on_start: Optional[Callable[[], None]] = None,
+             should_stop: Optional[Callable[[], bool]] = None) -> bool:
+        """Block until the clip has played; False if ``should_stop`` cut it short."""
+        stream = self._stream(clip)
+        frame_bytes = clip.sample_width * clip.channels
+        chunk = max(frame_bytes, int(clip.sample_rate * self.chunk_seconds) * frame_bytes)
+        pcm = memoryview(clip.pcm)
+        for offset in range(0, len(pcm), chunk):
+            if should_stop is not None and should_stop():
+                return False
+            stream.write(bytes(pcm[offset:offset + chunk]))
+            if offset == 0 and on_start is not None:
+                on_start()
+        return True
+
+    def _stream(self, clip: AudioClip):
+        fmt = (clip.sample_rate, clip.sample_width, clip.channels)
+        stream = self._streams.get(fmt)
+        if stream is None:
+            stream = self._pyaudio.open(format=self._format_for_width(clip.sample_width),
+                                        channels=clip.channels, rate=clip.sample_rate, output=True)
+            self._streams[fmt] = stream
+        return stream
+
+    def close(self) -> None:
+        for stream in self._streams.values():
+            stream.stop_stream()
+            stream.close()
+        self._streams.clear()
+        self._pyaudio.terminate()
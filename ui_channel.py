@@ -0,0 +1,224 @@
+import queue
+import threading
+import tkinter as tk
+from collections import deque
+from typing import Any, Callable, List, Optional, Tuple
+
+CONVERSATION = 'conversation'
+STATUS = 'status'
+CALL = 'call'
+
+
+def tcl_threaded(root: tk.Misc) -> bool:
+    """Whether Tcl was built with threads, so other threads may schedule work with ``after``."""
+    try:
+        return bool(int(root.tk.eval('expr {[info exists tcl_platform(threaded)] && $tcl_platform(threaded)}')))
+    except (AttributeError, ValueError, tk.TclError):
+        return False
+
+
+class UIUpdateChannel:
+    """Thread-safe queue of UI updates applied in batches on the Tk main thread.
+
+    Any thread may call ``add_line`` or ``set_status``; nothing touches Tk
+    until ``drain`` runs from ``root.after`` at most ``fps`` times a second.
+    Each drain inserts all pending lines with one widget update, applies only
+    the latest status, and trims the conversation to ``max_lines``. With a
+    threaded Tcl the first update after a quiet spell schedules the drain, so
+    an idle window is only woken by a slow check every ``poll_ms`` for updates
+    whose ``after`` was refused (Tk outside its main loop); from then on, or
+    without a threaded Tcl, the channel drains on a timer.
+
+    With a ``history`` store the display starts with the most recent stored
+    lines, and scrolling to the top pages older ones in ``page_size`` at a
+    time. Trimming waits while the user is scrolled back through history.
+    """
+
+    def __init__(self, root: tk.Misc, conversation_text: tk.Text, status_label,
+                 max_lines: int = 1000, fps: int = 30, max_batch: int = 500,
+                 history=None, page_size: int = 100, poll_ms: int = 500):
+        self.root = root
+        self.conversation_text = conversation_text
+        self.status_label = status_label
+        self.max_lines = max_lines
+        self.interval_ms = max(1, int(1000 / fps))
+        self.poll_ms = poll_ms
+        self.max_batch = max_batch
+        self.history = history
+        self.page_size = page_size
+        self.lines_trimmed = 0
+        self.lines_paged = 0
+        self.batches = 0
+        self._events: 'queue.SimpleQueue[Tuple[str, tuple]]' = queue.SimpleQueue()
+        self._after_id: Optional[str] = None
+        self._poll_id: Optional[str] = None
+        self.on_demand = tcl_threaded(root)
+        self._tk_thread = threading.current_thread()
+        self._lock = threading.Lock()
+        self._scheduled = False
+        self._running = False
+        # (history id or None, widget lines) for each displayed entry, oldest first
+        self._shown: deque = deque()
+        self._history_exhausted = history is None
+        self._paging = False
+        if history is not None:
+            # ScrolledText's own scrollbar still has to follow the view
+            scrollbar = getattr(conversation_text, 'vbar', None)
+            self._scrollbar_set = scrollbar.set if scrollbar is not None else None
+            conversation_text.configure(yscrollcommand=self._on_scroll)
+
+    def add_line(self, text: str, entry_id: Optional[int] = None) -> None:
+        self._put((CONVERSATION, (text, entry_id)))
+
+    def set_status(self, text: str, color: str) -> None:
+        self._put((STATUS, (text, color)))
+
+    def call(self, func: Callable[[], Any]) -> None:
+        """Run a callable on the Tk thread at the next drain."""
+        self._put((CALL, (func,)))
+
+    def _put(self, event: Tuple[str, tuple]) -> None:
+        self._events.put(event)
+        if self.on_demand or threading.current_thread() is self._tk_thread:
+            self._schedule()
+
+    def _schedule(self) -> None:
+        """Arrange one drain ``interval_ms`` from now unless one is already due."""
+        with self._lock:
+            if self._scheduled or not self._running:
+                return
+            self._scheduled = True
+        try:
+            # Threaded Tcl hands after() from other threads to the Tk thread
+            self._after_id = self.root.after(self.interval_ms, self._tick)
+        except RuntimeError:
+            # Tk isn't in its main loop, so it can't take calls from this thread:
+            # the Tk-side poll picks the update up and keeps draining on a timer
+            with self._lock:
+                self._scheduled = False
+            self.on_demand = False
+        except tk.TclError:
+            # The window was destroyed; nothing will be drawn again
+            with self._lock:
+                self._scheduled = False
+                self._running = False
+
+    def start(self) -> None:
+        """Begin draining on the Tk thread."""
+        if not self._running:
+            if self.history is not None and not self._shown:
+                self._page_in()
+            self._running = True
+            self._schedule()
+            if self.on_demand:
+                self._poll_id = self.root.after(self.poll_ms, self._poll)
+
+    def stop(self) -> None:
+        self._running = False
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        if self._poll_id is not None:
+            self.root.after_cancel(self._poll_id)
+            self._poll_id = None
+
+    def _poll(self) -> None:
+        """Tk-side safety net for updates queued while other threads couldn't schedule a drain."""
+        self._poll_id = None
+        if not self._running:
+            return
+        if not self._events.empty():
+            self._schedule()
+        if self.on_demand:
+            try:
+                self._poll_id = self.root.after(self.poll_ms, self._poll)
+            except tk.TclError:
+                pass  # Window destroyed
+
+    def _tick(self) -> None:
+        with self._lock:
+            self._scheduled = False
+            self._after_id = None
+        self.drain()
+        if not self.on_demand or not self._events.empty():
+            self._schedule()
+
+    def drain(self) -> int:
+        """Apply pending updates; must run on the Tk main thread."""
+        lines: List[Tuple[str, Optional[int]]] = []
+        calls = []
+        status = None
+        handled = 0
+        while handled < self.max_batch:
+            try:
+                kind, args = self._events.get_nowait()
+            except queue.Empty:
+                break
+            handled += 1
+            if kind == CONVERSATION:
+                lines.append(args)
+            elif kind == STATUS:
+                status = args
+            else:
+                calls.append(args[0])
+
+        if lines:
+            self._append(lines)
+        if status is not None:
+            self.status_label.config(text=status[0], foreground=status[1])
+        for func in calls:
+            func()
+        if handled:
+            self.batches += 1
+        return handled
+
+    def _append(self, lines: List[Tuple[str, Optional[int]]]) -> None:
+        text = self.conversation_text
+        following = self.history is None or text.yview()[1] >= 1.0
+        text.configure(state='normal')
+        text.insert(tk.END, '\n'.join(line for line, _ in lines) + '\n')
+        self._shown.extend((entry_id, line.count('\n') + 1) for line, entry_id in lines)
+        line_count = int(text.index('end-1c').split('.')[0]) - 1
+        excess = line_count - self.max_lines
+        if excess > 0 and following:
+            # Drop whole entries so paging back can resume from the first one shown
+            trimmed = 0
+            while self._shown and trimmed < excess:
+                trimmed += self._shown.popleft()[1]
+            text.delete('1.0', f'{trimmed + 1}.0')
+            self.lines_trimmed += trimmed
+            self._history_exhausted = self.history is None
+        text.configure(state='disabled')
+        if following:
+            text.see(tk.END)
+
+    def _on_scroll(self, first: str, last: str) -> None:
+        if self._scrollbar_set is not None:
+            self._scrollbar_set(first, last)
+        if float(first) <= 0.0 and not self._history_exhausted and not self._paging and self._shown:
+            self._paging = True
+            self.root.after_idle(self._page_in)
+
+    def _page_in(self) -> None:
+        """Insert the page of stored history just before the oldest line shown."""
+        self._paging = False
+        oldest = next((entry_id for entry_id, _ in self._shown if entry_id is not None), None)
+        if oldest is None and self._shown:
+            self._history_exhausted = True
+            return
+        entries = self.history.page(before=oldest, limit=self.page_size)
+        if len(entries) < self.page_size:
+            self._history_exhausted = True
+        if not entries:
+            return
+        text = self.conversation_text
+        lines = [entry.line() for entry in entries]
+        text.configure(state='normal')
+        text.insert('1.0', '\n'.join(lines) + '\n')
+        text.configure(state='disabled')
+        added = [(entry.id, line.count('\n') + 1) for entry, line in zip(entries, lines)]
+        self._shown.extendleft(reversed(added))
+        inserted = sum(count for _, count in added)
+        self.lines_paged += inserted
+        # Keep the line the user was looking at in place
+        text.yview(f'{inserted + 1}.0' if len(self._shown) > len(added) else tk.END)
@@ -0,0 +1,83 @@
+import json
+import logging
+import os
+from typing import Optional, Sequence
+
+from recognizers import RecognizerUnavailableError
+
+logger = logging.getLogger(__name__)
+
+
+class KeywordSpotter:
+    """Streaming detector for a fixed wake phrase, fed raw PCM frames from the capture thread."""
+
+    name = 'base'
+
+    def open(self, sample_rate: int) -> None:
+        """Load models; called once on the capture thread before the first frame."""
+
+    def accept(self, frame: bytes) -> bool:
+        """Feed one frame; True when the wake phrase has just been heard."""
+        raise NotImplementedError
+
+    def reset(self) -> None:
+        """Forget partial input, e.g. at the end of a voiced segment."""
+
+    def close(self) -> None:
+        pass
+
+
+class VoskSpotter(KeywordSpotter):
+    """Local Kaldi decoding restricted to a grammar of just the wake phrase(s) and [unk].
+
+    A grammar this small keeps the decoding graph tiny, so running it on every
+    voiced frame costs a fraction of a core.
+    """
+
+    name = 'vosk'
+
+    def __init__(self, model_path: str, phrase: str = 'hey assistant', alternatives: Sequence[str] = ()):
+        self.model_path = model_path
+        self.phrases = [' '.join(p.lower().split()) for p in (phrase, *alternatives)]
+        self._model = None
+        self._recognizer = None
+
+    def open(self, sample_rate: int) -> None:
+        if not os.path.isdir(self.model_path):
+            raise RecognizerUnavailableError(f"Vosk model not found: {self.model_path}")
+        import vosk
+        if self._model is None:
+            vosk.SetLogLevel(-1)
+            self._model = vosk.Model(self.model_path)
+        grammar = json.dumps(self.phrases + ['[unk]'])
+        self._recognizer = vosk.KaldiRecognizer(self._model, sample_rate, grammar)
+
+    def accept(self, frame: bytes) -> bool:
+        if self._recognizer.AcceptWaveform(frame):
+            text = json.loads(self._recognizer.Result()).get('text', '')
+        else:
+            text = json.loads(self._recognizer.PartialResult()).get('partial', '')
+        if text and self._matches(text):
+            self.reset()
+            return True
+        return False
+
+    def _matches(self, text: str) -> bool:
+        padded = f" {' '.join(text.split())} "
+        return any(f' {phrase} ' in padded for phrase in self.phrases)
+
+    def reset(self) -> None:
+        if self._recognizer is not None:
+            self._recognizer.Reset()
+
+    def close(self) -> None:
+        self._recognizer = None
+
+
+def create_spotter(phrase: Optional[str] = None) -> Optional[KeywordSpotter]:
+    """Build the wake-word gate named by ASSISTANT_WAKE_WORD, or None to hear everything."""
+    phrase = phrase or os.getenv('ASSISTANT_WAKE_WORD')
+    if not phrase:
+        return None
+    model_path = os.getenv('ASSISTANT_WAKE_MODEL_PATH') or os.getenv('VOSK_MODEL_PATH', 'model')
+    return VoskSpotter(model_path, phrase)
@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Union
+
+from latency import LatencyWindow
+from resilience import ResilientCaller
+from tracing import TRACER
+from ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class WeatherResult(NamedTuple):
+    status_code: int
+    payload: Dict[str, Any]
+    stale_seconds: float = 0.0  # Age of a cached answer served while the service is down
+
+
+def normalize_location(location: str) -> str:
+    """Cache key for a location: lowercase, single-spaced, no trailing punctuation."""
+    return ' '.join(location.lower().split()).strip(' ?.!,')
+
+
+def format_report(payload: Dict[str, Any]) -> str:
+    """Spoken summary of a current.json response."""
+    current = payload['current']
+    return (
+        f"Current weather in {payload['location']['name']}: "
+        f"Condition: {current['condition']['text']}. "
+        f"Temperature: {current['temp_c']}°C, "
+        f"Feels like: {current['feelslike_c']}°C. "
+        f"Humidity: {current['humidity']}%. "
+        f"Wind speed: {current['wind_kph']} km/h."
+    )
+
+
+class WeatherClient:
+    """WeatherAPI.com client with a pooled session, TTL+LRU cache and request coalescing.
+
+    Concurrent lookups for the same location share one upstream request.
+    When ``refresh_ahead`` is set, a cache hit older than that fraction of the
+    TTL triggers a background refresh so hot locations never expire. Upstream
+    calls go through a ResilientCaller (turn budget, hedging, circuit
+    breaker); while they fail, an expired cached answer is served instead
+    with its age in ``stale_seconds``.
+    """
+
+    BASE_URL = 'http://api.weatherapi.com/v1/current.json'
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None, ttl: float = 600.0,
+                 maxsize: int = 256, timeout: float = 5.0, pool_size: int = 8,
+                 refresh_ahead: Optional[float] = 0.8, hedge: bool = True):
+        self.api_key = api_key
+        self.base_url = base_url or self.BASE_URL
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.refresh_ahead = refresh_ahead
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.upstream_latency = LatencyWindow()
+        self.lookup_latency = LatencyWindow()
+        self.coalesced = 0
+        self.refreshes = 0
+        self.degraded = 0
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="weather")
+        self.caller = ResilientCaller('weather', self._executor, timeout=timeout, hedge=hedge,
+                                      is_failure=lambda result: result.status_code >= 500)
+        self._session = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @property
+    def session(self):
+        """Keep-alive HTTP session shared by all lookups, created on first use."""
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=2, pool_maxsize=self.pool_size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._session = session
+        return self._session
+
+    async def current(self, location: str) -> WeatherResult:
+        """Current conditions for a location, served from cache when fresh (or stale, while the service is down)."""
+        started = time.perf_counter()
+        key = normalize_location(location)
+        try:
+            cached = self.cache.get(key)
+            if cached is not None:
+                result, age = cached
+                if self.refresh_ahead is not None and age > self.cache.ttl * self.refresh_ahead:
+                    self._refresh(key)
+                return result
+            try:
+                result = await asyncio.shield(self._request(key))
+            except Exception:
+                stale = self.cache.get_stale(key)
+                if stale is None:
+                    raise
+            else:
+                stale = self.cache.get_stale(key) if result.status_code >= 500 else None
+                if stale is None:
+                    return result
+            self.degraded += 1
+            return stale[0]._replace(stale_seconds=stale[1])
+        finally:
+            self.lookup_latency.add(time.perf_counter() - started)
+
+    async def current_many(self, locations: Sequence[str],
+                           concurrency: int = 4) -> List[Union[WeatherResult, BaseException]]:
+        """Current conditions for several locations, at most ``concurrency`` lookups at a time.
+
+        Results come back in the order asked; a failed lookup is returned as its exception.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def lookup(location: str) -> WeatherResult:
+            async with semaphore:
+                return await self.current(location)
+
+        return await asyncio.gather(*(lookup(location) for location in locations), return_exceptions=True)
+
+    def _request(self, key: str) -> asyncio.Future:
+        """Start an upstream request for a key, or join the one already in flight."""
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return inflight
+        task = asyncio.ensure_future(self._fetch(key))
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
+
+    def _refresh(self, key: str) -> None:
+        if key in self._inflight:
+            return
+        self.refreshes += 1
+        task = self._request(key)
+        task.add_done_callback(self._log_refresh_error)
+
+    @staticmethod
+    def _log_refresh_error(task: asyncio.Future) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Background weather refresh failed: {task.exception()}")
+
+    async def _fetch(self, key: str) -> WeatherResult:
+        started = time.perf_counter()
+        with TRACER.span('http.weather'):
+            result = await self.caller.call(self._get, key)
+        self.upstream_latency.add(time.perf_counter() - started)
+        if result.status_code == 200:
+            self.cache.put(key, result)
+        return result
+
+    def _get(self, location: str) -> WeatherResult:
+        response = self.session.get(
+            self.base_url,
+            params={'key': self.api_key, 'q': location, 'aqi': 'no'},
+            timeout=self.timeout
+        )
+        return WeatherResult(response.status_code, response.json())
+
+    def stats(self) -> Dict[str, float]:
+        """Cache effectiveness and latency percentiles."""
+        stats = {
+            'hits': self.cache.hits,
+            'misses': self.cache.misses,
+            'hit_rate': self.cache.hit_rate,
+            'coalesced': self.coalesced,
+            'refreshes': self.refreshes,
+            'degraded': self.degraded,
+        }
+        stats.update({f'lookup_{k}': v for k, v in self.lookup_latency.summary((50, 99)).items()})
+        stats.update({f'upstream_{k}': v for k, v in self.upstream_latency.summary((50, 99)).items()})
+        stats.update({f'caller_{k}': v for k, v in self.caller.stats().items()})
+        return stats
+
+    def close(self) -> None:
+        """Release pooled connections and worker threads."""
+        self._executor.shutdown(wait=False)
+        if self._session is not None:
+            self._session.close()
+            self._session = None
@@ -0,0 +1,376 @@
+"""Offline Wikipedia: ingest an abstracts dump into an mmap-able index and serve summaries.
+
+Build an index once from enwiki-latest-abstract.xml (optionally .gz/.bz2):
+
+    python wiki_offline.py ingest enwiki-latest-abstract.xml.gz wiki-index/
+
+then point the assistant at it with WIKIPEDIA_OFFLINE_INDEX=wiki-index.
+"""
+import argparse
+import bz2
+import difflib
+import gzip
+import heapq
+import json
+import logging
+import mmap
+import os
+import re
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import time
+import xml.etree.ElementTree as ET
+import zlib
+from collections import OrderedDict
+from typing import IO, Iterator, List, Optional, Tuple
+
+from wiki_service import normalize_query
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = 'titles.idx'
+BLOB_FILE = 'summaries.bin'
+BLOCKS_FILE = 'blocks.idx'
+
+_MAGIC = b'WKIDX001'
+_HEADER = struct.Struct('<8sQ')
+_OFFSET = struct.Struct('<Q')
+_LEN = struct.Struct('<H')
+_LOCATION = struct.Struct('<III')
+
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+_DISAMBIGUATION_RE = re.compile(r'\b(may|might|can) (also )?refer to\b|\bcommonly refers to\b', re.IGNORECASE)
+_ARTICLES = ('the ', 'a ', 'an ')
+
+
+class DisambiguationError(Exception):
+    def __init__(self, title: str, options: List[str]):
+        super().__init__(f'"{title}" may refer to: ' + ', '.join(options))
+        self.title = title
+        self.options = options
+
+
+class PageError(Exception):
+    def __init__(self, pageid: str):
+        super().__init__(f'Page "{pageid}" does not match any pages in the offline index')
+        self.pageid = pageid
+
+
+def _open_dump(path: str) -> IO[bytes]:
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    if path.endswith('.bz2'):
+        return bz2.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def iter_abstracts(path: str) -> Iterator[Tuple[str, str]]:
+    """Stream (title, abstract) pairs from an abstracts dump without holding it in memory."""
+    with _open_dump(path) as dump:
+        title, abstract = None, ''
+        root = None
+        for event, elem in ET.iterparse(dump, events=('start', 'end')):
+            if event == 'start':
+                if root is None:
+                    root = elem
+                continue
+            tag = elem.tag.rsplit('}', 1)[-1]
+            if tag == 'title':
+                title = (elem.text or '').strip()
+                if title.startswith('Wikipedia: '):
+                    title = title[len('Wikipedia: '):]
+            elif tag == 'abstract':
+                abstract = (elem.text or '').strip()
+            elif tag == 'doc':
+                if title and abstract:
+                    yield title, abstract
+                title, abstract = None, ''
+                root.clear()  # Drop finished docs from the tree, not just their contents
+
+
+def _write_run(entries: list, directory: str) -> str:
+    entries.sort()
+    fd, path = tempfile.mkstemp(suffix='.run', dir=directory)
+    with os.fdopen(fd, 'w', encoding='utf-8') as run:
+        for entry in entries:
+            run.write(json.dumps(entry) + '\n')
+    return path
+
+
+def _read_run(path: str) -> Iterator[list]:
+    with open(path, encoding='utf-8') as run:
+        for line in run:
+            yield json.loads(line)
+
+
+def ingest(dump_path: str, out_dir: str, block_size: int = 64 * 1024, run_size: int = 200000) -> int:
+    """Build the offline index from a dump; memory is bounded by ``run_size`` and ``block_size``.
+
+    Abstracts are appended to zlib-compressed blocks in dump order while the
+    title entries are sorted externally (sorted runs spilled to disk, then a
+    k-way merge), so neither the dump nor the title list is ever fully loaded.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix='wiki-ingest-', dir=out_dir)
+    runs, entries = [], []
+    block, block_offsets = bytearray(), [0]
+    block_index = 0
+    count = 0
+
+    try:
+        with open(os.path.join(out_dir, BLOB_FILE), 'wb') as blob:
+            for title, abstract in iter_abstracts(dump_path):
+                key = normalize_query(title)
+                if not key:
+                    continue
+                data = abstract.encode('utf-8')
+                entries.append([key, title, block_index, len(block), len(data)])
+                block += data
+                if len(block) >= block_size:
+                    blob.write(zlib.compress(bytes(block), 6))
+                    block_offsets.append(blob.tell())
+                    block_index += 1
+                    block = bytearray()
+                if len(entries) >= run_size:
+                    runs.append(_write_run(entries, work_dir))
+                    entries = []
+                count += 1
+            if block:
+                blob.write(zlib.compress(bytes(block), 6))
+                block_offsets.append(blob.tell())
+        if entries:
+            runs.append(_write_run(entries, work_dir))
+
+        with open(os.path.join(out_dir, BLOCKS_FILE), 'wb') as blocks:
+            for offset in block_offsets:
+                blocks.write(_OFFSET.pack(offset))
+
+        _write_index(heapq.merge(*(_read_run(run) for run in runs)), out_dir, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return count
+
+
+def _write_index(entries: Iterator[list], out_dir: str, work_dir: str) -> None:
+    offsets_path = os.path.join(work_dir, 'offsets')
+    records_path = os.path.join(work_dir, 'records')
+    written = 0
+    previous = None
+    with open(offsets_path, 'wb') as offsets, open(records_path, 'wb') as records:
+        for key, title, block, offset, length in entries:
+            if key == previous:
+                continue  # Keep one article per normalized title
+            previous = key
+            key_bytes = key.encode('utf-8')[:0xFFFF]
+            title_bytes = title.encode('utf-8')[:0xFFFF]
+            offsets.write(_OFFSET.pack(records.tell()))
+            records.write(_LEN.pack(len(key_bytes)) + key_bytes)
+            records.write(_LEN.pack(len(title_bytes)) + title_bytes)
+            records.write(_LOCATION.pack(block, offset, length))
+            written += 1
+
+    with open(os.path.join(out_dir, INDEX_FILE), 'wb') as index:
+        index.write(_HEADER.pack(_MAGIC, written))
+        for path in (offsets_path, records_path):
+            with open(path, 'rb') as part:
+                shutil.copyfileobj(part, index)
+
+
+class OfflineIndex:
+    """Memory-mapped title index plus compressed summary blocks."""
+
+    def __init__(self, directory: str, block_cache: int = 16):
+        self.directory = directory
+        self._index_file = open(os.path.join(directory, INDEX_FILE), 'rb')
+        self._index = mmap.mmap(self._index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = _HEADER.unpack_from(self._index, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{directory} is not an offline Wikipedia index")
+        self._records_start = _HEADER.size + self.count * _OFFSET.size
+
+        with open(os.path.join(directory, BLOCKS_FILE), 'rb') as blocks:
+            raw = blocks.read()
+        self._blocks = [_OFFSET.unpack_from(raw, i)[0] for i in range(0, len(raw), _OFFSET.size)]
+        self._blob_file = open(os.path.join(directory, BLOB_FILE), 'rb')
+        self._blob = mmap.mmap(self._blob_file.fileno(), 0, access=mmap.ACCESS_READ) \
+            if os.path.getsize(os.path.join(directory, BLOB_FILE)) else b''
+        self._block_cache: 'OrderedDict[int, bytes]' = OrderedDict()
+        self._block_cache_size = block_cache
+        self._block_lock = threading.Lock()  # Lookups run on WikipediaService's worker threads
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _record_offset(self, i: int) -> int:
+        return self._records_start + _OFFSET.unpack_from(self._index, _HEADER.size + i * _OFFSET.size)[0]
+
+    def key_bytes(self, i: int) -> bytes:
+        offset = self._record_offset(i)
+        length = _LEN.unpack_from(self._index, offset)[0]
+        return self._index[offset + 2:offset + 2 + length]
+
+    def key(self, i: int) -> str:
+        return self.key_bytes(i).decode('utf-8')
+
+    def record(self, i: int) -> Tuple[str, str, Tuple[int, int, int]]:
+        """(normalized key, display title, (block, offset, length)) for entry i."""
+        offset = self._record_offset(i)
+        key_len = _LEN.unpack_from(self._index, offset)[0]
+        key = self._index[offset + 2:offset + 2 + key_len].decode('utf-8')
+        offset += 2 + key_len
+        title_len = _LEN.unpack_from(self._index, offset)[0]
+        title = self._index[offset + 2:offset + 2 + title_len].decode('utf-8')
+        offset += 2 + title_len
+        return key, title, _LOCATION.unpack_from(self._index, offset)
+
+    def lower_bound(self, key: str) -> int:
+        """First entry whose key is >= key (binary search over the mmap)."""
+        target = key.encode('utf-8')
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key_bytes(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def find(self, key: str) -> Optional[int]:
+        i = self.lower_bound(key)
+        if i < self.count and self.key(i) == key:
+            return i
+        return None
+
+    def prefixed(self, prefix: str, limit: int = 10) -> List[int]:
+        """Entries whose key starts with prefix, in key order."""
+        found = []
+        i = self.lower_bound(prefix)
+        while i < self.count and len(found) < limit and self.key(i).startswith(prefix):
+            found.append(i)
+            i += 1
+        return found
+
+    def text(self, location: Tuple[int, int, int]) -> str:
+        block, offset, length = location
+        with self._block_lock:
+            data = self._block_cache.get(block)
+            if data is not None:
+                self._block_cache.move_to_end(block)
+        if data is None:
+            data = zlib.decompress(self._blob[self._blocks[block]:self._blocks[block + 1]])
+            with self._block_lock:
+                self._block_cache[block] = data
+                if len(self._block_cache) > self._block_cache_size:
+                    self._block_cache.popitem(last=False)
+        return data[offset:offset + length].decode('utf-8')
+
+    def close(self) -> None:
+        self._index.close()
+        self._index_file.close()
+        if isinstance(self._blob, mmap.mmap):
+            self._blob.close()
+        self._blob_file.close()
+
+
+class OfflineWikipedia:
+    """Drop-in for the ``wikipedia`` module's summary API backed by an OfflineIndex."""
+
+    class exceptions:
+        DisambiguationError = DisambiguationError
+        PageError = PageError
+
+    def __init__(self, index: OfflineIndex):
+        self.index = index
+
+    @classmethod
+    def open(cls, directory: str) -> 'OfflineWikipedia':
+        return cls(OfflineIndex(directory))
+
+    def set_lang(self, lang: str) -> None:
+        if lang != 'en':
+            logger.warning(f"Offline Wikipedia index only has one language; ignoring '{lang}'")
+
+    def summary(self, title: str, sentences: int = 0, auto_suggest: bool = True) -> str:
+        key = normalize_query(title)
+        i = self.index.find(key)
+        if i is None and auto_suggest:
+            i = self.suggest(key)
+        if i is None:
+            raise PageError(title)
+
+        key, found_title, location = self.index.record(i)
+        text = self.index.text(location)
+        if _DISAMBIGUATION_RE.search(text):
+            options = self._options(key)
+            if not options:
+                raise PageError(title)  # Nothing in the index to offer instead
+            raise DisambiguationError(found_title, options)
+        if sentences:
+            text = ' '.join(_SENTENCE_RE.split(text)[:sentences])
+        return text
+
+    def suggest(self, key: str) -> Optional[int]:
+        """Best guess for a key that is not an exact title, like the online auto-suggest."""
+        for article in _ARTICLES:
+            if key.startswith(article):
+                i = self.index.find(key[len(article):])
+                if i is not None:
+                    return i
+
+        # Shortest title that extends the query ("eiffel" -> "eiffel tower")
+        candidates = self.index.prefixed(key + ' ', limit=20)
+        if candidates:
+            return min(candidates, key=lambda i: len(self.index.key_bytes(i)))
+
+        # Close spelling among neighbouring titles
+        neighbourhood = {}
+        first_word = key.split(' ', 1)[0]
+        for anchor in {self.index.lower_bound(key), self.index.lower_bound(first_word[:3])}:
+            for i in range(max(0, anchor - 25), min(self.index.count, anchor + 25)):
+                neighbourhood[self.index.key(i)] = i
+        match = difflib.get_close_matches(key, list(neighbourhood), n=1, cutoff=0.8)
+        return neighbourhood[match[0]] if match else None
+
+    def _options(self, key: str, limit: int = 10) -> List[str]:
+        base = key[:-len(' disambiguation')] if key.endswith(' disambiguation') else key
+        options = []
+        for i in self.index.prefixed(base + ' ', limit=limit + 1):
+            option_key, title, _ = self.index.record(i)
+            if option_key != key and not option_key.endswith(' disambiguation'):
+                options.append(title)
+        return options[:limit]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Offline Wikipedia index tools")
+    commands = parser.add_subparsers(dest='command', required=True)
+    ingest_parser = commands.add_parser('ingest', help="build an index from an abstracts dump")
+    ingest_parser.add_argument('dump')
+    ingest_parser.add_argument('out_dir')
+    ingest_parser.add_argument('--run-size', type=int, default=200000,
+                               help="titles sorted in memory before spilling to disk")
+    lookup_parser = commands.add_parser('lookup', help="look up a summary in an index")
+    lookup_parser.add_argument('index_dir')
+    lookup_parser.add_argument('query', nargs='+')
+    args = parser.parse_args(argv)
+
+    if args.command == 'ingest':
+        started = time.perf_counter()
+        count = ingest(args.dump, args.out_dir, run_size=args.run_size)
+        print(f"Indexed {count} abstracts in {time.perf_counter() - started:.1f}s")
+    else:
+        wiki = OfflineWikipedia.open(args.index_dir)
+        try:
+            print(wiki.summary(' '.join(args.query), sentences=2))
+        except DisambiguationError as e:
+            print(f"Did you mean: {', '.join(e.options[:3])}?")
+        except PageError as e:
+            print(e)
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
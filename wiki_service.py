@@ -0,0 +1,234 @@
+import asyncio
+import functools
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional
+
+from latency import LatencyWindow
+from resilience import ResilientCaller
+from tracing import TRACER
+
+logger = logging.getLogger(__name__)
+
+SUMMARY = 'summary'
+DISAMBIGUATION = 'disambiguation'
+MISSING = 'missing'
+
+_NON_WORD_RE = re.compile(r"[^\w\s]+")
+
+
+class WikiResult(NamedTuple):
+    kind: str
+    text: str = ''
+    options: List[str] = []
+    stale: bool = False  # From an expired cache entry because Wikipedia couldn't be reached
+
+
+def normalize_query(query: str) -> str:
+    """Cache key for a query: lowercase words without punctuation, single-spaced."""
+    return ' '.join(_NON_WORD_RE.sub(' ', query.lower()).split())
+
+
+def default_cache_path(filename: str) -> str:
+    """Location for on-disk caches, overridable with ASSISTANT_CACHE_DIR."""
+    directory = os.getenv('ASSISTANT_CACHE_DIR', '.cache')
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, filename)
+
+
+class SummaryCache:
+    """SQLite-backed summary cache keyed by (language, normalized query).
+
+    Entries expire after ``ttl`` seconds but stay readable with ``stale=True``
+    until replaced; once more than ``max_entries`` are stored the least
+    recently used ones are evicted.
+    """
+
+    def __init__(self, path: str, ttl: float = 7 * 24 * 3600, max_entries: int = 5000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS summaries ('
+            ' lang TEXT NOT NULL, query TEXT NOT NULL, kind TEXT NOT NULL,'
+            ' text TEXT NOT NULL, options TEXT NOT NULL,'
+            ' created REAL NOT NULL, accessed REAL NOT NULL,'
+            ' PRIMARY KEY (lang, query))'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS summaries_accessed ON summaries (accessed)')
+        self._conn.commit()
+
+    def get(self, lang: str, query: str, stale: bool = False) -> Optional[WikiResult]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT kind, text, options, created FROM summaries WHERE lang = ? AND query = ?',
+                (lang, query)
+            ).fetchone()
+            if row is None or (now - row[3] > self.ttl and not stale):
+                return None
+            self._conn.execute(
+                'UPDATE summaries SET accessed = ? WHERE lang = ? AND query = ?', (now, lang, query)
+            )
+            self._conn.commit()
+        return WikiResult(row[0], row[1], json.loads(row[2]), now - row[3] > self.ttl)
+
+    def put(self, lang: str, query: str, result: WikiResult) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (lang, query, result.kind, result.text, json.dumps(result.options), now, now)
+            )
+            count = self._conn.execute('SELECT COUNT(*) FROM summaries').fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    'DELETE FROM summaries WHERE rowid IN '
+                    '(SELECT rowid FROM summaries ORDER BY accessed LIMIT ?)',
+                    (count - self.max_entries,)
+                )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class WikipediaService:
+    """Off-loop Wikipedia summaries with a persistent cache and disambiguation prefetch.
+
+    Fetches go through a ResilientCaller; when one can't be had, an expired
+    cached summary is returned (``stale=True``) if there is one.
+    """
+
+    def __init__(self, cache: Optional[SummaryCache] = None, module=None, lang: str = 'en',
+                 sentences: int = 2, prefetch: int = 3, max_workers: int = 4, timeout: float = 8.0):
+        self.cache = cache
+        self.lang = lang
+        self.sentences = sentences
+        self.prefetch = prefetch
+        self.hits = 0
+        self.misses = 0
+        self.prefetched = 0
+        self.degraded = 0
+        self.fetch_latency = LatencyWindow()
+        self._module = module
+        self._lang_set = False
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="wikipedia")
+        # The wikipedia module sets no socket timeout; a hung fetch holds its worker until the OS gives up
+        self.caller = ResilientCaller('wikipedia', self._executor, timeout=timeout)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._background = set()
+
+    @property
+    def module(self):
+        if self._module is None:
+            import wikipedia
+            self._module = wikipedia
+        if not self._lang_set:
+            self._module.set_lang(self.lang)
+            self._lang_set = True
+        return self._module
+
+    async def summary(self, query: str, auto_suggest: bool = True) -> WikiResult:
+        """Look up a summary, prefetching the first disambiguation options in the background."""
+        key = normalize_query(query)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._lookup(key, query, auto_suggest))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        result = await asyncio.shield(task)
+
+        if result.kind == DISAMBIGUATION:
+            for option in result.options[:self.prefetch]:
+                self._prefetch(option)
+        return result
+
+    def _prefetch(self, title: str) -> None:
+        key = normalize_query(title)
+        if key in self._inflight:
+            return
+        task = asyncio.ensure_future(self._lookup(key, title, False, prefetch=True))
+        self._inflight[key] = task
+        self._background.add(task)
+        task.add_done_callback(lambda t: (self._inflight.pop(key, None), self._background.discard(t)))
+        task.add_done_callback(self._log_prefetch_error)
+
+    @staticmethod
+    def _log_prefetch_error(task: asyncio.Future) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Wikipedia prefetch failed: {task.exception()}")
+
+    async def _lookup(self, key: str, query: str, auto_suggest: bool, prefetch: bool = False) -> WikiResult:
+        loop = asyncio.get_event_loop()
+        if self.cache is not None:
+            cached = await loop.run_in_executor(self._executor, self.cache.get, self.lang, key)
+            if cached is not None:
+                if not prefetch:
+                    self.hits += 1
+                return cached
+        if prefetch:
+            self.prefetched += 1
+        else:
+            self.misses += 1
+
+        started = time.perf_counter()
+        try:
+            with TRACER.span('http.wikipedia_prefetch' if prefetch else 'http.wikipedia'):
+                result = await self.caller.call(self._fetch, query, auto_suggest, hedge=not prefetch)
+        except Exception:
+            stale = None
+            if self.cache is not None:
+                # Not on our executor: its workers may all be stuck on the unresponsive service
+                stale = await loop.run_in_executor(None, functools.partial(self.cache.get, self.lang, key, stale=True))
+            if stale is None:
+                raise
+            self.degraded += 1
+            return stale
+        self.fetch_latency.add(time.perf_counter() - started)
+        if self.cache is not None:
+            await loop.run_in_executor(self._executor, self.cache.put, self.lang, key, result)
+        return result
+
+    def _fetch(self, query: str, auto_suggest: bool) -> WikiResult:
+        """Blocking call into the wikipedia module; runs on the executor."""
+        module = self.module
+        try:
+            text = module.summary(query, sentences=self.sentences, auto_suggest=auto_suggest)
+            return WikiResult(SUMMARY, text)
+        except module.exceptions.DisambiguationError as e:
+            if not e.options:
+                return WikiResult(MISSING)
+            return WikiResult(DISAMBIGUATION, options=list(e.options[:10]))
+        except module.exceptions.PageError:
+            return WikiResult(MISSING)
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        stats = {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'prefetched': self.prefetched,
+            'degraded': self.degraded,
+        }
+        stats.update({f'fetch_{k}': v for k, v in self.fetch_latency.summary((50, 99)).items()})
+        stats.update({f'caller_{k}': v for k, v in self.caller.stats().items()})
+        return stats
+
+    def close(self) -> None:
+        for task in list(self._background):
+            task.cancel()
+        self._executor.shutdown(wait=False)
+        if self.cache is not None:
+            self.cache.close()